@@ -0,0 +1,137 @@
+"""Benchmarks for the backend."""
+
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Mapping, NamedTuple, get_args
+
+import msgspec
+from msgspec import Struct
+from past_years.search.query_searcher import (
+    IndexStorage,
+    WhooshSearcher,
+    get_term_counts,
+)
+from past_years.search.question_bank import QuestionBank
+from past_years.search.question_store import CompressedQuestions
+from past_years.search.search_types import Exam, Subject
+
+
+class _PlainQuestion(Struct):
+    """The representation of a question before it was made compact i.e. a
+    GC tracked struct with a list of options."""
+
+    main_question: str
+    continuation: str
+    question_options: list[str]
+    answers: dict[str, str]
+    correct_answer: str
+    exam: Exam
+    year: int
+    subject: Subject
+    id: str
+
+
+class MemoryUsage(NamedTuple):
+    """The memory used by a loaded question bank."""
+
+    total_bytes: int
+    bytes_per_question: float
+    gc_tracked_objects: int
+
+
+def measure_question_memory(questions_fp: Path) -> dict[str, MemoryUsage]:
+    """Measures the memory used by the questions when loaded in the plain
+    representation, in the compact representation used by the question
+    bank and in the compressed storage (with an empty cache)."""
+
+    def load_plain():
+        questions = msgspec.json.decode(
+            questions_fp.read_bytes(), type=list[_PlainQuestion]
+        )
+        return {q.id: q for q in questions}
+
+    def load_compact():
+        return QuestionBank.load_questions(questions_fp)
+
+    def load_compressed():
+        return CompressedQuestions(QuestionBank.load_questions(questions_fp))
+
+    return {
+        "plain": _measure(load_plain),
+        "compact": _measure(load_compact),
+        "compressed": _measure(load_compressed),
+    }
+
+
+class SearchLatency(NamedTuple):
+    """The latency (in milliseconds) of the uncached text searches."""
+
+    p50: float
+    p99: float
+    mean: float
+
+
+def measure_search_latency(
+    index_dir: Path,
+    index_name: str,
+    field_name: str,
+    num_of_queries: int = 200,
+    rounds: int = 5,
+) -> dict[str, SearchLatency]:
+    """Measures the latency of searching for terms of the index with each
+    of the index storages.
+
+    The caches of the searchers are disabled so that every search reads
+    the index.
+    """
+
+    searchers = {
+        storage: WhooshSearcher(
+            str(index_dir), index_name, field_name, cache_size=0, storage=storage
+        )
+        for storage in get_args(IndexStorage)
+    }
+
+    with next(iter(searchers.values()))._idx.reader() as reader:
+        terms = [term for term, _ in get_term_counts(reader, [field_name])]
+    queries = random.Random(0).sample(terms, min(num_of_queries, len(terms)))
+
+    return {
+        storage: _measure_latency(searcher, queries, rounds)
+        for storage, searcher in searchers.items()
+    }
+
+
+def _measure_latency(
+    searcher: WhooshSearcher, queries: list[str], rounds: int
+) -> SearchLatency:
+    timings: list[float] = []
+    for _ in range(rounds):
+        for query in queries:
+            start_time = time.perf_counter_ns()
+            searcher.search(query)
+            timings.append((time.perf_counter_ns() - start_time) * 1e-6)
+
+    percentiles = statistics.quantiles(timings, n=100)
+    return SearchLatency(percentiles[49], percentiles[98], statistics.fmean(timings))
+
+
+def _measure(load: Callable[[], Mapping]) -> MemoryUsage:
+    gc.collect()
+    tracked_before = len(gc.get_objects())
+    tracemalloc.start()
+
+    questions = load()
+    total_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    gc.collect()
+    tracked_objects = len(gc.get_objects()) - tracked_before
+
+    num_of_questions = len(questions) or 1
+    del questions
+    return MemoryUsage(total_bytes, total_bytes / num_of_questions, tracked_objects)
@@ -2,7 +2,6 @@
 
 from pathlib import Path
 import time
-from typing import Iterable
 from loguru import logger
 from whoosh.analysis import StemmingAnalyzer
 from whoosh.fields import STORED, TEXT, Schema
@@ -12,11 +11,28 @@ import msgspec
 from errors import IndexExistsError
 from past_years.search.question_bank import QuestionBank
 from past_years.search import Question
+from past_years.search.fuzzy import build_fuzzy_index, fuzzy_index_fp
+from past_years.search.query_searcher import get_term_counts
+from past_years.search.similarity import (
+    build_similar_questions_index,
+    similar_questions_fp,
+)
+from past_years.search.cube import (
+    build_questions_cube,
+    encode_questions_cube,
+    questions_cube_fp,
+)
+from past_years.search.index_format import binary_index_fp, encode_questions_index
+from past_years.search.suggester import (
+    build_term_suggester,
+    encode_term_suggester,
+    term_suggester_fp,
+)
 from past_years.search.search_types import QuestionsIndex
 
 
 def create_questions_index(questions_fp: str | Path, idx_fp: str | Path) -> None:
-    """Creates the questions index.
+    """Creates the questions index, in both the JSON and the binary format.
 
     Arguments:
         questions_fp: The path to the file/directory containing
@@ -36,6 +52,58 @@ def create_questions_index(questions_fp: str | Path, idx_fp: str | Path) -> None
     idx_fp = Path(idx_fp)
     idx_fp.write_bytes(idx_bytes)
 
+    # The binary index is what the question bank loads, with the JSON
+    # index being the fallback.
+    bin_fp = binary_index_fp(idx_fp)
+    bin_bytes = encode_questions_index(idx, questions.values())
+    bin_fp.write_bytes(bin_bytes)
+
+    logger.info(
+        "Saved the index to `{}` ({} bytes) and `{}` ({} bytes)",
+        idx_fp,
+        len(idx_bytes),
+        bin_fp,
+        len(bin_bytes),
+    )
+
+    cube_fp = questions_cube_fp(idx_fp)
+    cube = build_questions_cube(idx, questions.keys())
+    cube_fp.write_bytes(encode_questions_cube(cube, questions.values()))
+    logger.info("Saved the cube of {} questions to `{}`", len(cube), cube_fp)
+
+    suggester_fp = term_suggester_fp(idx_fp)
+    suggester = build_term_suggester(questions.values())
+    suggester_fp.write_bytes(encode_term_suggester(suggester, questions.values()))
+    logger.info("Saved the {} suggested terms to `{}`", len(suggester), suggester_fp)
+
+    create_similar_questions_index(questions, idx_fp)
+
+
+def create_similar_questions_index(
+    questions: dict[int, Question], idx_fp: str | Path
+) -> None:
+    """Creates the index of the most similar questions of each question,
+    which is saved alongside the questions index.
+
+    Arguments:
+        questions: All the questions keyed by their IDs.
+        idx_fp: The path to the questions index.
+    """
+
+    logger.info("Creating the similar questions index")
+
+    start_time = time.monotonic_ns()
+    similar_idx = build_similar_questions_index(questions.values())
+    total_time = round((time.monotonic_ns() - start_time) * 1e-6, 3)
+
+    similar_fp = similar_questions_fp(idx_fp)
+    similar_fp.write_bytes(msgspec.msgpack.encode(similar_idx))
+    logger.info(
+        "Found similar questions for {} questions in {} ms",
+        len(similar_idx.similar),
+        total_time,
+    )
+
 
 def create_whoosh_index(
     idx_fp: str | Path, questions_fp: str | Path, questions_idx_name: str, reset: bool
@@ -67,11 +135,11 @@ def create_whoosh_index(
     start_time = time.monotonic_ns()
     num_of_questions = 0
 
-    for q in _get_questions(questions_fp):
+    for q_id, q in _get_questions(questions_fp).items():
         logger.trace(f"Indexing {q.id}")
 
         num_of_questions += 1
-        writer.add_document(id=q.id, question=q.full_question)
+        writer.add_document(id=q_id, question=q.full_question)
 
     writer.commit()
 
@@ -79,9 +147,36 @@ def create_whoosh_index(
     total_time = round((end_time - start_time) * 1e-6, 3)
     logger.info(f"Indexed {num_of_questions} questions in {total_time} ms")
 
+    create_fuzzy_index(idx_fp, questions_idx_name)
+
+
+def create_fuzzy_index(idx_fp: str | Path, questions_idx_name: str) -> None:
+    """Creates the fuzzy index of the terms in the Whoosh index, which is
+    used for the typo tolerant searches.
+
+    Arguments:
+        idx_fp: The path to the directory with the Whoosh index.
+        questions_idx_name: The name of the questions index.
+    """
+
+    logger.info("Creating the fuzzy index")
+
+    idx = index.open_dir(str(idx_fp), questions_idx_name)
+    field_names = [name for name, field in idx.schema.items() if field.indexed]
+    with idx.searcher() as searcher:
+        fuzzy_idx = build_fuzzy_index(
+            get_term_counts(searcher.reader(), field_names), idx.latest_generation()
+        )
+
+    fuzzy_fp = fuzzy_index_fp(idx_fp, questions_idx_name)
+    fuzzy_fp.write_bytes(msgspec.msgpack.encode(fuzzy_idx))
+    logger.info(
+        "Saved the fuzzy index of {} terms to `{}`", len(fuzzy_idx.terms), fuzzy_fp
+    )
+
 
 # ----- Helpers -----
-def _create_questions_idx(questions: Iterable[Question]) -> QuestionsIndex:
+def _create_questions_idx(questions: dict[int, Question]) -> QuestionsIndex:
     """Creates and returns the questions index from the given questions."""
 
     logger.debug("Creating index")
@@ -91,7 +186,7 @@ def _create_questions_idx(questions: Iterable[Question]) -> QuestionsIndex:
     idx: QuestionsIndex = QuestionsIndex()
     num_of_questions = 0
 
-    for q in questions:
+    for q_id, q in questions.items():
         logger.trace(f"Indexing '{q.id}'")
 
         num_of_questions += 1
@@ -101,7 +196,7 @@ def _create_questions_idx(questions: Iterable[Question]) -> QuestionsIndex:
         year_ids = idx.years.setdefault(q.year, set())
 
         for s in (exam_ids, subject_ids, year_ids):
-            s.add(q.id)
+            s.add(q_id)
 
     end_time = time.monotonic_ns()
     total_time = round((end_time - start_time) * 1e-6, 3)
@@ -119,9 +214,11 @@ def _get_whoosh_question_schema() -> Schema:
     return Schema(id=STORED, question=question)
 
 
-def _get_questions(questions_fp: str | Path) -> Iterable[Question]:
+def _get_questions(questions_fp: str | Path) -> dict[int, Question]:
+    """Returns the questions keyed by their integer IDs."""
+
     questions_fp = Path(questions_fp)
 
     logger.debug(f"Loading questions from {questions_fp}")
 
-    return QuestionBank.load_questions(questions_fp).values()
+    return QuestionBank.load_questions(questions_fp)
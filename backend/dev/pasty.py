@@ -11,6 +11,7 @@ import click
 
 from past_years.errors import InvalidConfigFileError
 from index import create_questions_index, create_whoosh_index
+from benchmarks import measure_question_memory, measure_search_latency
 
 # ----- Global Values -----
 logger_configured: bool = False
@@ -134,6 +135,100 @@ def random_data(total_questions: int, population: str | None):
     click.secho("Created and saved the questions!", fg="green")
 
 
+@run.command()
+@click.option("--host", help="The host to bind to.")
+@click.option("--port", type=int, help="The port to bind to.")
+@click.option("--workers", "-w", type=int, help="The number of worker processes.")
+@click.option(
+    "--threads", "-t", type=int, help="The number of threads per worker process."
+)
+@click.option(
+    "--max-requests",
+    type=int,
+    help="The number of requests after which a worker is replaced.",
+)
+def serve(
+    host: str | None,
+    port: int | None,
+    workers: int | None,
+    threads: int | None,
+    max_requests: int | None,
+):
+    """Serves the API with a pre-forking server.
+
+    The options default to the server configurations of the current mode.
+    """
+
+    from past_years.main import initialize_application
+    from past_years.server import PreforkServer
+
+    server_config = _get_config().get_server_config()
+    # The caches are warmed up before forking so that all the workers
+    # share them and are ready as soon as they're spawned.
+    application = initialize_application(wait_for_warm_up=True)
+
+    server = PreforkServer(
+        application,
+        host or server_config.host,
+        port or server_config.port,
+        workers=workers or server_config.workers,
+        threads=threads or server_config.threads,
+        max_requests=(
+            max_requests if max_requests is not None else server_config.max_requests
+        ),
+    )
+    server.serve()
+
+
+@run.group()
+def bench():
+    """Benchmarks the backend."""
+
+
+@bench.command()
+@click.option(
+    "--questions-fp", help="The path to the file/directory with the questions."
+)
+def memory(questions_fp: str | None):
+    """Reports the memory used per question when loaded."""
+
+    config = _get_config().get_questions_config()
+    questions_fp = questions_fp or config.questions_fp
+
+    usages = measure_question_memory(Path(questions_fp))
+    for name, usage in usages.items():
+        click.echo(
+            f"{name:>8}: {usage.bytes_per_question:10.1f} bytes/question "
+            f"({usage.total_bytes} bytes total, "
+            f"{usage.gc_tracked_objects} GC tracked objects)"
+        )
+
+
+@bench.command()
+@click.option("--index-dir", help="The path to the directory with the index.")
+@click.option("--index-name", help="The name of the index.")
+@click.option("--rounds", "-r", type=int, default=5)
+def search(index_dir: str | None, index_name: str | None, rounds: int):
+    """Reports the latency of the uncached text searches when the Whoosh
+    index is read from the disk and from memory."""
+
+    config = _get_config().get_questions_config()
+    index_dir = index_dir or config.whoosh_index_dir
+    index_name = index_name or config.whoosh_questions_index_name
+
+    latencies = measure_search_latency(
+        Path(index_dir),
+        index_name,
+        config.whoosh_questions_field_name,
+        rounds=rounds,
+    )
+    for storage, latency in latencies.items():
+        click.echo(
+            f"{storage:>4}: p50 {latency.p50:.3f}ms, p99 {latency.p99:.3f}ms, "
+            f"mean {latency.mean:.3f}ms"
+        )
+
+
 # ----- Helpers -----
 def _get_config() -> _Config:
     """Returns the configuration from the current context."""
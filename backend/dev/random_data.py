@@ -55,9 +55,9 @@ class RandomQuestionGenerator:
     def _get_continuation(self) -> str:
         return choice(self._data.continuation)
 
-    def _get_question_options(self) -> list[str]:
+    def _get_question_options(self) -> tuple[str, ...]:
         n = randint(0, 4)
-        return choices(self._data.question_options, k=n)
+        return tuple(choices(self._data.question_options, k=n))
 
     def _return_answers(self) -> dict[str, str]:
         return {
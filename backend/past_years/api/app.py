@@ -1,63 +1,163 @@
 import os
 from typing import Any
-from falcon import App, MEDIA_MSGPACK, MEDIA_JSON, CORSMiddleware
+from falcon import (
+    App,
+    MEDIA_MSGPACK,
+    MEDIA_JSON,
+    CORSMiddleware,
+    HTTPBadRequest,
+    Response,
+)
+from loguru import logger
 
 
 from past_years.api.handlers import JSONHandler
-from past_years.api.middlewares import LogRequestMiddleware, CompressionMiddleware
+from past_years.api.middlewares import (
+    LogRequestMiddleware,
+    CompressionMiddleware,
+    MetricsMiddleware,
+    RecordTrafficMiddleware,
+    AdmissionMiddleware,
+)
+from past_years.api.traffic import TrafficRecorder, WarmUp
+from past_years.errors import QueryTooComplexError
 from past_years.github.gh_client import GithubClient
 from past_years.incorrect.incorrect_question import IncorrectQuestionsHandler
 from past_years.search.factories import QuerySearcherFactory, QuestionBankFactory
 from past_years.search.search_engine import QuestionSearchEngine
 from past_years.configuration import config
-from past_years.api.endpoints import QuestionsEndpoint, IncorrectQuestionEndpoint
+from past_years.api.endpoints import (
+    QuestionsEndpoint,
+    IncorrectQuestionEndpoint,
+    MetricsEndpoint,
+    ReadinessEndpoint,
+)
 from past_years.api.request import Request
 from past_years.api.handlers import MsgPackHandler
+from past_years.metrics import (
+    format_startup_timings,
+    get_startup_timings,
+    registry,
+)
+
+
+def make_app(
+    search_engine: QuestionSearchEngine | None = None, wait_for_warm_up: bool = False
+) -> App:
+    """Makes the application.
+
+    Args:
+        search_engine: The search engine for the questions. If not given,
+            it's created based on the configuration.
+        wait_for_warm_up: If `True`, the recorded requests are replayed
+            before returning, else they're replayed in the background while
+            `/ready` reports that the application isn't ready.
+    """
 
-
-def make_app() -> App:
     app = App(
         request_type=Request,
     )
 
     # Creating endpoints
-    search_engine = _get_search_engine()
-    incorrect_qstn_handler = _get_incorrect_question_handler()
+    search_engine = search_engine or _get_search_engine()
+    traffic_recorder = _get_traffic_recorder()
+    warm_up = _get_warm_up(traffic_recorder)
     questions_endpoint = QuestionsEndpoint(search_engine)
-    incorrect_question_endpoint = IncorrectQuestionEndpoint(incorrect_qstn_handler)
+    incorrect_question_endpoint = IncorrectQuestionEndpoint(
+        _get_incorrect_question_handler
+    )
+    metrics_endpoint = MetricsEndpoint(registry)
+    readiness_endpoint = ReadinessEndpoint(warm_up)
 
     # Adding routes
     app.add_route("/questions/{question_id}", questions_endpoint)
+    app.add_route(
+        "/questions/{question_id}/similar", questions_endpoint, suffix="similar"
+    )
     app.add_route("/questions/filter", questions_endpoint, suffix="filter")
     app.add_route("/questions/random", questions_endpoint, suffix="random")
+    app.add_route("/questions/practice", questions_endpoint, suffix="practice")
+    app.add_route("/questions/batch", questions_endpoint, suffix="batch")
     app.add_route("/questions/metadata", questions_endpoint, suffix="metadata")
+    app.add_route("/questions/suggest", questions_endpoint, suffix="suggest")
+    app.add_route("/questions/count", questions_endpoint, suffix="count")
     app.add_route("/incorrect-question/{question_id}", incorrect_question_endpoint)
+    app.add_route("/metrics", metrics_endpoint)
+    app.add_route("/ready", readiness_endpoint)
 
     # Adding handlers
     extra_media_handlers = {MEDIA_MSGPACK: MsgPackHandler(), MEDIA_JSON: JSONHandler()}
     app.resp_options.media_handlers.update(extra_media_handlers)
 
+    # Adding error handlers
+    app.add_error_handler(QueryTooComplexError, _handle_query_too_complex)
+
     # Adding middlewares
-    middlewares = _get_middlwares()
+    middlewares = _get_middlwares(traffic_recorder)
     app.add_middleware(middlewares)
 
+    logger.info("Started up in {}", format_startup_timings(get_startup_timings()))
+
+    if wait_for_warm_up:
+        warm_up.run(app)
+    else:
+        warm_up.start(app)
+
     return app
 
 
-def _get_middlwares() -> list[Any]:
+def _get_middlwares(traffic_recorder: TrafficRecorder | None = None) -> list[Any]:
     """Configures the middleware and returns them."""
 
     api_config = config.get_api_config()
+    logs_config = config.get_logs_config()
     cors_middleware = CORSMiddleware(
         allow_credentials="*",
-        expose_headers=["X-Request-Id"],
+        expose_headers=["X-Request-Id", "Server-Timing", "X-Search-Truncated"],
         allow_origins=api_config.allow_origins,
     )
 
-    middlewares = [cors_middleware, LogRequestMiddleware(), CompressionMiddleware()]
+    # NOTE: The responses are processed in the reverse order of the
+    # middlewares i.e. the compressed response is seen by the metrics
+    # middleware.
+    middlewares = [
+        cors_middleware,
+        MetricsMiddleware(),
+        LogRequestMiddleware(logs_config.request_log_sample_rate),
+        CompressionMiddleware(),
+    ]
+    if traffic_recorder is not None:
+        middlewares.append(RecordTrafficMiddleware(traffic_recorder))
+
+    admission = api_config.admission
+    if (
+        admission.route_concurrency
+        or admission.default_concurrency
+        or admission.client_rate
+    ):
+        middlewares.append(
+            AdmissionMiddleware(
+                admission.route_concurrency,
+                admission.default_concurrency,
+                admission.max_queued,
+                admission.queue_timeout,
+                admission.client_rate,
+                admission.client_burst,
+                admission.max_clients,
+                admission.retry_after,
+            )
+        )
     return middlewares
 
 
+def _handle_query_too_complex(
+    req: Request, resp: Response, ex: QueryTooComplexError, params: dict
+):
+    """Rejects the text searches that are too expensive to be run."""
+
+    raise HTTPBadRequest(title=ex.__class__.__name__, description=ex.msg)
+
+
 def _get_incorrect_question_handler() -> IncorrectQuestionsHandler:
 
     pat: str = os.environ.get("GH_ISSUES_PAT")
@@ -69,8 +169,23 @@ def _get_incorrect_question_handler() -> IncorrectQuestionsHandler:
     return IncorrectQuestionsHandler(gh_client)
 
 
+def _get_traffic_recorder() -> TrafficRecorder | None:
+    api_config = config.get_api_config()
+    if api_config.traffic_fp is None:
+        return None
+
+    return TrafficRecorder(api_config.traffic_fp, api_config.traffic_sample_size)
+
+
+def _get_warm_up(traffic_recorder: TrafficRecorder | None) -> WarmUp:
+    if traffic_recorder is None:
+        return WarmUp()
+
+    api_config = config.get_api_config()
+    return WarmUp(traffic_recorder.popular(api_config.warm_up_requests))
+
+
 def _get_search_engine() -> QuestionSearchEngine:
     qb = QuestionBankFactory().get_question_bank("file")
     qs = QuerySearcherFactory().get_query_searcher("questions", "whoosh")
-
     return QuestionSearchEngine(qb, qs)
@@ -1,4 +1,11 @@
 from .questions_endpoint import QuestionsEndpoint
 from .incorrect_question_endpoint import IncorrectQuestionEndpoint
+from .metrics_endpoint import MetricsEndpoint
+from .readiness_endpoint import ReadinessEndpoint
 
-__all__ = ["QuestionsEndpoint", "IncorrectQuestionEndpoint"]
+__all__ = [
+    "QuestionsEndpoint",
+    "IncorrectQuestionEndpoint",
+    "MetricsEndpoint",
+    "ReadinessEndpoint",
+]
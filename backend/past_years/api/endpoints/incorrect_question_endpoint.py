@@ -1,4 +1,5 @@
-from typing import TypedDict
+import threading
+from typing import Callable, TypedDict
 from past_years.api.request import Request
 from falcon import Response, HTTPNotFound, HTTPBadRequest
 
@@ -18,11 +19,27 @@ class IncorrectQuestionRequestBody(TypedDict):
 
 
 class IncorrectQuestionEndpoint:
-    """Handles all requests to /incorrect-question."""
-
-    def __init__(self, incorrect_question_handler: IncorrectQuestionsHandler):
-
-        self._incorrect_qstn_handler = incorrect_question_handler
+    """Handles all requests to /incorrect-question.
+
+    Args:
+        get_handler: Creates the handler of the incorrect questions. It's
+            only called on the first request, since most workers never
+            get one.
+    """
+
+    def __init__(self, get_handler: Callable[[], IncorrectQuestionsHandler]):
+
+        self._get_handler = get_handler
+        self._handler: IncorrectQuestionsHandler | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def _incorrect_qstn_handler(self) -> IncorrectQuestionsHandler:
+        if self._handler is None:
+            with self._lock:
+                if self._handler is None:
+                    self._handler = self._get_handler()
+        return self._handler
 
     def on_get(self, req: Request, resp: Response, question_id: str):
         """Gets the issue url for the given question."""
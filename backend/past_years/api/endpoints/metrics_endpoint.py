@@ -0,0 +1,20 @@
+from falcon import Response
+
+from past_years.api.request import Request
+from past_years.metrics import MetricsRegistry
+
+# The content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsEndpoint:
+    """Handles all requests to /metrics."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self._registry = registry
+
+    def on_get(self, req: Request, resp: Response):
+        """Exposes all the metrics in the Prometheus text format."""
+
+        resp.text = self._registry.expose()
+        resp.content_type = PROMETHEUS_CONTENT_TYPE
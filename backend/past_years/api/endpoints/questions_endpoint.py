@@ -1,9 +1,31 @@
-from falcon import Response, HTTPNotFound
+import re
+from random import getrandbits
+from typing import Any, TypedDict
+from falcon import Response, HTTPNotFound, HTTPBadRequest, HTTPInvalidParam
+from past_years.api.handlers import StreamEncoder
+from past_years.api.projection import normalize_fields, project
 from past_years.api.request import Request
-from past_years.errors import QuestionNotFoundError
-from past_years.search import QuestionSearchEngine, Filter
+from past_years.context import ctx
+from past_years.errors import (
+    InvalidFieldsError,
+    InvalidQuestionIdError,
+    QuestionNotFoundError,
+)
+from past_years.search import QuestionSearchEngine, Filter, Question
+from past_years.search.search_types import QuestionsBatch, parse_question_id
 import msgspec
 
+# The header that's set when the text search ran out of time and only the
+# questions found until then are returned.
+SEARCH_TRUNCATED_HEADER = "X-Search-Truncated"
+
+# The field of the filter object with the invalid value in a validation error
+_ERROR_PATH_PATTERN = re.compile(r"at `\$\.(\w+)")
+
+
+class BatchRequestBody(TypedDict):
+    ids: list[str]
+
 
 class QuestionsEndpoint:
     """Handles all requests related to questions."""
@@ -12,8 +34,27 @@ class QuestionsEndpoint:
     _EXAMS = "exams"
     _SUBJECTS = "subjects"
     _YEARS = "years"
+    _EXCLUDE_EXAMS = "exclude_exams"
+    _EXCLUDE_SUBJECTS = "exclude_subjects"
+    _EXCLUDE_IDS = "exclude_ids"
     _QUERY = "q"
+    _FUZZY = "fuzzy"
+    _SORT = "sort"
+    _IDS = "ids"
+    _FIELDS = "fields"
+    _HIGHLIGHT = "highlight"
+    _PREFIX = "prefix"
+    _LIMIT = "limit"
+    _SEED = "seed"
+    _CURSOR = "cursor"
     _RANDOM_QUESTIONS_LIMIT = 5
+    _BATCH_LIMIT = 100
+    _SUGGESTIONS_LIMIT = 10
+    _SIMILAR_LIMIT = 10
+    _MAX_SUGGESTIONS_LIMIT = 50
+    _PRACTICE_LIMIT = 10
+    _MAX_PRACTICE_LIMIT = 50
+    _SEED_BITS = 32
 
     def __init__(self, search_engine: QuestionSearchEngine):
         self._search_engine = search_engine
@@ -22,18 +63,87 @@ class QuestionsEndpoint:
         """Handles requests to get a single question."""
 
         try:
-            resp.media = self._search_engine.get_question(question_id)
-        except QuestionNotFoundError as ex:
+            parsed_id = parse_question_id(question_id)
+            resp.media = self._search_engine.get_question(parsed_id)
+        except (InvalidQuestionIdError, QuestionNotFoundError) as ex:
             raise HTTPNotFound(title=ex.__class__.__name__, description=ex.msg)
 
         req.req_context.compress = False
 
+    def on_get_similar(self, req: Request, resp: Response, question_id: str):
+        """Handles requests to get the questions similar to a question."""
+
+        limit = req.get_param_as_int(
+            self._LIMIT,
+            default=self._SIMILAR_LIMIT,
+            min_value=1,
+            max_value=self._SIMILAR_LIMIT,
+        )
+        try:
+            parsed_id = parse_question_id(question_id)
+            resp.media = self._search_engine.similar(parsed_id, limit)
+        except (InvalidQuestionIdError, QuestionNotFoundError) as ex:
+            raise HTTPNotFound(title=ex.__class__.__name__, description=ex.msg)
+
+        resp.content_type = req.get_accepted_content_type()
+
     def on_get_random(self, req: Request, resp: Response):
         """Handles all requests for getting random questions."""
 
         filter = self._get_filter_object(req)
-        resp.media = self._search_engine.random(filter, self._RANDOM_QUESTIONS_LIMIT)
+        fields = self._get_fields(req)
+        questions = self._search_engine.random(filter, self._RANDOM_QUESTIONS_LIMIT)
+
+        resp.media = self._project(questions, fields)
+        resp.content_type = req.get_accepted_content_type()
+        self._set_truncated_header(resp)
+
+    def on_get_practice(self, req: Request, resp: Response):
+        """Handles requests for the next questions of a practice session.
+
+        A new session is started when no seed is given, with the seed being
+        returned so that the next questions can be asked for.
+        """
+
+        filter = self._get_filter_object(req)
+        fields = self._get_fields(req)
+        seed = req.get_param_as_int(
+            self._SEED, min_value=0, max_value=2**self._SEED_BITS - 1
+        )
+        if seed is None:
+            seed = getrandbits(self._SEED_BITS)
+        cursor = req.get_param_as_int(self._CURSOR, default=0, min_value=0)
+        limit = req.get_param_as_int(
+            self._LIMIT,
+            default=self._PRACTICE_LIMIT,
+            min_value=1,
+            max_value=self._MAX_PRACTICE_LIMIT,
+        )
+
+        session = self._search_engine.practice(filter, seed, cursor, limit)
+
+        session.questions = self._project(session.questions, fields)
+        resp.media = session
         resp.content_type = req.get_accepted_content_type()
+        self._set_truncated_header(resp)
+
+    def on_get_batch(self, req: Request, resp: Response):
+        """Handles requests to get multiple questions by their ids."""
+
+        question_ids = req.get_param_as_list(self._IDS, default=[])
+        self._get_batch(req, resp, question_ids)
+
+    def on_post_batch(self, req: Request, resp: Response):
+        """Handles requests to get multiple questions by their ids, where
+        the ids are given in the body."""
+
+        req_data = req.bounded_stream.read()
+        try:
+            req_body = msgspec.json.decode(req_data, type=BatchRequestBody)
+        except (msgspec.ValidationError, msgspec.DecodeError):
+            raise HTTPBadRequest(title="Invalid body")
+
+        self._get_batch(req, resp, req_body["ids"])
 
     def on_get_metadata(self, req: Request, resp: Response):
         """Handles requests for getting the metadata of the questions."""
@@ -41,13 +151,169 @@ class QuestionsEndpoint:
         resp.media = self._search_engine.questions_metadata()
         req.req_context.compress = False
 
+    def on_get_count(self, req: Request, resp: Response):
+        """Handles requests for the number of questions that satisfy
+        the filter."""
+
+        filter = self._get_filter_object(req)
+        resp.media = {"count": self._search_engine.count(filter)}
+
+        req.req_context.compress = False
+        self._set_truncated_header(resp)
+
+    def on_get_suggest(self, req: Request, resp: Response):
+        """Handles requests for suggesting the terms to search for."""
+
+        prefix = req.get_param(self._PREFIX, required=True)
+        limit = req.get_param_as_int(
+            self._LIMIT,
+            default=self._SUGGESTIONS_LIMIT,
+            min_value=1,
+            max_value=self._MAX_SUGGESTIONS_LIMIT,
+        )
+        filter = self._get_filter_object(req)
+
+        resp.media = self._search_engine.suggest(prefix, filter, limit)
+        req.req_context.compress = False
+
     def on_get_filter(self, req: Request, resp: Response):
         """Handles all requests for getting filtered questions."""
 
         filter = self._get_filter_object(req)
-        resp.media = self._search_engine.search(filter)
+        fields = self._get_fields(req)
+
+        self._filter(req, resp, filter, fields)
+
+        self._set_truncated_header(resp)
+
+    def _filter(
+        self,
+        req: Request,
+        resp: Response,
+        filter: Filter,
+        fields: tuple[str, ...] | None,
+    ):
+        """Sets the questions that satisfy the filter as the response."""
+
+        stream_content_type = req.get_stream_content_type()
+        if stream_content_type:
+            questions = self._search_engine.iter_search(filter)
+            if fields:
+                questions = project(questions, fields)
+            resp.stream = StreamEncoder(stream_content_type).encode(questions)
+            resp.content_type = stream_content_type
+            return
+
+        if req.get_param_as_bool(self._HIGHLIGHT, default=False):
+            results = self._search_engine.highlighted_search(filter)
+            results.questions = self._project(results.questions, fields)
+            resp.media = results
+        else:
+            questions = self._search_engine.search(filter)
+            resp.media = self._project(questions, fields)
         resp.content_type = req.get_accepted_content_type()
 
+    def _get_batch(self, req: Request, resp: Response, question_ids: list[str]):
+        """Sets the questions with the given ids as the response."""
+
+        if len(question_ids) > self._BATCH_LIMIT:
+            raise HTTPBadRequest(
+                title="Too many ids",
+                description=f"At most {self._BATCH_LIMIT} ids can be requested",
+            )
+
+        parsed_ids: list[int] = []
+        invalid_ids: list[str] = []
+        for question_id in question_ids:
+            try:
+                parsed_ids.append(parse_question_id(question_id))
+            except InvalidQuestionIdError:
+                invalid_ids.append(question_id)
+
+        fields = self._get_fields(req)
+        batch = self._search_engine.get_questions(parsed_ids)
+        batch.missing.extend(invalid_ids)
+        if fields:
+            batch = QuestionsBatch(
+                self._project(batch.questions, fields), batch.missing
+            )
+
+        resp.media = batch
+        resp.content_type = req.get_accepted_content_type()
+
+    def _set_truncated_header(self, resp: Response):
+        """Flags the response if the text search returned partial results."""
+
+        if ctx.search_truncated:
+            resp.set_header(SEARCH_TRUNCATED_HEADER, "true")
+
+    def _get_fields(self, req: Request) -> tuple[str, ...] | None:
+        """Returns the fields of the questions to be returned, if they are
+        restricted by the request."""
+
+        fields = req.get_param_as_list(self._FIELDS)
+        if not fields:
+            return None
+
+        try:
+            return normalize_fields(fields)
+        except InvalidFieldsError as ex:
+            raise HTTPBadRequest(title=ex.__class__.__name__, description=ex.msg)
+
+    def _project(
+        self, questions: list[Question], fields: tuple[str, ...] | None
+    ) -> list:
+        """Projects the questions onto the fields, if any are given."""
+
+        if not fields:
+            return questions
+
+        return list(project(questions, fields))
+
+    def _get_years(self, req: Request) -> dict[str, list]:
+        """Returns the years and the ranges of the years (e.g. `2010..2020`)
+        to filter with, keyed by their fields in the filter object."""
+
+        years: list[int] = []
+        year_ranges: list[tuple[int, int]] = []
+        for value in req.get_param_as_list(self._YEARS, default=[]):
+            first_year, sep, last_year = value.partition("..")
+            try:
+                if sep:
+                    year_ranges.append((int(first_year), int(last_year)))
+                else:
+                    years.append(int(value))
+            except ValueError:
+                raise HTTPInvalidParam(
+                    "The years must be years or ranges of years e.g. 2010..2020",
+                    self._YEARS,
+                )
+
+        if any(first_year > last_year for first_year, last_year in year_ranges):
+            raise HTTPInvalidParam(
+                "The ranges of years must start before they end", self._YEARS
+            )
+
+        filter_dict: dict[str, list] = {}
+        if years:
+            filter_dict["years"] = years
+        if year_ranges:
+            filter_dict["year_ranges"] = year_ranges
+        return filter_dict
+
+    def _get_excluded_ids(self, req: Request) -> dict[str, list[int]]:
+        """Returns the IDs of the questions to leave out, keyed by their
+        field in the filter object."""
+
+        question_ids = req.get_param_as_list(self._EXCLUDE_IDS)
+        if not question_ids:
+            return {}
+
+        try:
+            return {"exclude_ids": [parse_question_id(id) for id in question_ids]}
+        except InvalidQuestionIdError as ex:
+            raise HTTPBadRequest(title=ex.__class__.__name__, description=ex.msg)
+
     def _get_filter_object(self, req: Request) -> Filter:
         """Returns the filter object parsed from the request query string.
 
@@ -61,25 +327,31 @@ class QuestionsEndpoint:
         def lowercase(s: str) -> str:
             return s.lower()
 
-        filter_dict: dict[str, list[str] | str] = {}
+        filter_dict: dict[str, Any] = {}
 
         req.get_param(self._QUERY, store=filter_dict)
+        req.get_param_as_bool(self._FUZZY, store=filter_dict)
+        req.get_param(self._SORT, store=filter_dict)
         req.get_param_as_list(self._EXAMS, store=filter_dict, transform=uppercase)
         req.get_param_as_list(self._SUBJECTS, store=filter_dict, transform=lowercase)
-        req.get_param_as_list(self._YEARS, store=filter_dict, transform=int)
+        req.get_param_as_list(
+            self._EXCLUDE_EXAMS, store=filter_dict, transform=uppercase
+        )
+        req.get_param_as_list(
+            self._EXCLUDE_SUBJECTS, store=filter_dict, transform=lowercase
+        )
+        filter_dict.update(self._get_years(req))
+        filter_dict.update(self._get_excluded_ids(req))
 
         try:
             filter_obj = msgspec.from_builtins(filter_dict, type=Filter)
             return filter_obj
         except msgspec.ValidationError as ex:
+            # The path of the invalid value e.g. "... - at `$.exclude_exams[0]`"
             error_msg = str(ex)
-            if self._EXAMS in error_msg:
-                param = self._EXAMS.title()
-            elif self._SUBJECTS in error_msg:
-                param = self._SUBJECTS.title()
-            elif self._YEARS in error_msg:
-                param = self._YEARS.title()
-            else:
-                param = "Query"
-
-            raise Exception(param)
+            match = _ERROR_PATH_PATTERN.search(error_msg)
+            param = match.group(1) if match else self._QUERY
+            if param == "year_ranges":
+                param = self._YEARS
+
+            raise HTTPInvalidParam(error_msg, param)
@@ -0,0 +1,24 @@
+from falcon import HTTP_503, Response
+
+from past_years.api.request import Request
+from past_years.api.traffic import WarmUp
+
+
+class ReadinessEndpoint:
+    """Handles all requests to /ready.
+
+    The application is ready once it has been warmed up, until which the
+    requests are responded to with a 503.
+    """
+
+    def __init__(self, warm_up: WarmUp):
+        self._warm_up = warm_up
+
+    def on_get(self, req: Request, resp: Response):
+        """Reports whether the application is ready to serve the traffic."""
+
+        ready = self._warm_up.is_ready
+        resp.media = {"ready": ready, "warmed_up": self._warm_up.replayed}
+        if not ready:
+            resp.status = HTTP_503
+        req.req_context.compress = False
@@ -1,3 +1,4 @@
 from .media_handlers import MsgPackHandler, JSONHandler
+from .stream_handlers import StreamEncoder, gzip_stream
 
-__all__ = ["MsgPackHandler", "JSONHandler"]
+__all__ = ["MsgPackHandler", "JSONHandler", "StreamEncoder", "gzip_stream"]
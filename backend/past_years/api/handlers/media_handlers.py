@@ -4,6 +4,8 @@ import falcon
 
 import msgspec
 
+from past_years.metrics import timed_stage
+
 
 class MsgPackHandler(BaseHandler):
     """A custom MsgPack handler using `msgspec`."""
@@ -15,7 +17,8 @@ class MsgPackHandler(BaseHandler):
         is `application/msgpack`."""
 
         assert content_type == falcon.MEDIA_MSGPACK
-        return self._encoder.encode(media)
+        with timed_stage("serialize"):
+            return self._encoder.encode(media)
 
 
 class JSONHandler(BaseHandler):
@@ -26,7 +29,8 @@ class JSONHandler(BaseHandler):
 
     def serialize(self, media: Any, content_type: str) -> bytes:
         assert content_type == falcon.MEDIA_JSON
-        return self._encoder.encode(media)
+        with timed_stage("serialize"):
+            return self._encoder.encode(media)
 
     def deserialize(self, stream, content_type, content_length) -> object:
         return self._decoder.decode(stream.read())
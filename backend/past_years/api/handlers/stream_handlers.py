@@ -0,0 +1,75 @@
+"""Encoders for streaming responses.
+
+The items are encoded in chunks so that the full response is never held
+in memory at once.
+"""
+import itertools
+import zlib
+from typing import Any, Iterable, Iterator
+
+import msgspec
+
+# The media types of the streaming responses
+MEDIA_NDJSON = "application/x-ndjson"
+MEDIA_MSGPACK_STREAM = "application/x-msgpack-stream"
+
+STREAM_MEDIA_TYPES = (MEDIA_NDJSON, MEDIA_MSGPACK_STREAM)
+
+# The number of items encoded into a single chunk
+DEFAULT_CHUNK_SIZE = 64
+
+# The `wbits` to use with `zlib` to get a gzip container
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class StreamEncoder:
+    """Encodes items into a stream of chunks.
+
+    With NDJSON, each item is a JSON document on its own line. With the
+    msgpack stream, the items are simply concatenated msgpack objects.
+
+    Args:
+        content_type: One of the streaming media types.
+        chunk_size: The number of items encoded into each chunk.
+    """
+
+    _json_encoder = msgspec.json.Encoder()
+    _msgpack_encoder = msgspec.msgpack.Encoder()
+
+    def __init__(self, content_type: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if content_type == MEDIA_NDJSON:
+            self._encoder, self._separator = self._json_encoder, b"\n"
+        elif content_type == MEDIA_MSGPACK_STREAM:
+            self._encoder, self._separator = self._msgpack_encoder, b""
+        else:
+            raise ValueError(f"'{content_type}' is not a streaming media type")
+
+        self._chunk_size = chunk_size
+
+    def encode(self, items: Iterable[Any]) -> Iterator[bytes]:
+        """Lazily encodes the items into chunks."""
+
+        items = iter(items)
+        while chunk := list(itertools.islice(items, self._chunk_size)):
+            buffer = bytearray()
+            for item in chunk:
+                self._encoder.encode_into(item, buffer, -1)
+                buffer.extend(self._separator)
+
+            yield bytes(buffer)
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Incrementally compresses the chunks with gzip.
+
+    Each chunk is flushed so that the client can start decoding the
+    items as soon as they are received.
+    """
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
@@ -1,4 +1,13 @@
 from .logging_middleware import LogRequestMiddleware
 from .compression_middleware import CompressionMiddleware
+from .metrics_middleware import MetricsMiddleware
+from .traffic_middleware import RecordTrafficMiddleware
+from .admission_middleware import AdmissionMiddleware
 
-__all__ = ["LogRequestMiddleware", "CompressionMiddleware"]
+__all__ = [
+    "LogRequestMiddleware",
+    "CompressionMiddleware",
+    "MetricsMiddleware",
+    "RecordTrafficMiddleware",
+    "AdmissionMiddleware",
+]
@@ -0,0 +1,196 @@
+import time
+from collections import OrderedDict
+from threading import BoundedSemaphore, Lock
+from typing import Any
+
+from falcon import HTTPServiceUnavailable, HTTPTooManyRequests, Response
+
+from past_years.api.request import Request
+from past_years.api.traffic import is_warm_up_request
+from past_years.metrics import SHED_REQUESTS
+
+# The routes that are never limited, so that the health of an overloaded
+# worker can still be checked.
+EXEMPT_ROUTES = ("/metrics", "/ready")
+
+
+class AdmissionMiddleware:
+    """Sheds the requests that a worker is too overloaded to handle in
+    time, as well as those from clients making too many requests.
+
+    Each route can be limited to a number of requests being handled at
+    once, so that the expensive routes (e.g. text searches) can't take up
+    all the threads of a worker and starve the cheap ones. The requests
+    beyond the limit wait in a bounded queue, and are rejected with a 503
+    once the queue is full or they've waited too long.
+
+    Each client is rate limited with a token bucket, with the requests
+    beyond the limit being rejected with a 429.
+
+    The requests replayed during the warm up are never limited, since they
+    all come from the worker itself before it's ready.
+
+    Args:
+        route_concurrency: The maximum number of requests handled at once
+            for each route.
+        default_concurrency: The maximum number of requests handled at
+            once for the other routes. If `0`, they're not limited.
+        max_queued: The maximum number of requests waiting for each route.
+        queue_timeout: The number of seconds a request waits for a route.
+        client_rate: The number of requests per second each client can
+            make. If `0`, the clients are not rate limited.
+        client_burst: The maximum number of requests a client can make
+            at once.
+        max_clients: The maximum number of clients that are tracked.
+        retry_after: The number of seconds after which the rejected
+            requests are asked to be retried.
+    """
+
+    def __init__(
+        self,
+        route_concurrency: dict[str, int] | None = None,
+        default_concurrency: int = 0,
+        max_queued: int = 0,
+        queue_timeout: float = 1.0,
+        client_rate: float = 0,
+        client_burst: int = 20,
+        max_clients: int = 10000,
+        retry_after: int = 1,
+    ):
+        self._route_concurrency = route_concurrency or {}
+        self._default_concurrency = default_concurrency
+        self._max_queued = max_queued
+        self._queue_timeout = queue_timeout
+        self._retry_after = retry_after
+
+        self._limiters: dict[str, _ConcurrencyLimiter | None] = {}
+        self._limiters_lock = Lock()
+        self._rate_limiter = (
+            _RateLimiter(client_rate, client_burst, max_clients)
+            if client_rate > 0
+            else None
+        )
+
+    def process_resource(
+        self, req: Request, resp: Response, resource: Any, params: dict[str, Any]
+    ):
+        """Admits the request or rejects it if the client has made too many
+        requests or the route is saturated."""
+
+        route = req.uri_template
+        if (
+            resource is None
+            or route is None
+            or route in EXEMPT_ROUTES
+            or is_warm_up_request(req.env)
+        ):
+            return
+
+        if self._rate_limiter is not None:
+            wait_time = self._rate_limiter.take(req.remote_addr)
+            if wait_time:
+                SHED_REQUESTS.inc(route=route, reason="rate_limit")
+                raise HTTPTooManyRequests(retry_after=max(1, round(wait_time)))
+
+        limiter = self._get_limiter(route)
+        if limiter is None:
+            return
+
+        if not limiter.acquire(self._max_queued, self._queue_timeout):
+            SHED_REQUESTS.inc(route=route, reason="overload")
+            raise HTTPServiceUnavailable(retry_after=self._retry_after)
+        req.req_context.admitted_route = route
+
+    def process_response(
+        self, req: Request, resp: Response, resource: Any, request_success: bool
+    ):
+        """Frees up the route for the next request."""
+
+        route = req.req_context.admitted_route
+        if route is not None:
+            req.req_context.admitted_route = None
+            self._limiters[route].release()  # type: ignore
+
+    def _get_limiter(self, route: str) -> "_ConcurrencyLimiter | None":
+        try:
+            return self._limiters[route]
+        except KeyError:
+            pass
+
+        with self._limiters_lock:
+            if route not in self._limiters:
+                limit = self._route_concurrency.get(route, self._default_concurrency)
+                self._limiters[route] = _ConcurrencyLimiter(limit) if limit else None
+            return self._limiters[route]
+
+
+class _ConcurrencyLimiter:
+    """Limits the number of requests being handled at once."""
+
+    def __init__(self, limit: int):
+        self._slots = BoundedSemaphore(limit)
+        self._queued = 0
+        self._lock = Lock()
+
+    def acquire(self, max_queued: int, timeout: float) -> bool:
+        """Waits for a slot, returning `False` if there are already too
+        many waiting or if it's not freed up in time."""
+
+        if self._slots.acquire(blocking=False):
+            return True
+
+        with self._lock:
+            if self._queued >= max_queued:
+                return False
+            self._queued += 1
+
+        try:
+            return self._slots.acquire(timeout=timeout)
+        finally:
+            with self._lock:
+                self._queued -= 1
+
+    def release(self):
+        self._slots.release()
+
+
+class _RateLimiter:
+    """Rate limits each client with a token bucket.
+
+    Only the most recently seen clients are tracked, since a client that
+    hasn't been seen in a while would have a full bucket anyway.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int):
+        self._rate = rate
+        self._burst = burst
+        self._max_clients = max_clients
+
+        # The number of tokens left and when they were last refilled
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, client: str) -> float:
+        """Takes a token from the client's bucket.
+
+        Returns:
+            `0` if a token was taken, else the number of seconds until the
+            next token is available.
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            tokens, refilled_at = self._buckets.pop(client, (self._burst, now))
+            tokens = min(self._burst, tokens + (now - refilled_at) * self._rate)
+
+            wait_time = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait_time = (1 - tokens) / self._rate
+
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self._max_clients:
+                self._buckets.popitem(last=False)
+
+        return wait_time
@@ -2,7 +2,9 @@ import gzip
 
 from falcon import Response
 
+from past_years.api.handlers import gzip_stream
 from past_years.api.request import Request
+from past_years.metrics import COMPRESSION_RATIO, timed_stage
 
 
 class CompressionMiddleware:
@@ -25,10 +27,24 @@ class CompressionMiddleware:
         if not content_encoding or self._COMPRESSION not in content_encoding:
             return
 
+        if resp.stream is not None:
+            # Only streams of chunks are compressed, i.e. not file-like
+            # objects.
+            if hasattr(resp.stream, "read"):
+                return
+
+            resp.stream = gzip_stream(resp.stream)
+            resp.set_header("content-encoding", self._COMPRESSION)
+            return
+
         data = resp.render_body()
         if not data:
             return
 
         assert isinstance(data, bytes)
-        resp.data = gzip.compress(data)
+        with timed_stage("compress"):
+            resp.data = gzip.compress(data)
+        route = req.uri_template or ""
+        COMPRESSION_RATIO.observe(len(resp.data) / len(data), route=route)
+
         resp.set_header("content-encoding", self._COMPRESSION)
@@ -1,19 +1,28 @@
+import random
 import time
 from typing import Any
-from uuid import uuid1
 
 from past_years.api.request import Request
-from falcon import Response
+from falcon import Response, http_status_to_code
 from loguru import logger
 
 from past_years.context import ctx
+from past_years.utils import new_request_id
 
 START_TIME = "start-time"
 REQUEST_ID_HEADER = "X-Request-Id"
 
 
 class LogRequestMiddleware:
-    """Logs all the requests."""
+    """Logs all the requests.
+
+    Args:
+        sample_rate: The fraction of successful requests that are logged.
+            Requests that fail are always logged.
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        self._sample_rate = sample_rate
 
     def process_request(self, req: Request, resp: Response):
         """Creates a unique ID for each request and sets the start time of the
@@ -21,9 +30,10 @@ class LogRequestMiddleware:
 
         req.req_context.request_start_time = time.monotonic_ns()
 
-        request_id = str(uuid1())
+        request_id = new_request_id()
         ctx.request_id = request_id
-        resp.set_header(REQUEST_ID_HEADER, ctx.request_id)
+        ctx.search_truncated = False
+        resp.set_header(REQUEST_ID_HEADER, request_id)
 
     def process_response(
         self, req: Request, resp: Response, resource: Any, request_success: bool
@@ -32,11 +42,21 @@ class LogRequestMiddleware:
 
         NOTE: Processes the request after it's been processed by the resource."""
 
+        if (
+            request_success
+            and random.random() >= self._sample_rate
+            and http_status_to_code(resp.status) < 400
+        ):
+            return
+
         # NOTE: `elapsed_time` becomes -ve if the request was never
         # properly routed i.e. 404 HTTP Status.
         # This is because the start time is set to 0 by default.
         elapsed_time = time.monotonic_ns() - req.req_context.request_start_time
         logger.info(
-            f"{req.method} {req.path} {resp.status} {elapsed_time}",
-            request_id=ctx.request_id,
+            "{} {} {} {} ms",
+            req.method,
+            req.path,
+            resp.status,
+            round(elapsed_time * 1e-6, 3),
         )
@@ -0,0 +1,61 @@
+import time
+from typing import Any
+
+from falcon import Response, http_status_to_code
+
+from past_years.api.request import Request
+from past_years.api.traffic import is_warm_up_request
+from past_years.context import ctx
+from past_years.metrics import (
+    REQUEST_LATENCY,
+    RESPONSE_SIZE,
+    format_server_timing,
+)
+
+SERVER_TIMING_HEADER = "Server-Timing"
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Records the metrics of each request and adds the `Server-Timing`
+    header to the response."""
+
+    def process_request(self, req: Request, resp: Response):
+        """Resets the stage timings and sets the start time of the request."""
+
+        ctx.server_timings = []
+        req.req_context.metrics_start_time = time.perf_counter_ns()
+
+    def process_response(
+        self, req: Request, resp: Response, resource: Any, request_success: bool
+    ):
+        """Records the latency and size of the response, unless the request
+        was replayed during the warm up.
+
+        NOTE: This must run after the `CompressionMiddleware` has processed
+        the response so that the size of the compressed response is recorded.
+        """
+
+        if is_warm_up_request(req.env):
+            return
+
+        route = req.uri_template or UNMATCHED_ROUTE
+
+        # Rendering the body here, if it wasn't already rendered while
+        # compressing, so that the serialization is included in the
+        # total time. The rendered body is cached by Falcon.
+        body_size = 0
+        if resp.stream is None:
+            body = resp.render_body()
+            body_size = len(body) if body else 0
+        RESPONSE_SIZE.observe(body_size, route=route)
+
+        start_time = req.req_context.metrics_start_time
+        elapsed_time = (time.perf_counter_ns() - start_time) * 1e-9
+        status = str(http_status_to_code(resp.status))
+        REQUEST_LATENCY.observe(
+            elapsed_time, method=req.method, route=route, status=status
+        )
+
+        timings = [*ctx.server_timings, ("total", elapsed_time)]
+        resp.set_header(SERVER_TIMING_HEADER, format_server_timing(timings))
@@ -0,0 +1,37 @@
+from typing import Any
+
+from falcon import Response, http_status_to_code
+
+from past_years.api.request import Request
+from past_years.api.traffic import TrafficRecorder, is_warm_up_request
+
+# Only the requests to these routes are replayed during the warm up.
+RECORDED_ROUTE_PREFIX = "/questions"
+
+
+class RecordTrafficMiddleware:
+    """Records the successful requests for the questions, so that the
+    popular ones can be replayed to warm up the caches on the next start.
+
+    Args:
+        recorder: The recorder of the popular requests.
+    """
+
+    def __init__(self, recorder: TrafficRecorder):
+        self._recorder = recorder
+
+    def process_response(
+        self, req: Request, resp: Response, resource: Any, request_success: bool
+    ):
+        """Records the request if it was a successful one for the questions."""
+
+        if (
+            not request_success
+            or req.method != "GET"
+            or not (req.uri_template or "").startswith(RECORDED_ROUTE_PREFIX)
+            or http_status_to_code(resp.status) >= 400
+            or is_warm_up_request(req.env)
+        ):
+            return
+
+        self._recorder.record(req.path, req.query_string)
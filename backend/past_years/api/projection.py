@@ -0,0 +1,63 @@
+"""Projections of questions onto a subset of their fields, i.e. sparse
+fieldsets."""
+from functools import lru_cache
+from operator import attrgetter
+from typing import Callable, Iterable, Iterator, Type, get_type_hints
+
+import msgspec
+from msgspec import Struct
+
+from past_years.errors import InvalidFieldsError
+from past_years.search import Question
+
+QUESTION_FIELDS: tuple[str, ...] = Question.__struct_fields__
+"""The fields of a question in the order they are encoded in."""
+
+_QUESTION_TYPES = get_type_hints(Question)
+
+
+def normalize_fields(fields: Iterable[str]) -> tuple[str, ...]:
+    """Returns the given fields deduplicated and in the order of the
+    fields of a question.
+
+    Raises:
+        InvalidFieldsError: If any of the fields is not a field of a question.
+    """
+
+    fields = set(fields)
+    invalid_fields = fields.difference(QUESTION_FIELDS)
+    if invalid_fields:
+        raise InvalidFieldsError(invalid_fields)
+
+    return tuple(f for f in QUESTION_FIELDS if f in fields)
+
+
+def project(questions: Iterable[Question], fields: tuple[str, ...]) -> Iterator:
+    """Lazily projects the questions onto the given normalized fields."""
+
+    return map(_get_projector(fields), questions)
+
+
+# ----- Helpers -----
+
+
+@lru_cache(maxsize=None)
+def _get_projector(fields: tuple[str, ...]) -> Callable[[Question], Struct]:
+    """Returns a function that projects a question onto the given fields.
+
+    The projections are dedicated structs, created once per set of fields,
+    so that they are encoded as efficiently as the questions themselves.
+    """
+
+    projection_type = _get_projection_type(fields)
+    getter = attrgetter(*fields)
+
+    if len(fields) == 1:
+        return lambda q: projection_type(getter(q))
+    return lambda q: projection_type(*getter(q))
+
+
+def _get_projection_type(fields: tuple[str, ...]) -> Type[Struct]:
+    return msgspec.defstruct(
+        "QuestionProjection", [(f, _QUESTION_TYPES[f]) for f in fields]
+    )
@@ -2,6 +2,7 @@ from typing import Literal
 from falcon import Request as FalconRequest
 from falcon import MEDIA_JSON, MEDIA_MSGPACK
 
+from .handlers.stream_handlers import STREAM_MEDIA_TYPES
 from .request_context import RequestContext
 
 MEDIA_TYPES = Literal["application/json", "application/msgpack"]
@@ -23,3 +24,19 @@ class Request(FalconRequest):
             return MEDIA_MSGPACK
 
         return MEDIA_JSON
+
+    def get_stream_content_type(self) -> str | None:
+        """Returns the streaming media type the client explicitly asked
+        for, if any.
+
+        Streaming is never used unless it is explicitly asked for, since
+        clients that accept anything are expected to handle a single
+        document.
+        """
+
+        accept = self.accept
+        for media_type in STREAM_MEDIA_TYPES:
+            if media_type in accept:
+                return media_type
+
+        return None
@@ -10,3 +10,10 @@ class RequestContext:
 
     request_start_time: int = 0
     """The time the request was started to be processed."""
+
+    metrics_start_time: int = 0
+    """The time at which the metrics of the request started being recorded."""
+
+    admitted_route: str | None = None
+    """The route whose concurrency limit the request was admitted under,
+    if any."""
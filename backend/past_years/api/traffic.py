@@ -0,0 +1,245 @@
+"""Recording of the popular requests and replaying them to warm up the
+caches after a deploy.
+
+The recorder keeps a rolling sample of the most requested paths (along
+with their query strings) which is saved to a file every so often. When
+the application starts, the most popular of the saved requests are
+replayed through the application so that the Whoosh readers, the OS page
+cache and the in-memory caches are warm before the real traffic arrives.
+"""
+from __future__ import annotations
+
+import fcntl
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+import msgspec
+from loguru import logger
+from msgspec import Struct
+
+# The WSGI environ key that marks the requests replayed during the warm
+# up, so that they aren't recorded as traffic or limited by the admission
+# control. Unlike a header, it can't be set by the clients.
+WARM_UP_ENVIRON_KEY = "past_years.warm_up"
+
+
+class RecordedRequest(Struct, array_like=True):
+    """A request along with the (decayed) number of times it was made."""
+
+    path: str
+    query_string: str
+    count: float
+
+
+class TrafficRecorder:
+    """Keeps a rolling sample of the most popular requests.
+
+    Once the number of distinct requests is twice the sample size, only
+    the most popular `sample_size` requests are kept and their counts are
+    halved. So, the requests that stop being popular are eventually
+    dropped.
+
+    Every worker records its own requests, and the requests recorded since
+    it last saved are merged into the file, so the file holds the traffic
+    of all the workers. The sample is saved in a background thread so that
+    the requests don't wait on the file.
+
+    Args:
+        fp: The path to the file the sample is saved to and loaded from.
+        sample_size: The number of distinct requests that are kept.
+        save_interval: The minimum number of seconds between saving the
+            sample to the file.
+    """
+
+    def __init__(self, fp: Path, sample_size: int = 1000, save_interval: float = 60):
+        self._fp = fp
+        self._sample_size = sample_size
+        self._save_interval = save_interval
+
+        self._counts: dict[tuple[str, str], float] = {}
+        # The requests recorded since the sample was last saved
+        self._unsaved: dict[tuple[str, str], float] = {}
+        self._last_saved = time.monotonic()
+        self._lock = threading.Lock()
+        self._save_thread: threading.Thread | None = None
+
+        for request in _load_requests(fp):
+            self._counts[(request.path, request.query_string)] = request.count
+
+    def record(self, path: str, query_string: str):
+        """Records a request, saving the sample in the background if it's due."""
+
+        key = (path, query_string)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._unsaved[key] = self._unsaved.get(key, 0) + 1
+            if len(self._counts) >= 2 * self._sample_size:
+                self._counts = self._decay(self._counts)
+            if len(self._unsaved) >= 2 * self._sample_size:
+                self._unsaved = self._top(self._unsaved)
+
+            saving = self._save_thread is not None and self._save_thread.is_alive()
+            save_thread = None
+            if (
+                not saving
+                and time.monotonic() - self._last_saved >= self._save_interval
+            ):
+                self._last_saved = time.monotonic()
+                save_thread = threading.Thread(
+                    target=self.save, name="traffic-save", daemon=True
+                )
+                self._save_thread = save_thread
+
+        if save_thread is not None:
+            save_thread.start()
+
+    def popular(self, n: int) -> list[RecordedRequest]:
+        """Returns the `n` most popular requests, the most popular first."""
+
+        with self._lock:
+            counts = list(self._counts.items())
+
+        counts.sort(key=lambda item: item[1], reverse=True)
+        return [
+            RecordedRequest(path, query_string, count)
+            for (path, query_string), count in counts[:n]
+        ]
+
+    def save(self):
+        """Merges the requests recorded since the last save into the file.
+
+        The file is locked while it's merged into, since every worker saves
+        to the same file, and it's replaced atomically so that it's never
+        read half written.
+        """
+
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+
+        try:
+            with open(self._fp.with_name(f"{self._fp.name}.lock"), "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+                counts = {
+                    (request.path, request.query_string): request.count
+                    for request in _load_requests(self._fp)
+                }
+                for key, count in unsaved.items():
+                    counts[key] = counts.get(key, 0) + count
+                if len(counts) >= 2 * self._sample_size:
+                    counts = self._decay(counts)
+
+                requests = [
+                    RecordedRequest(path, query_string, count)
+                    for (path, query_string), count in counts.items()
+                ]
+                tmp_fp = self._fp.with_name(f"{self._fp.name}.{os.getpid()}.tmp")
+                tmp_fp.write_bytes(msgspec.json.encode(requests))
+                os.replace(tmp_fp, self._fp)
+        except OSError:
+            logger.exception("Could not save the traffic sample to {}", self._fp)
+            with self._lock:
+                for key, count in unsaved.items():
+                    self._unsaved[key] = self._unsaved.get(key, 0) + count
+            return
+
+        # The sample of all the workers is more representative.
+        with self._lock:
+            for key, count in self._unsaved.items():
+                counts[key] = counts.get(key, 0) + count
+            self._counts = counts
+
+    def _decay(
+        self, counts: dict[tuple[str, str], float]
+    ) -> dict[tuple[str, str], float]:
+        return {key: count / 2 for key, count in self._top(counts).items()}
+
+    def _top(
+        self, counts: dict[tuple[str, str], float]
+    ) -> dict[tuple[str, str], float]:
+        top = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        return dict(top[: self._sample_size])
+
+
+class WarmUp:
+    """Warms up the application by replaying the recorded requests.
+
+    Args:
+        requests: The requests to replay, in the order they're replayed.
+    """
+
+    def __init__(self, requests: Iterable[RecordedRequest] = ()):
+        self._requests = list(requests)
+        self._done = threading.Event()
+        self.replayed = 0
+
+    @property
+    def is_ready(self) -> bool:
+        """Indicates whether the warm up is over."""
+
+        return self._done.is_set()
+
+    def run(self, app: Callable):
+        """Replays the requests through the WSGI application."""
+
+        from falcon.testing import create_environ
+
+        start_time = time.perf_counter_ns()
+        try:
+            for request in self._requests:
+                environ = create_environ(
+                    request.path,
+                    request.query_string,
+                    headers={"Accept": "application/json"},
+                )
+                environ[WARM_UP_ENVIRON_KEY] = True
+                statuses: list[str] = []
+                try:
+                    body = app(environ, lambda status, *_: statuses.append(status))
+                    for _ in body:
+                        pass
+                    if hasattr(body, "close"):
+                        body.close()
+                    if statuses and statuses[0].startswith("2"):
+                        self.replayed += 1
+                    else:
+                        logger.warning("Replaying {} failed", request.path)
+                except Exception:
+                    logger.exception("Could not replay {}", request.path)
+        finally:
+            self._done.set()
+
+        elapsed_time = (time.perf_counter_ns() - start_time) * 1e-6
+        logger.info(
+            "Warmed up with {} requests in {} ms", self.replayed, round(elapsed_time, 3)
+        )
+
+    def start(self, app: Callable) -> threading.Thread:
+        """Replays the requests in a background thread."""
+
+        thread = threading.Thread(target=self.run, args=(app,), daemon=True)
+        thread.start()
+        return thread
+
+
+def is_warm_up_request(env: dict) -> bool:
+    """Indicates whether the request with the given WSGI environ was
+    replayed during the warm up."""
+
+    return env.get(WARM_UP_ENVIRON_KEY) is True
+
+
+# ----- Helpers -----
+
+
+def _load_requests(fp: Path) -> list[RecordedRequest]:
+    try:
+        return msgspec.json.decode(fp.read_bytes(), type=list[RecordedRequest])
+    except FileNotFoundError:
+        return []
+    except (msgspec.DecodeError, msgspec.ValidationError):
+        logger.warning("Ignoring the invalid traffic sample at {}", fp)
+        return []
@@ -0,0 +1,66 @@
+"""In-memory caches."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Generic, Hashable, TypeVar
+
+from past_years.metrics import record_cache_lookup
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class LRUCache(Generic[_K, _V]):
+    """A thread safe cache that holds the `maxsize` most recently used
+    values.
+
+    The lookups are recorded in the cache metrics under `name`.
+
+    Args:
+        name: The name of the cache used in the metrics.
+        maxsize: The maximum number of values held by the cache.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+
+        self._values: OrderedDict[_K, _V] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: _K) -> _V | None:
+        """Returns the value of the key, if it's cached."""
+
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                self._values.move_to_end(key)
+
+        record_cache_lookup(self.name, value is not None)
+        return value
+
+    def put(self, key: _K, value: _V):
+        """Caches the value of the key, evicting the least recently used
+        value if the cache is full."""
+
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            if len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def clear(self):
+        """Removes all the cached values."""
+
+        with self._lock:
+            self._values.clear()
+
+    def __contains__(self, key: _K) -> bool:
+        return key in self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
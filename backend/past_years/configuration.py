@@ -9,18 +9,76 @@ from msgspec import Struct
 import msgspec
 
 from past_years.errors import ConfigNotFoundError, InvalidConfigFileError
+from past_years.metrics import timed_startup_phase
 
 _LogLevel = Literal["trace", "debug", "info", "success", "warning", "error", "critical"]
 
 # ----- Config classes -----
 
 
+class _AdmissionConfig(Struct):
+    """The configurations related to admitting (or shedding) the requests
+    when a worker is overloaded.
+
+    NOTE: The limits are per worker process.
+    """
+
+    route_concurrency: dict[str, int] = {}
+    """The maximum number of requests handled at once for each route (by
+    its URI template) e.g. `{"/questions/filter" = 2}`."""
+
+    default_concurrency: int = 0
+    """The maximum number of requests handled at once for the routes not
+    in `route_concurrency`. If this is `0`, they're not limited."""
+
+    max_queued: int = 0
+    """The maximum number of requests that wait for a route that's at its
+    concurrency limit. The requests beyond this are shed right away."""
+
+    queue_timeout: float = 1.0
+    """The number of seconds a queued request waits before it's shed."""
+
+    client_rate: float = 0
+    """The number of requests per second each client can make, with the
+    bursts being limited by `client_burst`. If this is `0`, the clients
+    are not rate limited."""
+
+    client_burst: int = 20
+    """The maximum number of requests a client can make at once."""
+
+    max_clients: int = 10000
+    """The maximum number of clients whose rate limits are tracked."""
+
+    retry_after: int = 1
+    """The number of seconds after which the shed requests are asked to
+    be retried."""
+
+
 class _APIConfig(Struct):
     """The configuration related to the API."""
 
     gh_repo_name: str
     gh_repo_owner: str
     allow_origins: list[str] = []
+    admission: _AdmissionConfig = msgspec.field(default_factory=_AdmissionConfig)
+
+    traffic_fp: Path | None = None
+    """The path to the file with the sample of the popular requests. If
+    this is not set, the requests are neither recorded nor replayed to warm
+    up the caches at startup."""
+
+    traffic_sample_size: int = 1000
+    """The number of distinct popular requests that are recorded."""
+
+    warm_up_requests: int = 100
+    """The number of the most popular recorded requests that are replayed
+    at startup."""
+
+    def normalize_paths(self, fp: Path):
+        """Normalizes all the relative paths into absolute paths."""
+
+        if self.traffic_fp is not None:
+            self.traffic_fp = _get_full_path(fp, self.traffic_fp)
 
 
 class _QuestionsConfig(Struct):
@@ -41,6 +99,48 @@ class _QuestionsConfig(Struct):
     whoosh_questions_field_name: str = "question"
     """The name of the field that's indexed in Whoosh."""
 
+    storage: Literal["memory", "compressed"] = "memory"
+    """How the questions are held in memory. With "compressed", the
+    questions are held compressed and are decompressed on access."""
+
+    cache_size: int = 1024
+    """The number of decompressed questions that are held when the
+    questions are held compressed."""
+
+    query_cache_size: int = 1024
+    """The number of parsed queries, expanded wildcards and term hits that
+    are held by the query searcher."""
+
+    ranking_cache_size: int = 32
+    """The number of rankings of the queries that are held by the query
+    searcher. Each one holds the IDs of all the questions matching its
+    query, so far fewer of them are held."""
+
+    fuzzy_max_expansions: int = 5
+    """The maximum number of terms a misspelled word is expanded to."""
+
+    search_time_limit: float = 0.5
+    """The number of seconds a text search may take, after which the
+    partial results are returned. If this is `0`, the searches are not
+    limited."""
+
+    max_wildcard_expansions: int = 512
+    """The maximum number of terms a wildcard in a query matches. If this
+    is `0`, the wildcards are not limited."""
+
+    max_query_terms: int = 32
+    """The maximum number of terms in a query, beyond which the query is
+    rejected. If this is `0`, the queries are not limited."""
+
+    whoosh_refresh_interval: float = 5.0
+    """The number of seconds between the checks for a new generation of
+    the Whoosh index."""
+
+    whoosh_index_storage: Literal["file", "ram"] = "file"
+    """Where the Whoosh index is read from. With "ram", the index is
+    copied into memory at startup, which avoids reading it through a slow
+    filesystem on every search."""
+
     def normalize_paths(self, fp: Path):
         """Normalizes all the relative paths into absolute paths."""
 
@@ -49,6 +149,26 @@ class _QuestionsConfig(Struct):
         self.whoosh_index_dir = _get_full_path(fp, self.whoosh_index_dir)
 
 
+class _ServerConfig(Struct):
+    """The configurations related to the production server."""
+
+    host: str = "127.0.0.1"
+    """The host the server binds to."""
+
+    port: int = 8080
+    """The port the server binds to."""
+
+    workers: int = 2
+    """The number of worker processes."""
+
+    threads: int = 1
+    """The number of requests each worker handles at once."""
+
+    max_requests: int = 0
+    """The number of requests after which a worker is replaced. If this is
+    `0`, the workers are never replaced."""
+
+
 class _LogConfig(Struct):
     """The configurations related to logging."""
 
@@ -65,6 +185,21 @@ class _LogConfig(Struct):
     """The sink to which the logs are written to in addition to the
     stdout."""
 
+    stdout: bool = True
+    """Indicates whether to also write the logs to the stdout or not."""
+
+    request_log_sample_rate: float = 1.0
+    """The fraction of the successful requests that are logged. Failed
+    requests are always logged."""
+
+    batch_size: int = 0
+    """The maximum number of messages written to the sink at once. If
+    this is `0`, then each message is written as soon as it's logged."""
+
+    flush_interval: float = 1.0
+    """The maximum number of seconds a message is held before being
+    written to the sink when the messages are batched."""
+
     def normalize_path(self, fp: Path):
         """Normalizes all the relative paths into absolute paths."""
 
@@ -77,12 +212,14 @@ class _CommonConfig(Struct):
     questions: _QuestionsConfig
     logs: _LogConfig
     api: _APIConfig
+    server: _ServerConfig = msgspec.field(default_factory=_ServerConfig)
 
     def normalize_paths(self, fp: Path):
         """Normalizes all the relative paths into absolute paths."""
 
         self.questions.normalize_paths(fp)
         self.logs.normalize_path(fp)
+        self.api.normalize_paths(fp)
 
 
 class _DevConfig(_CommonConfig):
@@ -128,6 +265,11 @@ class _Config(Struct):
 
         return self._get_config().api
 
+    def get_server_config(self) -> _ServerConfig:
+        """Returns the server config based on the current mode."""
+
+        return self._get_config().server
+
     def _get_config(self) -> _DevConfig | _ProdConfig | _TestConfig:
         """Gets the dev/prod/test config based on the current mode."""
 
@@ -253,4 +395,5 @@ def _path_dec_hook(type: Type, obj: Any) -> Any:
 
 
 # The "singleton" configuration object
-config = _Config.load_config()
+with timed_startup_phase("config"):
+    config = _Config.load_config()
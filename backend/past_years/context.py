@@ -1,8 +1,53 @@
+"""Holds the context of the current request.
+
+The values are stored in context variables so that every thread (and
+task) handling a request sees only its own values.
+"""
+from contextvars import ContextVar
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+_server_timings: ContextVar[list[tuple[str, float]]] = ContextVar("server_timings")
+_search_truncated: ContextVar[bool] = ContextVar("search_truncated", default=False)
+
+
 class _Context:
-    """A class to hold the global context."""
+    """A class to hold the context of the current request."""
+
+    @property
+    def request_id(self) -> str | None:
+        """The ID of the current request."""
+
+        return _request_id.get()
+
+    @request_id.setter
+    def request_id(self, request_id: str | None):
+        _request_id.set(request_id)
+
+    @property
+    def server_timings(self) -> list[tuple[str, float]]:
+        """The durations (in seconds) of the stages of the current request."""
+
+        try:
+            return _server_timings.get()
+        except LookupError:
+            timings: list[tuple[str, float]] = []
+            _server_timings.set(timings)
+            return timings
+
+    @server_timings.setter
+    def server_timings(self, timings: list[tuple[str, float]]):
+        _server_timings.set(timings)
+
+    @property
+    def search_truncated(self) -> bool:
+        """Indicates whether a text search of the current request ran out
+        of time (or expanded too many terms) and returned partial results."""
+
+        return _search_truncated.get()
 
-    def __init__(self):
-        self.request_id: str | None = None
+    @search_truncated.setter
+    def search_truncated(self, truncated: bool):
+        _search_truncated.set(truncated)
 
 
 ctx = _Context()
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Iterable
 
 
 class PastYearsError(Exception):
@@ -25,9 +26,41 @@ class InvalidConfigFileError(PastYearsError):
         super().__init__(error_msg)
 
 
+class InvalidQuestionIdError(PastYearsError):
+    """Raised when a question id is not a valid question id."""
+
+    def __init__(self, question_id: str) -> None:
+        self.question_id = question_id
+        super().__init__(f"`{question_id}` is not a valid question id")
+
+
 class QuestionNotFoundError(PastYearsError):
     """Raised when a question is not found."""
 
     def __init__(self, question_id: str) -> None:
         self.question_id = question_id
         super().__init__(f"Question with id `{question_id}` was not found")
+
+
+class InvalidFieldsError(PastYearsError):
+    """Raised when the fields asked for are not fields of a question."""
+
+    def __init__(self, fields: Iterable[str]) -> None:
+        self.fields = sorted(fields)
+        super().__init__(f"Invalid fields: {', '.join(self.fields)}")
+
+
+class QueryTooComplexError(PastYearsError):
+    """Raised when a text search query is too expensive to be run."""
+
+    def __init__(self, query: str, reason: str) -> None:
+        self.query = query
+        super().__init__(f"The query `{query}` is too complex: {reason}")
+
+
+class InvalidIndexError(PastYearsError):
+    """Raised when an index file can't be used."""
+
+    def __init__(self, fp: str | Path, reason: str) -> None:
+        self.fp = fp
+        super().__init__(f"Invalid index, {fp}: {reason}")
@@ -1,10 +1,16 @@
-from typing import Generator, Iterable
+from __future__ import annotations
 
-import httpx
+import time
+from typing import TYPE_CHECKING, Generator, Iterable
 from typing import Any
 
 from loguru import logger
 
+from past_years.metrics import GITHUB_ERRORS, GITHUB_LATENCY
+
+if TYPE_CHECKING:
+    import httpx
+
 
 class GithubClient:
     """A client to interact with GitHub via it's Rest API.
@@ -14,17 +20,21 @@ class GithubClient:
         base_url: The base url to which URLs in requests are added to.
             If provided, then all URIs provided during requests are
             considered to be relative.
+
+    NOTE: `httpx` and its HTTP client are only loaded when the first
+    request is made, since they're slow to import and set up and most
+    workers never talk to GitHub.
     """
 
     def __init__(self, pat: str, repo: str, owner: str):
         self._repo, self._owner = repo, owner
         self._issues_url = f"/repos/{self._owner}/{self._repo}/issues"
 
-        headers = {
+        self._headers = {
             "Accept": "application/vnd.github+json",
             "Authorization": f"token {pat}",
         }
-        self._client = httpx.Client(base_url="https://api.github.com", headers=headers)
+        self._http_client: httpx.Client | None = None
 
     # ----- Public Methods -----
     def get_issues(
@@ -43,7 +53,7 @@ class GithubClient:
     def get_issue(self, issue_number: int):
         """Returns the issue with the given issue number."""
 
-        logger.debug(f"Getting issue `{issue_number}`")
+        logger.debug("Getting issue `{}`", issue_number)
 
         url = f"{self._issues_url}/{issue_number}"
         return self._get_request(url).json()
@@ -62,7 +72,7 @@ class GithubClient:
         resp = self._post_request(self._issues_url, params)
         issue = resp.json()
 
-        logger.debug(f"Created issue `{issue['id']}`")
+        logger.debug("Created issue `{}`", issue["id"])
 
         return issue
 
@@ -113,20 +123,45 @@ class GithubClient:
                 return link.strip("<>")
 
     # --- Requests ---
+    def _get_client(self) -> httpx.Client:
+        """Returns the HTTP client, creating it on first use."""
+
+        if self._http_client is None:
+            import httpx
+
+            self._http_client = httpx.Client(
+                base_url="https://api.github.com", headers=self._headers
+            )
+        return self._http_client
+
     def _get_request(self, url: str, params: dict[str, str] | None = None):
         """Makes a get request and returns the response."""
 
-        logger.trace(f"GET request to {url} with params {params}")
+        logger.trace("GET request to {} with params {}", url, params)
 
-        resp = self._client.get(url, params=params)
-        resp.raise_for_status()
-        return resp
+        return self._send("GET", url, params=params)
 
     def _post_request(self, url: str, params: dict[str, Any] | None = None):
         """Makes a post request and returns the response."""
 
-        logger.trace(f"POST request to {url} with body {params}")
+        logger.trace("POST request to {} with body {}", url, params)
+
+        return self._send("POST", url, json=params)
+
+    def _send(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Sends the request while recording its latency and failures."""
+
+        import httpx
 
-        resp = self._client.post(url, json=params)
-        resp.raise_for_status()
-        return resp
+        client = self._get_client()
+        start_time = time.perf_counter_ns()
+        try:
+            resp = client.request(method, url, **kwargs)
+            resp.raise_for_status()
+            return resp
+        except httpx.HTTPError:
+            GITHUB_ERRORS.inc(method=method)
+            raise
+        finally:
+            elapsed_time = (time.perf_counter_ns() - start_time) * 1e-9
+            GITHUB_LATENCY.observe(elapsed_time, method=method)
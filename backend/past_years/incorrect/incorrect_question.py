@@ -2,6 +2,11 @@ from typing import Any, NamedTuple
 from past_years.github.gh_client import GithubClient
 from loguru import logger
 
+from past_years.metrics import record_cache_lookup
+
+# The name of the cache in the metrics
+_CACHE_NAME = "issue_url"
+
 
 class CachedIssueDetails(NamedTuple):
 
@@ -27,6 +32,7 @@ class IncorrectQuestionsHandler:
         question id if it exists, else returns None."""
 
         cached_issue = self._cache.get(question_id, None)
+        record_cache_lookup(_CACHE_NAME, cached_issue is not None)
         if cached_issue:
             return cached_issue.issue_url
 
@@ -53,14 +59,14 @@ class IncorrectQuestionsHandler:
         #   b. If the issue doesn't exist:
         #       i. Create an issue for the question
         #       ii. Add a comment to the issue
-        logger.info(f"Creating comment for question `{question_id}`")
+        logger.info("Creating comment for question `{}`", question_id)
 
         issue = self._get_issue(question_id)
         if issue is not None:
             if issue["state"] != "open":
                 pass  # TODO: Open the issue
         else:
-            logger.debug(f"Creating issue for question `{question_id}`")
+            logger.debug("Creating issue for question `{}`", question_id)
 
             issue_title = f"Incorrect Question: {question_id}"
             issue = self._gh.create_issue(issue_title, labels=["incorrect-question"])
@@ -3,22 +3,36 @@ from wsgiref.simple_server import WSGIRequestHandler
 from falcon import App
 from loguru import logger
 
-from api import make_app
-from utils import configure_logger
+from past_years.api import make_app
+from past_years.utils import configure_logger
 import dotenv
 
+_application: App | None = None
 
-def initialize_application() -> App:
 
+def initialize_application(wait_for_warm_up: bool = False) -> App:
     dotenv.load_dotenv()
     configure_logger()
-    return make_app()
+    return make_app(wait_for_warm_up=wait_for_warm_up)
 
 
-application = initialize_application()
+def __getattr__(name: str) -> Any:
+    # The application is only built when it's first accessed so that
+    # importing this module is cheap i.e. `past_years.main:application`
+    # can be given to any WSGI server.
+    global _application
+
+    if name != "application":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    if _application is None:
+        _application = initialize_application()
+    return _application
+
 
 if __name__ == "__main__":
     # THIS IS ONLY MEANT FOR DEVELOPMENT PURPOSES!!
+    # Use `pasty serve` in production.
     from wsgiref import simple_server
 
     class SilentServerHandler(WSGIRequestHandler):
@@ -28,6 +42,7 @@ if __name__ == "__main__":
             pass
 
     PORT = 8080
+    application = initialize_application()
 
     logger.info(f"Listening on port {PORT}")
     with simple_server.make_server(
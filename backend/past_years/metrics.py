@@ -0,0 +1,375 @@
+"""A minimal, dependency free metrics registry.
+
+The metrics are exposed in the Prometheus text exposition format so that
+they can be scraped from the `/metrics` endpoint.
+"""
+from __future__ import annotations
+
+import math
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Generator, Iterable
+
+from past_years.context import ctx
+
+_LabelValues = tuple[str, ...]
+
+# The default buckets (in seconds) used for latency histograms.
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+# The default buckets (in bytes) used for size histograms.
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# The default buckets used for ratios i.e. values between 0 and 1.
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+# The default buckets used for counts of items.
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class _Metric:
+    """The base class for all metrics."""
+
+    _TYPE: str = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: tuple[str, ...] = tuple(labelnames)
+        self._lock = Lock()
+
+    def expose(self) -> list[str]:
+        """Returns the lines of this metric in the Prometheus text format."""
+
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self._TYPE}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _label_values(self, labels: dict[str, str]) -> _LabelValues:
+        """Returns the label values in the order of the label names."""
+
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"Expected labels {self.labelnames} for `{self.name}`, got {labels}"
+            )
+
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: _LabelValues, **extra: str) -> str:
+        pairs = [*zip(self.labelnames, values), *extra.items()]
+        if not pairs:
+            return ""
+
+        labels = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return "{" + labels + "}"
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A monotonically increasing counter."""
+
+    _TYPE = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[_LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        """Increments the counter with the given labels by `amount`."""
+
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        """Returns the current value of the counter with the given labels."""
+
+        return self._values.get(self._label_values(labels), 0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+
+        return [
+            f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """A histogram that counts the observed values into buckets."""
+
+    _TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets: tuple[float, ...] = (*sorted(buckets), math.inf)
+
+        # Holds the (non-cumulative) bucket counts, sum and count for
+        # each set of label values.
+        self._counts: dict[_LabelValues, list[int]] = {}
+        self._sums: dict[_LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        """Records the observed value with the given labels."""
+
+        key = self._label_values(labels)
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.buckets)
+            counts[idx] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    def count(self, **labels: str) -> int:
+        """Returns the number of observations with the given labels."""
+
+        return sum(self._counts.get(self._label_values(labels), ()))
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            counts = [(key, list(c)) for key, c in self._counts.items()]
+            sums = dict(self._sums)
+
+        lines: list[str] = []
+        for key, bucket_counts in counts:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = self._format_labels(key, le=_format_value(bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+            labels = self._format_labels(key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all the metrics of the application."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Iterable[str] = ()
+    ) -> Counter:
+        """Creates and registers a new counter."""
+
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Creates and registers a new histogram."""
+
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def expose(self) -> str:
+        """Returns all the metrics in the Prometheus text format."""
+
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.expose())
+
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric `{metric.name}` is already registered")
+
+        self._metrics[metric.name] = metric
+        return metric
+
+
+# ----- Helpers -----
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# The "singleton" registry and the metrics of the application
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "past_years_request_duration_seconds",
+    "The time taken to process a request.",
+    ("method", "route", "status"),
+)
+RESPONSE_SIZE = registry.histogram(
+    "past_years_response_size_bytes",
+    "The size of the response body sent to the client.",
+    ("route",),
+    SIZE_BUCKETS,
+)
+COMPRESSION_RATIO = registry.histogram(
+    "past_years_compression_ratio",
+    "The ratio of the compressed size to the uncompressed size of the response.",
+    ("route",),
+    RATIO_BUCKETS,
+)
+STAGE_LATENCY = registry.histogram(
+    "past_years_stage_duration_seconds",
+    "The time taken by each stage of processing a request.",
+    ("stage",),
+)
+SEARCH_HITS = registry.histogram(
+    "past_years_search_hits",
+    "The number of questions that matched a search.",
+    ("kind",),
+    COUNT_BUCKETS,
+)
+TRUNCATED_SEARCHES = registry.counter(
+    "past_years_truncated_searches_total",
+    "The number of text searches that returned partial results.",
+)
+CACHE_REQUESTS = registry.counter(
+    "past_years_cache_requests_total",
+    "The number of lookups into the in-memory caches.",
+    ("cache", "result"),
+)
+SHED_REQUESTS = registry.counter(
+    "past_years_shed_requests_total",
+    "The number of requests that were rejected due to overload or rate limits.",
+    ("route", "reason"),
+)
+STARTUP_LATENCY = registry.histogram(
+    "past_years_startup_phase_duration_seconds",
+    "The time taken by each phase of starting up the application.",
+    ("phase",),
+)
+GITHUB_LATENCY = registry.histogram(
+    "past_years_github_request_duration_seconds",
+    "The time taken by the requests made to the GitHub API.",
+    ("method",),
+)
+GITHUB_ERRORS = registry.counter(
+    "past_years_github_request_errors_total",
+    "The number of requests made to the GitHub API that failed.",
+    ("method",),
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Records a lookup into the cache with the given name."""
+
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def timed_stage(stage: str) -> Generator[None, None, None]:
+    """Times the wrapped block as a stage of the current request.
+
+    The duration is recorded both in the stage latency histogram and
+    in the `Server-Timing` entries of the current request.
+    """
+
+    start_time = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        elapsed_time = (time.perf_counter_ns() - start_time) * 1e-9
+        STAGE_LATENCY.observe(elapsed_time, stage=stage)
+        ctx.server_timings.append((stage, elapsed_time))
+
+
+# The duration (in seconds) of each phase of the start up, in the order
+# they were run.
+_startup_timings: dict[str, float] = {}
+
+
+@contextmanager
+def timed_startup_phase(phase: str) -> Generator[None, None, None]:
+    """Times the wrapped block as a phase of starting up the application.
+
+    A phase that runs more than once (e.g. when building multiple apps in
+    the tests) keeps the duration of its latest run.
+    """
+
+    start_time = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        elapsed_time = (time.perf_counter_ns() - start_time) * 1e-9
+        STARTUP_LATENCY.observe(elapsed_time, phase=phase)
+        _startup_timings.pop(phase, None)
+        _startup_timings[phase] = elapsed_time
+
+
+def get_startup_timings() -> dict[str, float]:
+    """Returns the duration (in seconds) of each phase of the start up."""
+
+    return dict(_startup_timings)
+
+
+def format_startup_timings(timings: dict[str, float]) -> str:
+    """Formats the given start up phase timings (in seconds) as a report
+    for the logs."""
+
+    phases = ", ".join(
+        f"{phase}={round(elapsed_time * 1e3, 1)}ms"
+        for phase, elapsed_time in timings.items()
+    )
+    total = round(sum(timings.values()) * 1e3, 1)
+    return f"{total}ms ({phases})"
+
+
+def format_server_timing(timings: Iterable[tuple[str, float]]) -> str:
+    """Formats the given stage timings (in seconds) as the value of a
+    `Server-Timing` header.
+
+    Stages that ran more than once are summed up.
+    """
+
+    durations: dict[str, float] = {}
+    for stage, elapsed_time in timings:
+        durations[stage] = durations.get(stage, 0) + elapsed_time
+
+    return ", ".join(
+        f"{stage};dur={round(elapsed_time * 1e3, 3)}"
+        for stage, elapsed_time in durations.items()
+    )
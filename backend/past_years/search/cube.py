@@ -0,0 +1,319 @@
+"""The exam × subject × year cube of the questions.
+
+The IDs of the questions are sorted by their (exam, subject, year), so
+that the questions in each cell of the cube are a contiguous range of the
+sorted IDs. So are the questions of each exam and of each (exam, subject)
+since they're prefixes of the key, and so are the questions of a range of
+years within each (exam, subject). A filter on the exams, subjects and
+years is then a union of a few ranges with no set intersections, and the
+number of questions satisfying it is the sum of the lengths of the ranges.
+
+The cube is built along with the questions index and saved next to it,
+though it's rebuilt from the index if it's missing or out of date.
+"""
+from __future__ import annotations
+
+import itertools
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import cached_property
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import msgspec
+from loguru import logger
+
+from .index_format import bank_fingerprint
+from .search_types import Exam, Question, QuestionsIndex, Subject
+
+_Range = tuple[int, int]
+
+
+class _CubeData(msgspec.Struct, array_like=True):
+    """The cube as it's saved."""
+
+    fingerprint: bytes
+    """The fingerprint of the question bank (see `bank_fingerprint`)."""
+
+    cells: list[tuple[Exam, Subject, int, int]]
+    """The key of each cell along with the number of questions in it, in
+    the order of the keys."""
+
+    ids: bytes
+    """The IDs sorted by the keys of their cells, as little endian
+    unsigned 64-bit integers."""
+
+
+class QuestionsCube:
+    """The IDs of the questions sorted by their (exam, subject, year).
+
+    Args:
+        cells: The key of each cell along with the number of questions in
+            it, in the order of the keys.
+        ids: The IDs sorted by the keys of their cells.
+    """
+
+    def __init__(self, cells: Iterable[tuple[Exam, Subject, int, int]], ids: array):
+        self._ids = ids
+
+        self._exams: dict[Exam, _Range] = {}
+        self._subjects: dict[Exam, list[Subject]] = {}
+
+        # The years of the cells of each (exam, subject) in order, along
+        # with where each of the cells start and where the last one ends.
+        self._years: dict[tuple[Exam, Subject], tuple[list[int], list[int]]] = {}
+
+        start = 0
+        for exam, subject, year, count in cells:
+            end = start + count
+            self._exams[exam] = (self._exams.get(exam, (start, end))[0], end)
+
+            pair = (exam, subject)
+            if pair not in self._years:
+                self._years[pair] = ([], [start])
+                self._subjects.setdefault(exam, []).append(subject)
+
+            years, bounds = self._years[pair]
+            if bounds[-1] != start or (years and years[-1] >= year):
+                raise ValueError(f"The cells of {exam} {subject} are out of order")
+            years.append(year)
+            bounds.append(end)
+            start = end
+
+        if start != len(ids):
+            raise ValueError(f"The cells hold {start} IDs but there are {len(ids)}")
+
+    def ranges(
+        self,
+        exams: Iterable[Exam] = (),
+        subjects: Iterable[Subject] = (),
+        years: Iterable[int] = (),
+        year_ranges: Iterable[tuple[int, int]] = (),
+        exclude_exams: Iterable[Exam] = (),
+        exclude_subjects: Iterable[Subject] = (),
+    ) -> list[_Range]:
+        """Returns the ranges of the sorted IDs of the questions that are
+        in any of the exams, subjects and years (or the inclusive ranges
+        of the years) but not in any of the excluded exams and subjects.
+        Not giving any of the exams, subjects or years means that it's not
+        filtered on.
+
+        The ranges are sorted, with the adjacent ranges being merged.
+        """
+
+        excluded_exams, excluded_subjects = set(exclude_exams), set(exclude_subjects)
+        exams = [
+            exam
+            for exam in (exams or self._exams)
+            if exam in self._exams and exam not in excluded_exams
+        ]
+        subjects, years, year_ranges = list(subjects), list(years), list(year_ranges)
+        if not (subjects or years or year_ranges or excluded_subjects):
+            return _merge([self._exams[exam] for exam in exams])
+
+        pairs = [
+            (exam, subject)
+            for exam in exams
+            for subject in (subjects or self._subjects[exam])
+            if (exam, subject) in self._years and subject not in excluded_subjects
+        ]
+        if not (years or year_ranges):
+            return _merge([self._bounds(pair) for pair in pairs])
+
+        # The years of each (exam, subject) are sorted, so both the years
+        # and the ranges of the years are found by bisecting them.
+        ranges: list[_Range] = []
+        for pair in pairs:
+            pair_years, bounds = self._years[pair]
+            for year in years:
+                idx = bisect_left(pair_years, year)
+                if idx < len(pair_years) and pair_years[idx] == year:
+                    ranges.append((bounds[idx], bounds[idx + 1]))
+            for first_year, last_year in year_ranges:
+                start = bisect_left(pair_years, first_year)
+                end = bisect_right(pair_years, last_year)
+                if start < end:
+                    ranges.append((bounds[start], bounds[end]))
+
+        return _merge(ranges)
+
+    def ids(self, ranges: Iterable[_Range]) -> set[int]:
+        """Returns the IDs in the ranges."""
+
+        ids = self._ids
+        return set(itertools.chain.from_iterable(ids[s:e] for s, e in ranges))
+
+    def view(self, ranges: list[_Range]) -> RangesView:
+        """Returns the IDs in the ranges, in their sorted order, without
+        copying them."""
+
+        return RangesView(self._ids, ranges)
+
+    def count(self, ranges: list[_Range], exclude_ids: Iterable[int] = ()) -> int:
+        """Returns the number of IDs in the ranges, not counting the
+        excluded IDs."""
+
+        count = sum(end - start for start, end in ranges)
+        if not exclude_ids:
+            return count
+
+        starts = [start for start, _ in ranges]
+        positions = self._positions
+        for id in set(exclude_ids):
+            position = positions.get(id)
+            if position is None:
+                continue
+            idx = bisect_right(starts, position) - 1
+            if idx >= 0 and position < ranges[idx][1]:
+                count -= 1
+        return count
+
+    def _bounds(self, pair: tuple[Exam, Subject]) -> _Range:
+        bounds = self._years[pair][1]
+        return (bounds[0], bounds[-1])
+
+    @cached_property
+    def _positions(self) -> dict[int, int]:
+        """The position of each of the IDs in the sorted IDs."""
+
+        return {id: position for position, id in enumerate(self._ids)}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class RangesView(Sequence[int]):
+    """The IDs in the ranges of the sorted IDs, one after the other.
+
+    Args:
+        ids: The sorted IDs.
+        ranges: The sorted ranges of the IDs.
+    """
+
+    def __init__(self, ids: array, ranges: list[_Range]):
+        self._ids = ids
+        self._ranges = ranges
+
+        # Where each of the ranges starts in the view
+        self._offsets = list(
+            itertools.accumulate((end - start for start, end in ranges), initial=0)
+        )
+
+    def __getitem__(self, idx: int) -> int:  # type: ignore[override]
+        if not 0 <= idx < len(self):
+            raise IndexError(f"{idx} is out of range")
+
+        range_idx = bisect_right(self._offsets, idx) - 1
+        return self._ids[self._ranges[range_idx][0] + idx - self._offsets[range_idx]]
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+
+def build_questions_cube(idx: QuestionsIndex, ids: Iterable[int]) -> QuestionsCube:
+    """Builds the cube from the questions index.
+
+    Args:
+        idx: The questions index.
+        ids: The IDs of all the questions. The questions in a cell are in
+            this order. The IDs without an exam, subject or year in the
+            index are left out.
+    """
+
+    exam_of = {id: exam for exam, exam_ids in idx.exams.items() for id in exam_ids}
+    subject_of = {
+        id: subject
+        for subject, subject_ids in idx.subjects.items()
+        for id in subject_ids
+    }
+    year_of = {id: year for year, year_ids in idx.years.items() for id in year_ids}
+
+    keys: dict[int, tuple[Exam, Subject, int]] = {}
+    unindexed = 0
+    for id in ids:
+        if id in exam_of and id in subject_of and id in year_of:
+            keys[id] = (exam_of[id], subject_of[id], year_of[id])
+        else:
+            unindexed += 1
+
+    # The questions the index doesn't have aren't matched by any filter,
+    # just as when the index is filtered on directly.
+    if unindexed:
+        logger.warning("Leaving out {} questions missing from the index", unindexed)
+
+    sorted_ids = sorted(keys, key=keys.__getitem__)
+
+    cells = [
+        (*key, sum(1 for _ in group))
+        for key, group in itertools.groupby(sorted_ids, key=keys.__getitem__)
+    ]
+    return QuestionsCube(cells, array("Q", sorted_ids))
+
+
+def questions_cube_fp(idx_fp: str | Path) -> Path:
+    """Returns the path of the cube that goes with the given questions
+    index e.g. `.qindex.cube` for `.qindex.json`."""
+
+    return Path(idx_fp).with_suffix(".cube")
+
+
+def encode_questions_cube(cube: QuestionsCube, questions: Iterable[Question]) -> bytes:
+    """Encodes the cube of the given questions."""
+
+    cells = [
+        (exam, subject, year, bounds[idx + 1] - bounds[idx])
+        for (exam, subject), (years, bounds) in sorted(
+            cube._years.items(), key=lambda item: item[1][1][0]
+        )
+        for idx, year in enumerate(years)
+    ]
+    sorted_ids = array("Q", cube._ids)
+    if sys.byteorder == "big":
+        sorted_ids.byteswap()
+
+    data = _CubeData(bank_fingerprint(questions), cells, sorted_ids.tobytes())
+    return msgspec.msgpack.encode(data)
+
+
+def load_questions_cube(fp: Path, fingerprint: bytes) -> QuestionsCube | None:
+    """Loads the cube, if there is one built from the question bank with
+    the given fingerprint (see `bank_fingerprint`)."""
+
+    if not fp.is_file():
+        logger.info("No questions cube at `{}`", fp)
+        return None
+
+    try:
+        data = msgspec.msgpack.decode(fp.read_bytes(), type=_CubeData)
+    except (msgspec.DecodeError, msgspec.ValidationError) as e:
+        logger.warning("Ignoring the invalid questions cube: {}", e)
+        return None
+
+    if data.fingerprint != fingerprint:
+        logger.warning("Ignoring the questions cube of other questions")
+        return None
+
+    sorted_ids = array("Q")
+    sorted_ids.frombytes(data.ids)
+    if sys.byteorder == "big":
+        sorted_ids.byteswap()
+
+    try:
+        return QuestionsCube(data.cells, sorted_ids)
+    except ValueError as e:
+        logger.warning("Ignoring the invalid questions cube: {}", e)
+        return None
+
+
+# ----- Helpers -----
+def _merge(ranges: list[_Range]) -> list[_Range]:
+    """Sorts the ranges, merging those that are adjacent or overlap."""
+
+    merged: list[_Range] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
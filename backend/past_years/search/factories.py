@@ -1,11 +1,15 @@
 """Factory functions for various search objects."""
+from __future__ import annotations
 
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
 
-from .query_searcher import QuerySearcherProtocol, WhooshSearcher
 from .question_bank import QuestionBank, QuestionBankProtocol
 from ..configuration import config
+from ..metrics import timed_startup_phase
+
+if TYPE_CHECKING:
+    from .query_searcher import QuerySearcherProtocol
 
 from loguru import logger
 
@@ -16,12 +20,15 @@ class QuestionBankFactory:
     def get_question_bank(self, type: Literal["file"]) -> QuestionBankProtocol:
         """Returns a question bank based on the `type`."""
 
-        logger.info(f"Getting question bank based on type `{type}`")
+        logger.info("Getting question bank based on type `{}`", type)
 
         if type == "file":
             questions_config = config.get_questions_config()
             return QuestionBank(
-                questions_config.questions_fp, questions_config.questions_index_fp
+                questions_config.questions_fp,
+                questions_config.questions_index_fp,
+                questions_config.storage,
+                questions_config.cache_size,
             )
 
         raise ValueError(f"{type} is an invalid value for `type`")
@@ -37,17 +44,32 @@ class QuerySearcherFactory:
         and `type`."""
 
         logger.info(
-            f"Getting query searcher based on document `{document}` and type `{type}`"
+            "Getting query searcher based on document `{}` and type `{}`",
+            document,
+            type,
         )
 
         if document == "questions":
             if type == "whoosh":
                 qstn_config = config.get_questions_config()
-                return WhooshSearcher(
-                    qstn_config.whoosh_index_dir,
-                    qstn_config.whoosh_questions_index_name,
-                    qstn_config.whoosh_questions_field_name,
-                )
+                with timed_startup_phase("searcher_open"):
+                    # Whoosh is slow to import, so it's only imported when
+                    # a searcher is needed.
+                    from .query_searcher import WhooshSearcher
+
+                    return WhooshSearcher(
+                        qstn_config.whoosh_index_dir,
+                        qstn_config.whoosh_questions_index_name,
+                        qstn_config.whoosh_questions_field_name,
+                        qstn_config.query_cache_size,
+                        qstn_config.fuzzy_max_expansions,
+                        storage=qstn_config.whoosh_index_storage,
+                        time_limit=qstn_config.search_time_limit,
+                        max_expansions=qstn_config.max_wildcard_expansions,
+                        max_query_terms=qstn_config.max_query_terms,
+                        refresh_interval=qstn_config.whoosh_refresh_interval,
+                        ranking_cache_size=qstn_config.ranking_cache_size,
+                    )
             raise ValueError(f"'{type}' is an invalid value for type")
 
         raise ValueError(f"'{document}' is an invalid value for document")
@@ -0,0 +1,163 @@
+"""Typo tolerant lookup of terms using symmetric deletes.
+
+Every term in the index is stored under all the strings that can be made
+by deleting up to `max_distance` characters from (the prefix of) it. A
+misspelled word is then matched by generating its own deletes and looking
+them up, which is only a handful of dictionary lookups instead of
+computing the edit distance to every term in the index.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable
+
+import msgspec
+from loguru import logger
+
+# Only the deletes of the prefix of this length of the terms are stored,
+# which bounds the size of the index without losing many matches.
+_PREFIX_LENGTH = 7
+
+# Terms at most this long only match words at an edit distance of 1.
+_SHORT_TERM_LENGTH = 4
+
+
+class FuzzyIndex(msgspec.Struct):
+    """The index of the terms of a Whoosh index by their deletes."""
+
+    generation: int
+    """The generation of the Whoosh index the terms are from."""
+
+    max_distance: int
+    """The maximum edit distance of the matches."""
+
+    terms: list[str]
+    counts: list[int]
+    """The number of documents each of the terms is in."""
+
+    deletes: dict[str, list[int]]
+    """The indexes of the terms that each delete comes from."""
+
+    def lookup(self, word: str, max_expansions: int) -> list[str]:
+        """Returns the terms closest to the word, the most common first.
+
+        Only the terms at the smallest edit distance found are returned,
+        since the terms further away are mostly noise.
+
+        Args:
+            word: The (possibly misspelled) word.
+            max_expansions: The maximum number of terms to return.
+        """
+
+        max_distance = _get_max_distance(word, self.max_distance)
+        candidates: set[int] = set()
+        for delete in _get_deletes(word[:_PREFIX_LENGTH], max_distance):
+            candidates.update(self.deletes.get(delete, ()))
+
+        matches: list[tuple[int, int, str]] = []
+        for idx in candidates:
+            term = self.terms[idx]
+            distance = edit_distance(word, term, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, -self.counts[idx], term))
+
+        if not matches:
+            return []
+
+        matches.sort()
+        closest = matches[0][0]
+        return [term for d, _, term in matches[:max_expansions] if d == closest]
+
+
+def build_fuzzy_index(
+    term_counts: Iterable[tuple[str, int]], generation: int, max_distance: int = 2
+) -> FuzzyIndex:
+    """Builds the fuzzy index of the terms.
+
+    Args:
+        term_counts: The terms along with the number of documents they're in.
+        generation: The generation of the Whoosh index the terms are from.
+        max_distance: The maximum edit distance of the matches.
+    """
+
+    terms: list[str] = []
+    counts: list[int] = []
+    deletes: dict[str, list[int]] = {}
+    for idx, (term, count) in enumerate(term_counts):
+        terms.append(term)
+        counts.append(count)
+
+        distance = _get_max_distance(term, max_distance)
+        for delete in _get_deletes(term[:_PREFIX_LENGTH], distance):
+            deletes.setdefault(delete, []).append(idx)
+
+    return FuzzyIndex(generation, max_distance, terms, counts, deletes)
+
+
+def fuzzy_index_fp(index_dir: str | Path, index_name: str) -> Path:
+    """Returns the path of the fuzzy index of the Whoosh index."""
+
+    return Path(index_dir) / f"{index_name}.fuzzy"
+
+
+def load_fuzzy_index(fp: Path) -> FuzzyIndex | None:
+    """Loads the fuzzy index from the file, if there is a valid one."""
+
+    if not fp.is_file():
+        return None
+
+    try:
+        return msgspec.msgpack.decode(fp.read_bytes(), type=FuzzyIndex)
+    except (msgspec.DecodeError, msgspec.ValidationError) as e:
+        logger.warning("Ignoring the invalid fuzzy index at `{}`: {}", fp, e)
+        return None
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Returns the edit distance (counting transpositions as a single edit)
+    between the strings, or `max_distance + 1` if it's more than
+    `max_distance`."""
+
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], prev_prev[j - 2] + 1)
+
+        if min(current) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, current
+
+    return min(prev[-1], max_distance + 1)
+
+
+# ----- Helpers -----
+def _get_max_distance(word: str, max_distance: int) -> int:
+    if len(word) <= _SHORT_TERM_LENGTH:
+        return min(max_distance, 1)
+    return max_distance
+
+
+def _get_deletes(word: str, max_distance: int) -> set[str]:
+    """Returns the word along with all the strings that can be made by
+    deleting up to `max_distance` characters from it."""
+
+    deletes = {word}
+    current = {word}
+    for _ in range(max_distance):
+        current = {
+            w[:idx] + w[idx + 1 :]
+            for w in current
+            if len(w) > 1
+            for idx in range(len(w))
+        }
+        deletes |= current
+
+    return deletes
@@ -0,0 +1,100 @@
+"""Highlighting of the words of the questions that matched a query."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, AbstractSet
+
+from past_years.cache import LRUCache
+
+from .search_types import Question, QuestionHighlights
+
+if TYPE_CHECKING:
+    from whoosh.analysis import Analyzer
+
+# The part of a question a term is in i.e. the main question (`None`), an
+# option (its index) or an answer (its key).
+_Part = int | str | None
+
+# The spans of characters each of the terms of a question is at.
+_TermSpans = dict[str, list[tuple[_Part, int, int]]]
+
+
+class Highlighter:
+    """Finds the spans of the words of the questions that match the terms
+    of a query.
+
+    The questions are analyzed the same way as when they're indexed, and
+    the spans of each of their terms are cached per question so that the
+    popular questions are only analyzed once. Highlighting a question is
+    then a lookup of each of the query terms.
+
+    Args:
+        analyzer: The analyzer of the indexed field.
+        cache_size: The maximum number of questions whose terms are cached.
+    """
+
+    def __init__(self, analyzer: Analyzer, cache_size: int = 1024):
+        self._analyzer = analyzer
+        self._term_spans: LRUCache[str, _TermSpans] = LRUCache(
+            "highlight_terms", cache_size
+        )
+
+    def highlight(
+        self, question: Question, terms: AbstractSet[str]
+    ) -> QuestionHighlights | None:
+        """Returns the spans of the words of the question that match any of
+        the terms, or `None` if none of them do."""
+
+        term_spans = self._get_term_spans(question)
+
+        highlights: QuestionHighlights | None = None
+        for term in terms:
+            spans = term_spans.get(term)
+            if not spans:
+                continue
+
+            if highlights is None:
+                highlights = QuestionHighlights()
+            for part, start, end in spans:
+                _get_part_spans(highlights, question, part).append((start, end))
+
+        if highlights is not None and len(terms) > 1:
+            highlights.main_question.sort()
+            for option_spans in highlights.question_options:
+                option_spans.sort()
+            for answer_spans in highlights.answers.values():
+                answer_spans.sort()
+
+        return highlights
+
+    def _get_term_spans(self, question: Question) -> _TermSpans:
+        term_spans = self._term_spans.get(question.id)
+        if term_spans is None:
+            term_spans = {}
+            parts: list[tuple[_Part, str]] = [
+                (None, question.main_question),
+                *enumerate(question.question_options),
+                *question.answers.items(),
+            ]
+            for part, text in parts:
+                for token in self._analyzer(text, chars=True):
+                    spans = term_spans.setdefault(token.text, [])
+                    spans.append((part, token.startchar, token.endchar))
+
+            self._term_spans.put(question.id, term_spans)
+
+        return term_spans
+
+
+def _get_part_spans(
+    highlights: QuestionHighlights, question: Question, part: _Part
+) -> list[tuple[int, int]]:
+    """Returns the list of the spans of the part of the question."""
+
+    if part is None:
+        return highlights.main_question
+    if isinstance(part, int):
+        if not highlights.question_options:
+            highlights.question_options = [[] for _ in question.question_options]
+        return highlights.question_options[part]
+
+    return highlights.answers.setdefault(part, [])
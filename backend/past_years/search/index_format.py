@@ -0,0 +1,159 @@
+"""The binary format of the questions index.
+
+The binary index holds the same data as the JSON index, but is laid out
+so that it can be loaded with next to no parsing:
+
+    header:  magic (4s) | format version (H) | num of questions (I)
+             | fingerprint of the bank (8s)
+    3 sections (exams, subjects, years), each being:
+        num of keys (I)
+        per key: key length (H) | key (UTF-8) | num of IDs (I)
+                 | IDs (sorted, little endian unsigned 64-bit integers)
+
+The sets of IDs are built straight from the bytes of each key, without
+parsing them. The orderings and the cube of the question bank read every
+one of the sets, so they're all built when the index is loaded. The
+fingerprint (see `bank_fingerprint`) ties the index to the questions it
+was built from, so that a stale index is never used.
+"""
+from __future__ import annotations
+
+import hashlib
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Callable, Collection, Iterable, Sequence, TypeVar
+
+from past_years.errors import InvalidIndexError
+
+from .search_types import Exam, Question, QuestionsIndex, Subject
+
+MAGIC = b"PYQI"
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<4sHI8s")
+_COUNT = struct.Struct("<I")
+_KEY_LENGTH = struct.Struct("<H")
+
+_K = TypeVar("_K")
+
+
+def binary_index_fp(idx_fp: str | Path) -> Path:
+    """Returns the path of the binary index that goes with the given JSON
+    index e.g. `.qindex.bin` for `.qindex.json`."""
+
+    return Path(idx_fp).with_suffix(".bin")
+
+
+def bank_fingerprint(questions: Iterable[Question]) -> bytes:
+    """Returns a fingerprint of a question bank that has the given questions.
+
+    The IDs are hashes of the text of the questions only, so the exam,
+    subject and year of each question are fingerprinted along with its ID.
+    Otherwise, re-tagging a question would go unnoticed.
+    """
+
+    keys = sorted(f"{q.id}|{q.exam}|{q.subject}|{q.year}" for q in questions)
+    return hashlib.blake2b("\n".join(keys).encode(), digest_size=8).digest()
+
+
+def encode_questions_index(
+    idx: QuestionsIndex, questions: Collection[Question]
+) -> bytes:
+    """Encodes the index of the given questions."""
+
+    fingerprint = bank_fingerprint(questions)
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(questions), fingerprint)]
+    for section in (idx.exams, idx.subjects, idx.years):
+        parts.append(_COUNT.pack(len(section)))
+        for key, key_ids in section.items():
+            encoded_key = str(key).encode()
+            parts.append(_KEY_LENGTH.pack(len(encoded_key)))
+            parts.append(encoded_key)
+            parts.append(_COUNT.pack(len(key_ids)))
+            parts.append(_to_array(sorted(key_ids)).tobytes())
+
+    return b"".join(parts)
+
+
+def decode_questions_index(
+    data: bytes, fp: str | Path, fingerprint: bytes
+) -> QuestionsIndex:
+    """Decodes the binary index read from `fp`.
+
+    Args:
+        data: The binary index.
+        fp: The path to the binary index. This is only used in the errors.
+        fingerprint: The fingerprint of the question bank the index is
+            going to be used with.
+
+    Raises:
+        InvalidIndexError: If the index isn't a binary index, or wasn't
+            built from the questions in the question bank.
+    """
+
+    if len(data) < _HEADER.size:
+        raise InvalidIndexError(fp, "truncated header")
+
+    magic, version, _, idx_fingerprint = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise InvalidIndexError(fp, "not a binary questions index")
+    if version != FORMAT_VERSION:
+        raise InvalidIndexError(fp, f"unsupported format version {version}")
+    if idx_fingerprint != fingerprint:
+        raise InvalidIndexError(fp, "built from different questions")
+
+    view = memoryview(data)
+    try:
+        offset = _HEADER.size
+        exams, offset = _decode_section(view, offset, Exam)
+        subjects, offset = _decode_section(view, offset, Subject)
+        years, offset = _decode_section(view, offset, int)
+    except (struct.error, ValueError) as e:
+        raise InvalidIndexError(fp, f"corrupt index ({e})") from e
+
+    return QuestionsIndex(exams=exams, subjects=subjects, years=years)
+
+
+# ----- Helpers -----
+def _decode_section(
+    view: memoryview, offset: int, key_type: Callable[[str], _K]
+) -> tuple[dict[_K, set[int]], int]:
+    (num_of_keys,) = _COUNT.unpack_from(view, offset)
+    offset += _COUNT.size
+
+    ids: dict[_K, set[int]] = {}
+    for _ in range(num_of_keys):
+        (key_length,) = _KEY_LENGTH.unpack_from(view, offset)
+        offset += _KEY_LENGTH.size
+        key = key_type(str(view[offset : offset + key_length], "utf-8"))
+        offset += key_length
+
+        (num_of_ids,) = _COUNT.unpack_from(view, offset)
+        offset += _COUNT.size
+        end = offset + num_of_ids * 8
+        if end > len(view):
+            raise ValueError("truncated IDs")
+
+        ids[key] = set(_from_bytes(view[offset:end]))
+        offset = end
+
+    return ids, offset
+
+
+def _from_bytes(data: memoryview) -> Sequence[int]:
+    if sys.byteorder == "little":
+        return data.cast("Q")
+
+    ids = array("Q")
+    ids.frombytes(data)
+    ids.byteswap()
+    return ids
+
+
+def _to_array(ids: Iterable[int]) -> array:
+    arr = array("Q", ids)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
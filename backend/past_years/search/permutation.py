@@ -0,0 +1,68 @@
+"""Random permutations that are computed one element at a time.
+
+A practice session goes through the questions satisfying its filter in a
+random order, a few at a time. Rather than shuffling (and holding on to)
+all of them, the position of the question at each step is computed with
+a keyed Feistel network, so a session is just its seed and how far along
+it is.
+
+The Feistel network is a permutation of the integers with an even number
+of bits, which is narrowed down to `range(size)` by "cycle walking" i.e.
+permuting the values that are out of the range again until they're in
+it. Since the network works on less than 4 times the size, it takes less
+than 4 steps on average.
+"""
+from __future__ import annotations
+
+import random
+
+_ROUNDS = 4
+_MASK_64 = (1 << 64) - 1
+
+
+class FeistelPermutation:
+    """A random permutation of `range(size)`, with the seed picking which.
+
+    Args:
+        size: The number of elements being permuted.
+        seed: The seed of the permutation.
+    """
+
+    def __init__(self, size: int, seed: int):
+        self._size = size
+
+        half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._half_bits = half_bits
+        self._half_mask = (1 << half_bits) - 1
+
+        rng = random.Random(seed)
+        self._keys = [rng.getrandbits(64) for _ in range(_ROUNDS)]
+
+    def __getitem__(self, idx: int) -> int:
+        if not 0 <= idx < self._size:
+            raise IndexError(f"{idx} is out of range")
+
+        value = self._encrypt(idx)
+        while value >= self._size:
+            value = self._encrypt(value)
+        return value
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _encrypt(self, value: int) -> int:
+        half_bits, half_mask = self._half_bits, self._half_mask
+
+        left, right = value >> half_bits, value & half_mask
+        for key in self._keys:
+            left, right = right, left ^ (_mix(right ^ key) & half_mask)
+        return (left << half_bits) | right
+
+
+# ----- Helpers -----
+def _mix(value: int) -> int:
+    """The round function, which is the finalizer of SplitMix64."""
+
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
@@ -1,30 +1,140 @@
 from __future__ import annotations
 
-from typing import Protocol
-from whoosh.index import open_dir
+import itertools
+import math
+import shutil
+import time
+from typing import AbstractSet, Callable, Iterable, Iterator, Literal, Protocol
+from whoosh.collectors import TimeLimit, TimeLimitCollector
+from whoosh.filedb.filestore import FileStorage, RamStorage
+from whoosh.index import Index
+from whoosh.query import (
+    And,
+    AndMaybe,
+    AndNot,
+    CompoundQuery,
+    DisjunctionMax,
+    Every,
+    Not,
+    NullQuery,
+    Or,
+    Phrase,
+    Prefix,
+    Query,
+    Term,
+    Wildcard,
+)
+from whoosh.reading import IndexReader
+from whoosh.searching import Searcher
 from whoosh.qparser import QueryParser, OrGroup, MultifieldParser
 from whoosh import qparser
 from loguru import logger
 
+from past_years.cache import LRUCache
+from past_years.context import ctx
+from past_years.errors import QueryTooComplexError
+from past_years.metrics import TRUNCATED_SEARCHES
+
+from .fuzzy import FuzzyIndex, build_fuzzy_index, fuzzy_index_fp, load_fuzzy_index
+from .highlighter import Highlighter
+from .search_types import Question, QuestionHighlights, parse_question_id
+
+# Where the index is read from i.e. from the files on disk or from a copy
+# of the files held in memory.
+IndexStorage = Literal["file", "ram"]
+
 
 class QuerySearcherProtocol(Protocol):
     """Searcher that searches through documents
     based on user queries."""
 
-    def search(self, query: str) -> set[str]:
+    def search(self, query: str, fuzzy: bool = False) -> set[int]:
         """Returns the IDs of the documents that satisfy
-        the query."""
+        the query.
+
+        If `fuzzy` is `True`, then the misspelled words in the query
+        also match the words that are close to them."""
+        ...
+
+    def rank(self, query: str, fuzzy: bool = False) -> list[int]:
+        """Returns the IDs of the documents that satisfy the query, the
+        most relevant first."""
+        ...
+
+    def highlight(
+        self, questions: Iterable[Question], query: str, fuzzy: bool = False
+    ) -> dict[str, QuestionHighlights]:
+        """Returns the highlights of the words in the questions that match
+        the query, keyed by the IDs of the questions."""
         ...
 
 
 class WhooshSearcher(QuerySearcherProtocol):
     """A searcher that uses Whoosh as the underlying query
-    search engine."""
+    search engine.
+
+    The parsed queries, the terms the wildcards expand to and the hits of
+    each term are cached, so that the popular queries don't need to be
+    parsed or looked up in the index again. The cached expansions and hits
+    are dropped whenever a new generation of the index is committed. Since
+    checking for one lists the files of the index, it's only checked every
+    `refresh_interval` seconds (or on `reload`) and whenever the index has
+    to be opened anyway.
+
+    The fuzzy searches use the fuzzy index built along with the index
+    (see `past_years.search.fuzzy`). If it's missing or out of date, it's
+    built from the index on the first fuzzy search.
+
+    To cap the latency of the pathological queries, a search that runs out
+    of time skips the rest of the query and returns the hits found so far,
+    and a wildcard only matches a limited number of terms. Such partial
+    results are flagged by `ctx.search_truncated`. The queries with too
+    many terms are rejected outright.
+
+    Args:
+        index_dir: The path to the directory with the index.
+        index_name: The name of the index.
+        field_name: The name(s) of the field(s) that are searched.
+        cache_size: The maximum number of values held by each cache.
+        fuzzy_max_expansions: The maximum number of terms a misspelled
+            word is expanded to in the fuzzy searches.
+        highlight_cache_size: The maximum number of questions whose terms
+            are cached for highlighting.
+        storage: Where the index is read from. With "ram", the files of
+            the index are copied into memory when the searcher is created.
+        time_limit: The number of seconds a search may take. If `0`, the
+            searches are not limited.
+        max_expansions: The maximum number of terms a wildcard matches.
+            If `0`, the wildcards are not limited.
+        max_query_terms: The maximum number of terms in a query. If `0`,
+            the queries are not limited.
+        refresh_interval: The number of seconds between the checks for a
+            new generation of the index.
+        ranking_cache_size: The maximum number of rankings that are cached.
+            It's separate from `cache_size` since each ranking holds the
+            IDs of all the documents matching its query.
+    """
 
     def __init__(
-        self, index_dir: str, index_name: str, field_name: str | list[str]
+        self,
+        index_dir: str,
+        index_name: str,
+        field_name: str | list[str],
+        cache_size: int = 1024,
+        fuzzy_max_expansions: int = 5,
+        highlight_cache_size: int = 1024,
+        storage: IndexStorage = "file",
+        time_limit: float = 0.5,
+        max_expansions: int = 512,
+        max_query_terms: int = 32,
+        refresh_interval: float = 5.0,
+        ranking_cache_size: int = 32,
     ) -> None:
-        self._idx = open_dir(index_dir, index_name)
+        self._idx = open_index(index_dir, index_name, storage)
+        self._time_limit = time_limit
+        self._max_expansions = max_expansions
+        self._max_query_terms = max_query_terms
+        self._fields = [field_name] if isinstance(field_name, str) else field_name
 
         if isinstance(field_name, str):
             parser = QueryParser
@@ -41,13 +151,496 @@ class WhooshSearcher(QuerySearcherProtocol):
         )
         self._qparser.replace_plugin(qparser.OperatorsPlugin())
 
-        self._total_docs = self._idx.doc_count()
+        self._parsed_queries: LRUCache[tuple[str, bool], Query] = LRUCache(
+            "parsed_query", cache_size
+        )
+        self._expansions: LRUCache[Query, tuple[list[Term], bool]] = LRUCache(
+            "wildcard_expansion", cache_size
+        )
+        self._term_hits: LRUCache[Term, frozenset[int]] = LRUCache(
+            "term_hits", cache_size
+        )
+        self._query_terms: LRUCache[tuple[str, bool], frozenset[str]] = LRUCache(
+            "query_terms", cache_size
+        )
+        self._rankings: LRUCache[tuple[str, bool], list[int]] = LRUCache(
+            "rankings", ranking_cache_size
+        )
+
+        # NOTE: Only the first field is highlighted.
+        analyzer = self._idx.schema[self._fields[0]].analyzer
+        self._highlighter = Highlighter(analyzer, highlight_cache_size)
+
+        self._fuzzy_fp = fuzzy_index_fp(index_dir, index_name)
+        self._fuzzy_idx: FuzzyIndex | None = None
+        self._fuzzy_max_expansions = fuzzy_max_expansions
+
+        self._refresh_interval = refresh_interval
+        self._checked_at = time.monotonic()
+        self._generation = -1
+        self._doc_ids: dict[int, int] = {}
+        self._all_ids: frozenset[int] = frozenset()
+        self._refresh()
+
+    def search(self, query: str, fuzzy: bool = False) -> set[int]:
+        logger.debug("Searching for query: {} (fuzzy: {})", query, fuzzy)
+
+        self._check_generation()
+
+        deadline = _Deadline(self._time_limit)
+        parsed_query = self._parse(query, fuzzy)
+        # The index is only opened if something isn't cached.
+        with _LazySearcher(self._open_searcher) as searcher:
+            hits = set(self._get_hits(parsed_query, searcher, deadline))
+
+        self._report_truncation(query, deadline)
+        return hits
+
+    def rank(self, query: str, fuzzy: bool = False) -> list[int]:
+        self._check_generation()
+
+        key = (" ".join(query.split()), fuzzy)
+        ranking = self._rankings.get(key)
+        if ranking is None:
+            deadline = _Deadline(self._time_limit)
+            parsed_query = self._parse(query, fuzzy)
+            with _LazySearcher(self._open_searcher) as searcher:
+                # The wildcards are expanded as they are when searching,
+                # so that they match at most `max_expansions` terms.
+                parsed_query = parsed_query.accept(
+                    lambda subquery: self._expand_wildcard(subquery, searcher, deadline)
+                )
+                results = []
+                if deadline.expired():
+                    # The time ran out while parsing or expanding the query.
+                    deadline.cut()
+                else:
+                    results = self._collect(parsed_query, searcher.get(), deadline)
+                ranking = [self._doc_ids[hit.docnum] for hit in results]
+
+            # The partial rankings aren't cached so that the query gets
+            # another chance at completing.
+            if not deadline.truncated:
+                self._rankings.put(key, ranking)
+            self._report_truncation(query, deadline)
+
+        return ranking
+
+    def highlight(
+        self, questions: Iterable[Question], query: str, fuzzy: bool = False
+    ) -> dict[str, QuestionHighlights]:
+        terms = self._get_query_terms(query, fuzzy)
+
+        highlights: dict[str, QuestionHighlights] = {}
+        for question in questions:
+            question_highlights = self._highlighter.highlight(question, terms)
+            if question_highlights is not None:
+                highlights[question.id] = question_highlights
+
+        return highlights
+
+    def reload(self):
+        """Switches to the latest generation of the index, if it's not
+        already being used."""
+
+        self._checked_at = time.monotonic()
+        if self._idx.latest_generation() != self._generation:
+            self._refresh()
+
+    # ----- Private Methods -----
+    def _open_searcher(self) -> Searcher:
+        """Opens a searcher of the latest generation of the index, switching
+        to the generation if it's a new one so that the document numbers of
+        its hits are mapped correctly."""
+
+        searcher = self._idx.searcher()
+        if searcher.reader().generation() != self._generation:
+            self._refresh(searcher)
+        return searcher
+
+    def _check_generation(self):
+        """Reloads the index if it hasn't been checked for a new generation
+        in the last `refresh_interval` seconds."""
+
+        if time.monotonic() - self._checked_at >= self._refresh_interval:
+            self.reload()
+
+    def _parse(self, query: str, fuzzy: bool) -> Query:
+        # NOTE: The query isn't lowercased since the operators are
+        # case sensitive.
+        key = (" ".join(query.split()), fuzzy)
+
+        parsed_query = self._parsed_queries.get(key)
+        if parsed_query is None:
+            parsed_query = self._qparser.parse(key[0])
+
+            num_of_terms = sum(1 for _ in parsed_query.leaves())
+            if self._max_query_terms and num_of_terms > self._max_query_terms:
+                raise QueryTooComplexError(
+                    key[0], f"it has more than {self._max_query_terms} terms"
+                )
+
+            if fuzzy:
+                parsed_query = parsed_query.accept(self._expand_misspelled)
+            self._parsed_queries.put(key, parsed_query)
+
+        return parsed_query
+
+    def _get_query_terms(self, query: str, fuzzy: bool) -> frozenset[str]:
+        """Returns the terms in the index that the query matches on."""
+
+        key = (" ".join(query.split()), fuzzy)
+        terms = self._query_terms.get(key)
+        if terms is None:
+            deadline = _Deadline(self._time_limit)
+            with _LazySearcher(self._open_searcher) as searcher:
+                terms = frozenset(
+                    self._collect_terms(self._parse(query, fuzzy), searcher, deadline)
+                )
+            if not deadline.truncated:
+                self._query_terms.put(key, terms)
+
+        return terms
+
+    def _collect_terms(
+        self, query: Query, searcher: _LazySearcher, deadline: _Deadline
+    ) -> Iterator[str]:
+        """Yields the terms of the query, leaving out the negated ones."""
+
+        if isinstance(query, Term):
+            yield query.text
+        elif isinstance(query, (Prefix, Wildcard)):
+            terms = self._expand(query, searcher, deadline)
+            yield from (term.text for term in terms)
+        elif isinstance(query, Phrase):
+            yield from query.words
+        elif isinstance(query, (AndNot, AndMaybe)):
+            yield from self._collect_terms(query.a, searcher, deadline)
+        elif isinstance(query, Not):
+            return
+        elif isinstance(query, CompoundQuery):
+            for subquery in query.subqueries:
+                yield from self._collect_terms(subquery, searcher, deadline)
+
+    def _expand_misspelled(self, query: Query) -> Query:
+        """Expands the term, if it's not in the index, to the terms in the
+        index closest to it."""
+
+        if type(query) is not Term:
+            return query
+
+        fuzzy_idx = self._get_fuzzy_index()
+        terms = fuzzy_idx.lookup(query.text, self._fuzzy_max_expansions)
+        if not terms or terms[0] == query.text:
+            return query
+
+        logger.trace("Expanded '{}' to {}", query.text, terms)
+        return Or([Term(query.fieldname, term) for term in terms])
+
+    def _get_fuzzy_index(self) -> FuzzyIndex:
+        fuzzy_idx = self._fuzzy_idx
+        if fuzzy_idx is not None:
+            return fuzzy_idx
+
+        fuzzy_idx = load_fuzzy_index(self._fuzzy_fp)
+        if fuzzy_idx is None or fuzzy_idx.generation != self._generation:
+            logger.info("Building the fuzzy index of generation {}", self._generation)
+            with self._idx.searcher() as searcher:
+                fuzzy_idx = build_fuzzy_index(
+                    get_term_counts(searcher.reader(), self._fields), self._generation
+                )
+
+        self._fuzzy_idx = fuzzy_idx
+        return fuzzy_idx
+
+    def _get_hits(
+        self, query: Query, searcher: _LazySearcher, deadline: _Deadline
+    ) -> AbstractSet[int]:
+        """Returns the IDs of the documents matching the query.
+
+        The boolean queries are evaluated here out of the hits of their
+        terms. Every other kind of query (e.g. phrases) is evaluated by
+        Whoosh.
+
+        Once the deadline has passed, the terms that aren't cached are
+        treated as matching nothing. So, the hits are always a subset of
+        the actual hits, which is why a negation whose hits were cut short
+        matches nothing.
+        """
+
+        if type(query) is Term:
+            return self._get_term_hits(query, searcher, deadline)
+        if isinstance(query, (Prefix, Wildcard)):
+            hits: set[int] = set()
+            for term in self._expand(query, searcher, deadline):
+                hits |= self._get_term_hits(term, searcher, deadline)
+            return hits
+        if isinstance(query, (Or, DisjunctionMax)):
+            hits = set()
+            for subquery in query.subqueries:
+                hits |= self._get_hits(subquery, searcher, deadline)
+            return hits
+        if isinstance(query, And):
+            subqueries = iter(query.subqueries)
+            hits = set(self._get_hits(next(subqueries), searcher, deadline))
+            for subquery in subqueries:
+                if not hits:
+                    break
+                hits &= self._get_hits(subquery, searcher, deadline)
+            return hits
+        if isinstance(query, AndNot):
+            hits = self._get_hits(query.a, searcher, deadline)
+            return self._exclude(hits, query.b, searcher, deadline)
+        if isinstance(query, AndMaybe):
+            return self._get_hits(query.a, searcher, deadline)
+        if isinstance(query, Not):
+            return self._exclude(self._all_ids, query.query, searcher, deadline)
+        if isinstance(query, Every):
+            return self._all_ids
+        if query is NullQuery:
+            return frozenset()
+
+        if deadline.expired():
+            deadline.cut()
+            return frozenset()
+        return {
+            self._doc_ids[docnum] for docnum in searcher.get().docs_for_query(query)
+        }
+
+    def _exclude(
+        self,
+        hits: AbstractSet[int],
+        query: Query,
+        searcher: _LazySearcher,
+        deadline: _Deadline,
+    ) -> AbstractSet[int]:
+        """Returns the hits that don't match the query."""
+
+        cuts = deadline.cuts
+        excluded = self._get_hits(query, searcher, deadline)
+        if deadline.cuts != cuts:
+            return frozenset()
+        return hits - excluded
+
+    def _get_term_hits(
+        self, term: Term, searcher: _LazySearcher, deadline: _Deadline
+    ) -> frozenset[int]:
+        hits = self._term_hits.get(term)
+        if hits is None:
+            if deadline.expired():
+                deadline.cut()
+                return frozenset()
+
+            doc_ids = self._doc_ids
+            hits = frozenset(doc_ids[d] for d in searcher.get().docs_for_query(term))
+            self._term_hits.put(term, hits)
+
+        return hits
+
+    def _expand(
+        self, query: Prefix | Wildcard, searcher: _LazySearcher, deadline: _Deadline
+    ) -> list[Term]:
+        """Returns the terms in the index that the wildcard matches, upto
+        the maximum number of expansions."""
+
+        expansion = self._expansions.get(query)
+        if expansion is not None:
+            terms, capped = expansion
+            if capped:
+                deadline.cut()
+            return terms
+
+        field = self._idx.schema[query.fieldname]
+        btexts = query._btexts(searcher.get().reader())
+        if self._max_expansions:
+            btexts = itertools.islice(btexts, self._max_expansions + 1)
+
+        terms = []
+        for btext in btexts:
+            if deadline.expired():
+                # The expansion is incomplete, so it's not cached.
+                deadline.cut()
+                return terms
+            terms.append(Term(query.fieldname, field.from_bytes(btext)))
+
+        capped = bool(self._max_expansions) and len(terms) > self._max_expansions
+        if capped:
+            terms.pop()
+            deadline.cut()
+        self._expansions.put(query, (terms, capped))
+
+        return terms
+
+    def _expand_wildcard(
+        self, query: Query, searcher: _LazySearcher, deadline: _Deadline
+    ) -> Query:
+        """Replaces the wildcard with the terms it matches, upto the maximum
+        number of expansions."""
+
+        if not isinstance(query, (Prefix, Wildcard)):
+            return query
+
+        terms = self._expand(query, searcher, deadline)
+        return Or(terms, boost=query.boost) if terms else NullQuery
+
+    def _collect(self, query: Query, searcher: Searcher, deadline: _Deadline):
+        """Returns the scored results of the query, which are partial if
+        the deadline passes while they're being collected."""
+
+        collector = searcher.collector(limit=None)
+        if deadline.is_limited:
+            # NOTE: The alarm signal can only be used in the main thread,
+            # so the time is checked after each hit instead.
+            collector = TimeLimitCollector(
+                collector, deadline.remaining(), use_alarm=False
+            )
+
+        try:
+            searcher.search_with_collector(query, collector)
+        except TimeLimit:
+            deadline.cut()
+        return collector.results()
+
+    def _report_truncation(self, query: str, deadline: _Deadline):
+        if deadline.truncated:
+            logger.warning("The search for `{}` was truncated", query)
+            TRUNCATED_SEARCHES.inc()
+            ctx.search_truncated = True
+
+    def _refresh(self, searcher: Searcher | None = None):
+        """Drops everything cached from the previous generation of the index.
+
+        Args:
+            searcher: A searcher of the generation being switched to. If not
+                given, the latest generation is switched to.
+        """
+
+        if searcher is None:
+            with self._idx.searcher() as searcher:
+                self._load_generation(searcher)
+        else:
+            self._load_generation(searcher)
+
+        self._parsed_queries.clear()
+        self._expansions.clear()
+        self._term_hits.clear()
+        self._query_terms.clear()
+        self._rankings.clear()
+        self._fuzzy_idx = None
+        logger.debug("Using generation {} of the index", self._generation)
+
+    def _load_generation(self, searcher: Searcher):
+        self._generation = searcher.reader().generation()
+        self._doc_ids = {
+            docnum: _get_id(fields["id"])
+            for docnum, fields in searcher.reader().iter_docs()
+        }
+        self._all_ids = frozenset(self._doc_ids.values())
+
+
+class _Deadline:
+    """The time by which a search has to finish.
+
+    The parts of a search that are skipped since it ran out of time (or
+    since a wildcard matched too many terms) are counted as cuts, and a
+    search with any cuts has truncated results.
+    """
+
+    __slots__ = ("_end_time", "cuts")
+
+    def __init__(self, time_limit: float):
+        self._end_time = time.monotonic() + time_limit if time_limit else math.inf
+        self.cuts = 0
+
+    @property
+    def is_limited(self) -> bool:
+        return self._end_time != math.inf
+
+    @property
+    def truncated(self) -> bool:
+        return self.cuts > 0
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self._end_time
+
+    def remaining(self) -> float:
+        return max(0.0, self._end_time - time.monotonic())
+
+    def cut(self):
+        self.cuts += 1
+
+
+class _LazySearcher:
+    """Opens a searcher of the index only when it's first needed."""
+
+    def __init__(self, open_searcher: Callable[[], Searcher]):
+        self._open_searcher = open_searcher
+        self._searcher: Searcher | None = None
+
+    def get(self) -> Searcher:
+        if self._searcher is None:
+            self._searcher = self._open_searcher()
+        return self._searcher
+
+    def __enter__(self) -> _LazySearcher:
+        return self
+
+    def __exit__(self, *args: object):
+        if self._searcher is not None:
+            self._searcher.close()
+
+
+def open_index(
+    index_dir: str, index_name: str, storage: IndexStorage = "file"
+) -> Index:
+    """Opens the index in the directory.
+
+    With the "ram" storage, the files of the index are copied into memory
+    so that the searches don't go through the filesystem. Since it's a
+    copy, the generations committed after it's opened are not seen.
+    """
+
+    file_storage = FileStorage(str(index_dir), readonly=True)
+    if storage == "file":
+        return file_storage.open_index(index_name)
+
+    # The files of an index are prefixed by its name, with the table of
+    # contents being prefixed by an underscore as well.
+    ram_storage = RamStorage()
+    prefixes = (f"{index_name}_", f"_{index_name}_")
+    for file_name in file_storage.list():
+        if not file_name.startswith(prefixes):
+            continue
+
+        with file_storage.open_file(file_name) as src:
+            with ram_storage.create_file(file_name) as dest:
+                shutil.copyfileobj(src, dest)
+
+    logger.info("Copied the `{}` index into memory", index_name)
+    return ram_storage.open_index(index_name)
+
+
+def get_term_counts(
+    reader: IndexReader, fields: list[str]
+) -> Iterator[tuple[str, int]]:
+    """Returns the terms of the fields in the index along with the number
+    of documents they're in."""
+
+    terms: dict[str, int] = {}
+    for field in fields:
+        from_bytes = reader.schema[field].from_bytes
+        for btext in reader.lexicon(field):
+            term = from_bytes(btext)
+            terms[term] = terms.get(term, 0) + reader.doc_frequency(field, btext)
+
+    return iter(terms.items())
+
 
-    def search(self, query: str) -> set[str]:
-        logger.debug(f"Searching for query: {query}")
+def _get_id(stored_id: int | str) -> int:
+    """Returns the integer ID from the stored ID.
 
-        parsed_query = self._qparser.parse(query)
+    NOTE: Older indexes stored the hex representation of the IDs."""
 
-        with self._idx.searcher() as searcher:
-            results = searcher.search(parsed_query, limit=self._total_docs)
-            return {hit["id"] for hit in results}
+    if isinstance(stored_id, int):
+        return stored_id
+    return parse_question_id(stored_id)
@@ -1,34 +1,86 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Iterable, Iterator, Protocol
+from typing import (
+    AbstractSet,
+    Any,
+    Iterable,
+    Iterator,
+    Mapping,
+    Protocol,
+    Sequence,
+)
 
 import msgspec
 
+from .cube import build_questions_cube, load_questions_cube, questions_cube_fp
+from .index_format import bank_fingerprint, binary_index_fp, decode_questions_index
+from .similarity import load_similar_questions_index, similar_questions_fp
+from .suggester import (
+    TermSuggester,
+    build_term_suggester,
+    load_term_suggester,
+    term_suggester_fp,
+)
+from .question_store import StorageType, store_questions
 from .search_types import (
     Exam,
     Question,
     Filter,
     QuestionsIndex,
     QuestionsMetadata,
+    SortOrder,
     Subject,
+    parse_question_id,
 )
 from loguru import logger
 
+from past_years.errors import InvalidIndexError, InvalidQuestionIdError
+from past_years.metrics import record_cache_lookup, timed_startup_phase
+
+# How to fix an index that can't be used, for the errors
+_RECREATE_INDEX = "Re-create it with `python pasty.py index questions`"
+
 
 class QuestionBankProtocol(Protocol):
     """The question bank that holds all the questions and
     conducts the filtering."""
 
-    def filter(self, filter_obj: Filter) -> set[str]:
-        """Returns the questions that satisfy the given filter.
+    def filter(self, filter_obj: Filter) -> set[int]:
+        """Returns the IDs of the questions that satisfy the given filter.
 
         NOTE: This does NOT consider the `q` or the query filter.
         """
         ...
 
-    def get_questions(self, ids: set[str]) -> Iterable[Question]:
-        """Returns the questions that have the given IDs."""
+    def filter_ordered(self, filter_obj: Filter) -> Sequence[int]:
+        """Returns the IDs of the questions that satisfy the given filter,
+        in an order that stays the same as long as the questions do.
+
+        NOTE: This does NOT consider the `q` or the query filter.
+        """
+        ...
+
+    def count(self, filter_obj: Filter) -> int:
+        """Returns the number of questions that satisfy the given filter.
+
+        NOTE: This does NOT consider the `q` or the query filter.
+        """
+        ...
+
+    def get_questions(
+        self, ids: AbstractSet[int], sort: SortOrder | None = None
+    ) -> Iterable[Question]:
+        """Returns the questions that have the given IDs, in the given order.
+
+        NOTE: The questions can't be sorted by relevance by the question bank.
+        """
+
+        ...
+
+    def similar(self, id: int) -> list[tuple[int, float]]:
+        """Returns the IDs of the questions most similar to the question
+        with the given ID along with their similarity, the most similar first."""
 
         ...
 
@@ -38,10 +90,16 @@ class QuestionBankProtocol(Protocol):
 
         ...
 
-    def __getitem__(self, id: str) -> Question:
+    @property
+    def suggester(self) -> TermSuggester:
+        """The suggester of the terms in the questions."""
+
+        ...
+
+    def __getitem__(self, id: int) -> Question:
         ...
 
-    def __contains__(self, id: str) -> bool:
+    def __contains__(self, id: int) -> bool:
         ...
 
     def __iter__(self) -> Iterator[Question]:
@@ -56,98 +114,210 @@ class QuestionBank(QuestionBankProtocol):
     conducts the filtering.
 
     This loads all the questions from a file/directory and holds all
-    the questions in memory.
+    the questions in memory, either decoded or compressed.
     """
 
-    def __init__(self, questions_fp: str | Path, questions_idx: str | Path):
+    def __init__(
+        self,
+        questions_fp: str | Path,
+        questions_idx: str | Path,
+        storage: StorageType = "memory",
+        cache_size: int = 1024,
+    ):
         """
         Arguments:
             fp: The path to the file/directory that holds all the
             questions.
 
             questions_idx: The path to the questions index file.
+
+            storage: How the questions are held in memory. With the
+            "compressed" storage, the questions are decompressed on access.
+
+            cache_size: The number of decompressed questions that are held
+            when the "compressed" storage is used.
         """
 
         questions_fp, idx_fp = Path(questions_fp), Path(questions_idx)
 
         self._metadata: QuestionsMetadata | None = None
-        self._questions = QuestionBank.load_questions(questions_fp)
-        self._all_ids: set[str] = set(self._questions.keys())
-
-        logger.debug(f"Loading index from `{idx_fp}`")
-        self._idx = msgspec.json.decode(idx_fp.read_bytes(), type=QuestionsIndex)
+        with timed_startup_phase("bank_load"):
+            questions = QuestionBank.load_questions(questions_fp)
+            self._all_ids: set[int] = set(questions.keys())
+            fingerprint = bank_fingerprint(questions.values())
+            self._questions = store_questions(questions, storage, cache_size)
+
+        with timed_startup_phase("index_load"):
+            self._idx = self._load_index(idx_fp, fingerprint)
+
+            # The IDs of all the questions in each of the orders, so that the
+            # questions don't need to be sorted on every request.
+            self._orderings = self._create_orderings()
+
+            self._similar = load_similar_questions_index(
+                similar_questions_fp(idx_fp), fingerprint
+            )
+
+            # The IDs sorted by their (exam, subject, year), so that every
+            # filter is a union of contiguous ranges of them.
+            cube = load_questions_cube(questions_cube_fp(idx_fp), fingerprint)
+            if cube is None:
+                cube = build_questions_cube(self._idx, self._questions)
+            self._cube = cube
+
+        with timed_startup_phase("suggester_build"):
+            # Built from the questions before they're compressed, if it
+            # has to be built.
+            suggester = load_term_suggester(term_suggester_fp(idx_fp), fingerprint)
+            if suggester is None:
+                suggester = build_term_suggester(questions.values())
+            self._suggester = suggester
 
     @property
     def metadata(self) -> QuestionsMetadata:
+        record_cache_lookup("metadata", self._metadata is not None)
         if self._metadata is not None:
             return self._metadata
 
-        exams, subjects, years = set(), set(), set()
-        for q in self:
-            exams.add(q.exam)
-            subjects.add(q.subject)
-            years.add(q.year)
+        # The index holds every exam, subject and year, which saves going
+        # through (and possibly decompressing) all the questions.
+        exams, subjects, years = (
+            set(self._idx.exams),
+            set(self._idx.subjects),
+            set(self._idx.years),
+        )
 
         self._metadata = QuestionsMetadata(
             exams=exams, subjects=subjects, years=years, total_questions=len(self)
         )
         return self._metadata
 
-    def get_questions(self, ids: set[str]) -> Iterable[Question]:
-        return filter(lambda q: q.id in ids, iter(self))
+    @property
+    def suggester(self) -> TermSuggester:
+        return self._suggester
+
+    def get_questions(
+        self, ids: AbstractSet[int], sort: SortOrder | None = None
+    ) -> Iterable[Question]:
+        questions = self._questions
+        ordering: Iterable[int] = questions
+        if sort is not None and sort in self._orderings:
+            ordering = self._orderings[sort]
 
-    def filter(self, filter_obj: Filter) -> set[str]:
-        logger.debug(f"Filter with filter: {filter_obj}")
+        return (questions[id] for id in ordering if id in ids)
 
-        filtered_ids: set[str] = self._all_ids
-        if filter_obj.exams:
-            exam_ids = self._filter_by_exams(filter_obj.exams)
-            filtered_ids = filtered_ids.intersection(exam_ids)
-        if filter_obj.subjects:
-            subject_ids = self._filter_by_subjects(filter_obj.subjects)
-            filtered_ids = filtered_ids.intersection(subject_ids)
-        if filter_obj.years:
-            year_ids = self._filter_by_year(filter_obj.years)
-            filtered_ids = filtered_ids.intersection(year_ids)
+    def similar(self, id: int) -> list[tuple[int, float]]:
+        if self._similar is None:
+            return []
+        return self._similar.similar.get(id, [])
 
-        return filtered_ids
+    def filter(self, filter_obj: Filter) -> set[int]:
+        logger.debug("Filter with filter: {}", filter_obj)
 
-    # ----- Private Methods -----
-    def _filter_by_exams(self, exams: Iterable[Exam]) -> set[str]:
-        logger.trace(f"Filter by exams: {exams}")
+        if not filter_obj.is_filtered:
+            return self._all_ids
+
+        ids = self._cube.ids(self._get_ranges(filter_obj))
+        ids -= filter_obj.exclude_ids
+        return ids
 
-        all_exams: set[str] = set()
-        for exam in exams:
-            all_exams |= self._idx.exams[exam]
-        return all_exams
+    def filter_ordered(self, filter_obj: Filter) -> Sequence[int]:
+        logger.debug("Filter in order with filter: {}", filter_obj)
 
-    def _filter_by_subjects(self, subjects: Iterable[Subject]) -> set[str]:
-        logger.trace(f"Filter by subjects: {subjects}")
+        if filter_obj.exclude_ids:
+            return sorted(self.filter(filter_obj))
+        return self._cube.view(self._get_ranges(filter_obj))
 
-        all_subjects: set[str] = set()
-        for subject in subjects:
-            all_subjects |= self._idx.subjects[subject]
-        return all_subjects
+    def count(self, filter_obj: Filter) -> int:
+        logger.debug("Count with filter: {}", filter_obj)
 
-    def _filter_by_year(self, years: Iterable[int]) -> set[str]:
-        logger.trace(f"Filter by years: {years}")
+        ranges = self._get_ranges(filter_obj)
+        return self._cube.count(ranges, filter_obj.exclude_ids)
+
+    # ----- Private Methods -----
+    def _get_ranges(self, filter_obj: Filter) -> list[tuple[int, int]]:
+        return self._cube.ranges(
+            filter_obj.exams,
+            filter_obj.subjects,
+            filter_obj.years,
+            filter_obj.year_ranges,
+            filter_obj.exclude_exams,
+            filter_obj.exclude_subjects,
+        )
+
+    def _create_orderings(self) -> dict[SortOrder, list[int]]:
+        """Returns the IDs of the questions in each of the orders, with the
+        questions that are equal being in the order of the question bank.
+
+        NOTE: These are built from the index so that none of the questions
+        need to be decompressed.
+        """
 
-        all_years: set[str] = set()
-        for year in years:
-            all_years |= self._idx.years[year]
-        return all_years
+        logger.debug("Creating the orderings of the questions")
+
+        ranks = {id: idx for idx, id in enumerate(self._questions)}
+
+        # The IDs in the index that aren't in the question bank are left out.
+        def order_by(groups: Mapping[Any, set[int]], reverse: bool = False):
+            return [
+                id
+                for key in sorted(groups, reverse=reverse)
+                for id in sorted(ranks.keys() & groups[key], key=ranks.__getitem__)
+            ]
+
+        return {
+            SortOrder.YEAR: order_by(self._idx.years),
+            SortOrder.YEAR_DESC: order_by(self._idx.years, reverse=True),
+            SortOrder.EXAM: order_by(self._idx.exams),
+            SortOrder.SUBJECT: order_by(self._idx.subjects),
+        }
+
+    def _load_index(self, idx_fp: Path, fingerprint: bytes) -> QuestionsIndex:
+        """Loads the binary index if there is a usable one next to the
+        JSON index, else the JSON index."""
+
+        bin_fp = binary_index_fp(idx_fp)
+        if bin_fp.is_file():
+            logger.debug("Loading index from `{}`", bin_fp)
+            try:
+                return decode_questions_index(bin_fp.read_bytes(), bin_fp, fingerprint)
+            except InvalidIndexError as e:
+                logger.warning("{}. Falling back to `{}`", e.msg, idx_fp)
+
+        logger.debug("Loading index from `{}`", idx_fp)
+        idx_bytes = idx_fp.read_bytes()
+        try:
+            return msgspec.json.decode(idx_bytes, type=QuestionsIndex)
+        except msgspec.ValidationError:
+            pass
+        except msgspec.DecodeError as e:
+            raise InvalidIndexError(idx_fp, f"{e}. {_RECREATE_INDEX}") from e
+
+        # The indexes created before the IDs were held as integers have
+        # the IDs as hex strings.
+        try:
+            legacy_idx = msgspec.json.decode(idx_bytes, type=_LegacyQuestionsIndex)
+            idx = legacy_idx.to_index()
+        except (msgspec.DecodeError, msgspec.ValidationError) as e:
+            raise InvalidIndexError(idx_fp, f"{e}. {_RECREATE_INDEX}") from e
+        except InvalidQuestionIdError as e:
+            raise InvalidIndexError(idx_fp, f"{e.msg}. {_RECREATE_INDEX}") from e
+
+        logger.warning("The index at `{}` is outdated. {}", idx_fp, _RECREATE_INDEX)
+        return idx
 
     # ----- Static Methods -----
     @staticmethod
-    def load_questions(questions_fp: Path) -> dict[str, Question]:
-        """Loads the questions from the given file.
+    def load_questions(questions_fp: Path) -> dict[int, Question]:
+        """Loads the questions from the given file, keyed by their
+        integer IDs.
 
         Args:
             questions_fp: The path to the file/directory with the
                 questions.
         """
 
-        logger.debug(f"Loading questions from `{questions_fp}`")
+        logger.debug("Loading questions from `{}`", questions_fp)
 
         questions: list[Question] = []
         if questions_fp.is_file():
@@ -156,19 +326,20 @@ class QuestionBank(QuestionBankProtocol):
             questions.extend(fp_questions)
         else:
             for fp in questions_fp.rglob("*.json"):
-                logger.trace(f"Loading questions from `{fp}`")
+                logger.trace("Loading questions from `{}`", fp)
 
                 file_bytes = fp.read_bytes()
                 fp_questions = msgspec.json.decode(file_bytes, type=list[Question])
                 questions.extend(fp_questions)
 
-        return {q.id: q for q in questions}
+        _deduplicate_strings(questions)
+        return {parse_question_id(q.id): q for q in questions}
 
     # ----- Dunder Methods -----
-    def __contains__(self, id: str) -> bool:
+    def __contains__(self, id: int) -> bool:
         return id in self._questions
 
-    def __getitem__(self, id: str):
+    def __getitem__(self, id: int):
         return self._questions[id]
 
     def __iter__(self) -> Iterator[Question]:
@@ -176,3 +347,42 @@ class QuestionBank(QuestionBankProtocol):
 
     def __len__(self) -> int:
         return len(self._questions)
+
+
+# ----- Helpers -----
+class _LegacyQuestionsIndex(msgspec.Struct):
+    """The questions index with the IDs as hex strings."""
+
+    exams: dict[Exam, set[str]] = {}
+    subjects: dict[Subject, set[str]] = {}
+    years: dict[int, set[str]] = {}
+
+    def to_index(self) -> QuestionsIndex:
+        def parse(section: dict[Any, set[str]]) -> dict[Any, set[int]]:
+            return {
+                key: set(map(parse_question_id, ids)) for key, ids in section.items()
+            }
+
+        return QuestionsIndex(
+            exams=parse(self.exams),
+            subjects=parse(self.subjects),
+            years=parse(self.years),
+        )
+
+
+def _deduplicate_strings(questions: Iterable[Question]):
+    """Makes the questions share a single copy of each of the repeated strings.
+
+    The continuations, options and answers are often repeated across the
+    questions e.g. "Select the correct answer using the code given below.",
+    but every question gets its own copy of them when decoded.
+    """
+
+    pool: dict[str, str] = {}
+    dedup = pool.setdefault
+
+    for q in questions:
+        q.continuation = dedup(q.continuation, q.continuation)
+        q.correct_answer = dedup(q.correct_answer, q.correct_answer)
+        q.question_options = tuple(dedup(o, o) for o in q.question_options)
+        q.answers = {dedup(k, k): dedup(v, v) for k, v in q.answers.items()}
@@ -0,0 +1,199 @@
+"""Storage of the questions of a question bank."""
+from __future__ import annotations
+
+import threading
+import zlib
+from array import array
+from collections import Counter
+from typing import Iterable, Iterator, Literal, Mapping, Protocol
+
+import msgspec
+
+from past_years.cache import LRUCache
+
+from .search_types import Question
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+StorageType = Literal["memory", "compressed"]
+
+# The maximum size of the dictionary used for compressing the questions.
+# NOTE: `zlib` can only use the last 32 KiB of the dictionary.
+_ZLIB_DICT_SIZE = 32 * 1024
+_ZSTD_DICT_SIZE = 112 * 1024
+
+# The questions are compressed at startup, so the level trades a little
+# size for a much faster startup. For 20k questions, level 9 takes ~0.3s
+# and is 3% larger than level 19, which takes ~8s.
+_ZSTD_LEVEL = 9
+
+
+class _Codec(Protocol):
+    """Compresses and decompresses single questions."""
+
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    def decompress(self, data: memoryview) -> bytes:
+        ...
+
+
+class _ZlibCodec:
+    """A codec using `zlib` with a preset dictionary."""
+
+    def __init__(self, zdict: bytes):
+        self._zdict = zdict
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(9, zdict=self._zdict)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: memoryview) -> bytes:
+        return zlib.decompressobj(zdict=self._zdict).decompress(data)
+
+
+class _ZstdCodec:
+    """A codec using `zstd` with a dictionary trained on the questions."""
+
+    def __init__(self, samples: list[bytes], fallback_dict: bytes):
+        assert zstandard is not None
+
+        try:
+            zdict = zstandard.train_dictionary(_ZSTD_DICT_SIZE, samples)
+        except zstandard.ZstdError:
+            # Training needs a reasonably large number of samples, which
+            # small banks don't have.
+            zdict = zstandard.ZstdCompressionDict(fallback_dict)
+
+        self._zdict = zdict
+        self._compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL, dict_data=zdict)
+        self._local = threading.local()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: memoryview) -> bytes:
+        # NOTE: Each thread has its own decompressor since they can't be
+        # used by multiple threads at once, but setting one up with the
+        # dictionary is too slow to do on every access.
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._zdict)
+            self._local.decompressor = decompressor
+        return decompressor.decompress(data)
+
+
+class CompressedQuestions(Mapping[int, Question]):
+    """Holds the questions compressed, decompressing them on access.
+
+    The most recently accessed questions are held decoded in a bounded
+    LRU cache, so that only the popular questions take up the full memory.
+    If `zstandard` is installed, the questions are compressed with `zstd`
+    using a dictionary trained on the questions, else with `zlib` using a
+    dictionary of the most common strings in the questions.
+
+    Args:
+        questions: The questions keyed by their IDs.
+        cache_size: The maximum number of decoded questions that are held.
+    """
+
+    _encoder = msgspec.msgpack.Encoder()
+    _decoder = msgspec.msgpack.Decoder(Question)
+
+    def __init__(self, questions: Mapping[int, Question], cache_size: int = 1024):
+        encoded = [self._encoder.encode(q) for q in questions.values()]
+        self._codec = _get_codec(encoded, questions.values())
+
+        # All the compressed questions are held in a single buffer, with
+        # the question at position `i` being at `offsets[i]:offsets[i + 1]`,
+        # which avoids the overhead of a `bytes` object per question.
+        self._positions: dict[int, int] = {}
+        self._offsets = array("Q", [0])
+        buffer = bytearray()
+        for position, (id, data) in enumerate(zip(questions, encoded)):
+            buffer += self._codec.compress(data)
+            self._positions[id] = position
+            self._offsets.append(len(buffer))
+        self._buffer = memoryview(bytes(buffer))
+
+        self._cache: LRUCache[int, Question] = LRUCache("questions", cache_size)
+
+    @property
+    def compressed_size(self) -> int:
+        """The total size (in bytes) of the compressed questions."""
+
+        return len(self._buffer)
+
+    def __getitem__(self, id: int) -> Question:
+        question = self._cache.get(id)
+        if question is not None:
+            return question
+
+        position = self._positions[id]
+        start, end = self._offsets[position], self._offsets[position + 1]
+        question = self._decoder.decode(self._codec.decompress(self._buffer[start:end]))
+
+        self._cache.put(id, question)
+        return question
+
+    def __contains__(self, id: object) -> bool:
+        return id in self._positions
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+
+def store_questions(
+    questions: dict[int, Question], storage: StorageType, cache_size: int
+) -> Mapping[int, Question]:
+    """Returns the questions held in the given type of storage."""
+
+    if storage == "memory":
+        return questions
+    if storage == "compressed":
+        return CompressedQuestions(questions, cache_size)
+
+    raise ValueError(f"'{storage}' is an invalid value for storage")
+
+
+# ----- Helpers -----
+
+
+def _get_codec(samples: list[bytes], questions: Iterable[Question]) -> _Codec:
+    if zstandard is not None:
+        return _ZstdCodec(samples, _build_dictionary(questions, _ZSTD_DICT_SIZE))
+
+    return _ZlibCodec(_build_dictionary(questions, _ZLIB_DICT_SIZE))
+
+
+def _build_dictionary(questions: Iterable[Question], size: int) -> bytes:
+    """Builds a dictionary out of the strings that are most commonly
+    repeated across the questions."""
+
+    counts: Counter[str] = Counter()
+    for q in questions:
+        counts[q.continuation] += 1
+        counts.update(q.question_options)
+        counts.update(q.answers.values())
+
+    parts: list[bytes] = []
+    total_size = 0
+    for string, count in counts.most_common():
+        if count < 2:
+            break
+
+        encoded = string.encode()
+        total_size += len(encoded)
+        if total_size > size:
+            break
+        parts.append(encoded)
+
+    # The most common strings are placed at the end since they're then
+    # the closest to the data being compressed.
+    return b"".join(reversed(parts))
@@ -1,35 +1,124 @@
-import itertools
-from math import exp, floor, log
-from random import random, randrange
-from typing import Iterable
-from past_years.errors import QuestionNotFoundError
-from past_years.search.query_searcher import QuerySearcherProtocol
+from __future__ import annotations
+
+from random import sample
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+from past_years.context import ctx
+from past_years.errors import QueryTooComplexError, QuestionNotFoundError
+from past_years.metrics import SEARCH_HITS, timed_stage
+from past_years.search.permutation import FeistelPermutation
 from past_years.search.question_bank import QuestionBankProtocol
-from past_years.search.search_types import Filter, Question, QuestionsMetadata
+from past_years.search.search_types import (
+    Filter,
+    HighlightedQuestions,
+    PracticeQuestions,
+    Question,
+    QuestionsBatch,
+    QuestionsMetadata,
+    SimilarQuestion,
+    SortOrder,
+    Suggestion,
+    format_question_id,
+)
+from past_years.search.suggester import TermSuggester
+
+if TYPE_CHECKING:
+    # The query searcher module imports Whoosh which is slow to import.
+    from past_years.search.query_searcher import QuerySearcherProtocol
 
 
 class QuestionSearchEngine:
     """A search engine for the questions."""
 
     def __init__(
-        self, question_bank: QuestionBankProtocol, query_searcher: QuerySearcherProtocol
+        self,
+        question_bank: QuestionBankProtocol,
+        query_searcher: QuerySearcherProtocol,
+        suggester: TermSuggester | None = None,
     ):
         self._qbank = question_bank
         self._qsearcher = query_searcher
+        self._suggester = suggester or question_bank.suggester
 
-    def get_question(self, question_id: str) -> Question:
+    def get_question(self, question_id: int) -> Question:
         """Returns the question with the given question id."""
 
         try:
             return self._qbank[question_id]
         except KeyError as ex:
-            raise QuestionNotFoundError(question_id) from ex
+            raise QuestionNotFoundError(format_question_id(question_id)) from ex
+
+    def get_questions(self, question_ids: Iterable[int]) -> QuestionsBatch:
+        """Returns the questions with the given question ids along with
+        the ids that were not found.
+
+        Duplicate ids are only looked up once.
+        """
+
+        questions: list[Question] = []
+        missing: list[str] = []
+        with timed_stage("materialize"):
+            for question_id in dict.fromkeys(question_ids):
+                try:
+                    questions.append(self._qbank[question_id])
+                except KeyError:
+                    missing.append(format_question_id(question_id))
+
+        return QuestionsBatch(questions, missing)
+
+    def similar(self, question_id: int, limit: int = 10) -> list[SimilarQuestion]:
+        """Returns the questions most similar to the question with the given
+        question id, the most similar first."""
+
+        if question_id not in self._qbank:
+            raise QuestionNotFoundError(format_question_id(question_id))
+
+        with timed_stage("materialize"):
+            return [
+                SimilarQuestion(self._qbank[id], similarity)
+                for id, similarity in self._qbank.similar(question_id)[:limit]
+            ]
 
     def search(self, filter: Filter) -> list[Question]:
         """Searches for questions based on the given filter."""
 
         hits = self._search(filter)
-        return list(self._qbank.get_questions(hits))
+        with timed_stage("materialize"):
+            return list(self._get_questions(hits, filter))
+
+    def highlighted_search(self, filter: Filter) -> HighlightedQuestions:
+        """Searches for questions based on the given filter, along with
+        the words in them that matched the query of the filter."""
+
+        questions = self.search(filter)
+        highlights = {}
+        if filter.q:
+            with timed_stage("highlight"):
+                highlights = self._qsearcher.highlight(
+                    questions, filter.q, filter.fuzzy
+                )
+
+        return HighlightedQuestions(questions, highlights)
+
+    def count(self, filter: Filter) -> int:
+        """Returns the number of questions that satisfy the given filter."""
+
+        # Without a query, the question bank counts them without
+        # collecting their IDs.
+        if not filter.q:
+            with timed_stage("filter"):
+                return self._qbank.count(filter)
+        return len(self._search(filter))
+
+    def iter_search(self, filter: Filter) -> Iterator[Question]:
+        """Searches for questions based on the given filter, yielding the
+        questions lazily.
+
+        NOTE: The filtering is done upfront, only the questions are lazily
+        looked up.
+        """
+
+        hits = self._search(filter)
+        return iter(self._get_questions(hits, filter))
 
     def random(self, filter: Filter, n: int = 100) -> list[Question]:
         """Returns a random set of questions that satisfy the given
@@ -40,46 +129,99 @@ class QuestionSearchEngine:
             n: The number of questions to return.
         """
 
+        # Only the sampled questions are looked up, so that the compressed
+        # questions that aren't returned aren't decompressed.
         hits = self._search(filter)
-        questions = self._qbank.get_questions(hits)
-        return self._sample_random(questions, n)
+        sampled = sample(tuple(hits), min(n, len(hits)))
+        with timed_stage("materialize"):
+            return [self._qbank[id] for id in sampled]
+
+    def practice(
+        self, filter: Filter, seed: int, cursor: int = 0, n: int = 10
+    ) -> PracticeQuestions:
+        """Returns the next questions of a practice session.
+
+        A session goes through the questions that satisfy the filter in a
+        random order picked by the seed, without repeating any of them.
+        The order is computed as the questions are asked for, so the seed
+        and the cursor are all there is to a session.
+
+        NOTE: The sort order of the filter is not considered.
+
+        Args:
+            filter: The filter to apply on the questions.
+            seed: The seed of the session.
+            cursor: The number of questions of the session gone through.
+            n: The number of questions to return.
+
+        Raises:
+            QueryTooComplexError: If the text search of the filter was
+                truncated, since the session would then go through a
+                different set of questions on each request.
+        """
+
+        hits: Sequence[int]
+        if filter.q:
+            ctx.search_truncated = False
+            hits = sorted(self._search(filter))
+            if ctx.search_truncated:
+                raise QueryTooComplexError(
+                    filter.q, "its results are truncated, so it can't be practiced"
+                )
+        else:
+            with timed_stage("filter"):
+                hits = self._qbank.filter_ordered(filter)
+
+        permutation = FeistelPermutation(len(hits), seed)
+        cursor = min(cursor, len(hits))
+        end = min(cursor + n, len(hits))
+        with timed_stage("materialize"):
+            questions = [
+                self._qbank[hits[permutation[idx]]] for idx in range(cursor, end)
+            ]
+
+        return PracticeQuestions(questions, seed, end, len(hits))
+
+    def suggest(self, prefix: str, filter: Filter, limit: int = 10) -> list[Suggestion]:
+        """Returns the terms starting with the prefix that are the most
+        common among the questions satisfying the filter.
+
+        NOTE: The query of the filter is not considered.
+        """
+
+        ids = None
+        if filter.is_filtered:
+            with timed_stage("filter"):
+                ids = self._qbank.filter(filter)
+
+        with timed_stage("suggest"):
+            return self._suggester.suggest(prefix, limit, ids)
 
     def questions_metadata(self) -> QuestionsMetadata:
         """Returns the metadata regarding the questions."""
 
         return self._qbank.metadata
 
-    def _sample_random(self, questions: Iterable[Question], k: int):
-        # This implementation is essentially an exact copy of the
-        # implementation in `more-itertools` which itself is based on
-        # `Algorithm L` from the paper
-        # "Reservoir-Sampling Algorithms of Time Complexity O(n(1+log(N/n)))"
-        # by Kim-Hung Li.
-        # Implementation reference:
-        # https://github.com/more-itertools/more-itertools/blob/474b6a5b39a3fa7642f8b472954e4eac3c1a78b8/more_itertools/more.py#L3454
+    def _get_questions(self, hits: set[int], filter: Filter) -> Iterable[Question]:
+        """Returns the questions with the given IDs, in the order asked for
+        by the filter."""
 
-        # Filling up the reservoir with the first 'k' items
-        reservoir = list(itertools.islice(questions, k))
+        if filter.sort != SortOrder.RELEVANCE or not filter.q:
+            return self._qbank.get_questions(hits, filter.sort)
 
-        W = exp(log(random()) / k)
-        next_index = k + floor(log(random()) / log(1 - W))
+        with timed_stage("rank"):
+            ranking = self._qsearcher.rank(filter.q, filter.fuzzy)
 
-        try:
-            for index, element in enumerate(questions, k):
-                if index == next_index:
-                    reservoir[randrange(k)] = element
-                    W *= exp(log(random()) / k)
-                    next_index += floor(log(random()) / log(1 - W)) + 1
-        except IndexError:
-            # IndexError happens if k < len(questions)
-            return list(questions)
-
-        return reservoir
-
-    def _search(self, filter: Filter) -> set[str]:
-        hits = self._qbank.filter(filter)
+        qbank = self._qbank
+        return (qbank[id] for id in ranking if id in hits)
+
+    def _search(self, filter: Filter) -> set[int]:
+        with timed_stage("filter"):
+            hits = self._qbank.filter(filter)
         if filter.q:
-            qsearch_hits = self._qsearcher.search(filter.q)
-            hits.intersection_update(qsearch_hits)
+            with timed_stage("text_search"):
+                qsearch_hits = self._qsearcher.search(filter.q, filter.fuzzy)
+            hits = hits.intersection(qsearch_hits)
 
+        SEARCH_HITS.observe(len(hits), kind="text" if filter.q else "filter")
         return hits
@@ -2,9 +2,12 @@
 
 from dataclasses import dataclass, field
 from enum import StrEnum
+import string
 from typing import TypedDict
 from msgspec import Struct
 
+from past_years.errors import InvalidQuestionIdError
+
 
 class Subject(StrEnum):
     """The various subjects."""
@@ -24,12 +27,29 @@ class Exam(StrEnum):
     NDA = "NDA"
 
 
-class Question(Struct):
-    """The representation of a single question."""
+class SortOrder(StrEnum):
+    """The orders the questions can be sorted in."""
+
+    YEAR = "year"
+    YEAR_DESC = "-year"
+    EXAM = "exam"
+    SUBJECT = "subject"
+    RELEVANCE = "relevance"
+    """By how well the questions match the query. Without a query, the
+    questions are not sorted."""
+
+
+class Question(Struct, gc=False):
+    """The representation of a single question.
+
+    NOTE: The questions are not tracked by the garbage collector since they
+    can never be a part of a reference cycle, which keeps a large question
+    bank from slowing down every collection.
+    """
 
     main_question: str
     continuation: str
-    question_options: list[str]
+    question_options: tuple[str, ...]
     answers: dict[str, str]
     correct_answer: str
     exam: Exam
@@ -40,6 +60,9 @@ class Question(Struct):
 
     This is the first 16 characters of the hexdigest i.e. 64 bits, of the
     SHA-1 hash of the `full_question`.
+
+    NOTE: This is how the id is sent to the clients. Everywhere else, i.e.
+    in the indexes, the id is held as a 64-bit integer (see `parse_question_id`).
     """
 
     @property
@@ -74,9 +97,44 @@ class Filter:
     years: list[int] = field(default_factory=list)
     """The years to filter with (OR)."""
 
+    year_ranges: list[tuple[int, int]] = field(default_factory=list)
+    """The inclusive ranges of the years to filter with (OR, along with
+    the years)."""
+
+    exclude_exams: list[Exam] = field(default_factory=list)
+    """The exams whose questions are left out."""
+
+    exclude_subjects: list[Subject] = field(default_factory=list)
+    """The subjects whose questions are left out."""
+
+    exclude_ids: set[int] = field(default_factory=set)
+    """The IDs of the questions that are left out."""
+
     q: str = ""
     """The query to filter with (OR)."""
 
+    fuzzy: bool = False
+    """Whether the misspelled words in the query match the words close
+    to them."""
+
+    sort: SortOrder | None = None
+    """The order to return the questions in."""
+
+    @property
+    def is_filtered(self) -> bool:
+        """Indicates whether any of the questions are filtered out, not
+        considering the query."""
+
+        return bool(
+            self.exams
+            or self.subjects
+            or self.years
+            or self.year_ranges
+            or self.exclude_exams
+            or self.exclude_subjects
+            or self.exclude_ids
+        )
+
 
 class QuestionsIndex(Struct):
     """The index with respect to exams, subjects and years
@@ -87,9 +145,73 @@ class QuestionsIndex(Struct):
     IDs of the questions that have that attribute value.
     """
 
-    exams: dict[Exam, set[str]] = {}
-    subjects: dict[Subject, set[str]] = {}
-    years: dict[int, set[str]] = {}
+    exams: dict[Exam, set[int]] = {}
+    subjects: dict[Subject, set[int]] = {}
+    years: dict[int, set[int]] = {}
+
+
+class QuestionsBatch(Struct):
+    """The questions found when looking up a batch of question IDs."""
+
+    questions: list[Question]
+    """The questions that were found, in the order they were asked for."""
+
+    missing: list[str]
+    """The IDs of the questions that were not found."""
+
+
+class PracticeQuestions(Struct):
+    """The next questions of a practice session."""
+
+    questions: list[Question]
+
+    seed: int
+    """The seed of the session, which picks the order of its questions."""
+
+    cursor: int
+    """The number of questions of the session gone through so far, which
+    is where the next questions start from."""
+
+    total: int
+    """The number of questions in the session."""
+
+
+class QuestionHighlights(Struct, omit_defaults=True):
+    """The spans, i.e. the start (inclusive) and end (exclusive) offsets, of
+    the words in a question that matched the query."""
+
+    main_question: list[tuple[int, int]] = []
+    question_options: list[list[tuple[int, int]]] = []
+    """The spans in each of the options, if any of the options have a match."""
+
+    answers: dict[str, list[tuple[int, int]]] = {}
+    """The spans in each of the answers that have a match."""
+
+
+class HighlightedQuestions(Struct):
+    """The questions that matched a query along with the words in them
+    that matched."""
+
+    questions: list[Question]
+    highlights: dict[str, QuestionHighlights]
+    """The highlights of the questions keyed by their IDs. The questions
+    without any highlights are left out."""
+
+
+class SimilarQuestion(Struct):
+    """A question similar to another question."""
+
+    question: Question
+    similarity: float
+    """The Jaccard similarity of the (shingles of the) questions."""
+
+
+class Suggestion(Struct):
+    """A term suggested for a search."""
+
+    term: str
+    count: int
+    """The number of questions the term is in."""
 
 
 class QuestionsMetadata(TypedDict):
@@ -99,3 +221,27 @@ class QuestionsMetadata(TypedDict):
     subjects: set[Subject]
     years: set[int]
     total_questions: int
+
+
+# ----- Question IDs -----
+_HEX_DIGITS = frozenset(string.hexdigits)
+
+
+def parse_question_id(question_id: str) -> int:
+    """Parses the hex representation of a question id into the integer
+    used internally.
+
+    Raises:
+        InvalidQuestionIdError: If the question id is not 16 hex characters.
+    """
+
+    if len(question_id) != 16 or not _HEX_DIGITS.issuperset(question_id):
+        raise InvalidQuestionIdError(question_id)
+
+    return int(question_id, 16)
+
+
+def format_question_id(question_id: int) -> str:
+    """Formats the integer question id into its hex representation."""
+
+    return f"{question_id:016x}"
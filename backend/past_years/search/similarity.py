@@ -0,0 +1,174 @@
+"""Finding the questions that are similar to each other.
+
+The similarity of two questions is the Jaccard similarity of the sets of
+their shingles i.e. the sequences of `_SHINGLE_SIZE` consecutive words.
+Since comparing every pair of questions is quadratic, the pairs that are
+likely to be similar are first found with MinHash and locality sensitive
+hashing (LSH), and only those are compared.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+from pathlib import Path
+from typing import Iterable
+
+import msgspec
+from loguru import logger
+
+from .index_format import bank_fingerprint
+from .search_types import Question, parse_question_id
+
+_SHINGLE_SIZE = 3
+_WORD_PATTERN = re.compile(r"\w+")
+
+# The MinHash signatures are split into `_BANDS` bands of `_ROWS` hashes
+# each, and the questions that have the same hashes in any of the bands
+# are compared. With these, questions that are 30% similar are compared
+# with a probability of ~58%, and those that are 50% similar with ~98%.
+_BANDS = 32
+_ROWS = 3
+
+# The buckets with more questions than this are skipped, since the number
+# of pairs in a bucket is quadratic in its size. Such buckets are made up
+# of (nearly) identical questions, which would otherwise all be compared
+# with each other in every band.
+_MAX_BUCKET_SIZE = 100
+
+# The hash functions of the signatures are the universal hashes
+# `(a * h + b) mod p` of the (already hashed) shingles, with `p` being the
+# Mersenne prime 2^61 - 1. Unlike XOR-ing with random masks, these are
+# (approximately) min-wise independent, so the probability that two
+# questions have the same minimum is their Jaccard similarity.
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_HASHES = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(_BANDS * _ROWS)
+]
+
+
+class SimilarQuestionsIndex(msgspec.Struct):
+    """The most similar questions of each of the questions."""
+
+    fingerprint: bytes
+    """The fingerprint of the question bank (see `bank_fingerprint`)."""
+
+    similar: dict[int, list[tuple[int, float]]]
+    """The IDs of the most similar questions along with their similarity,
+    the most similar first."""
+
+
+def build_similar_questions_index(
+    questions: Iterable[Question], top_k: int = 10, min_similarity: float = 0.3
+) -> SimilarQuestionsIndex:
+    """Finds the most similar questions of each of the questions.
+
+    Args:
+        questions: All the questions.
+        top_k: The maximum number of similar questions kept per question.
+        min_similarity: The minimum similarity of the similar questions.
+    """
+
+    questions = list(questions)
+    shingles: dict[int, frozenset[int]] = {
+        parse_question_id(q.id): _get_shingles(q.full_question) for q in questions
+    }
+
+    buckets: dict[tuple[int, tuple[int, ...]], list[int]] = {}
+    for q_id, q_shingles in shingles.items():
+        # The questions without any words aren't similar to any other.
+        if not q_shingles:
+            continue
+        signature = _get_signature(q_shingles)
+        for band in range(_BANDS):
+            key = (band, tuple(signature[band * _ROWS : (band + 1) * _ROWS]))
+            buckets.setdefault(key, []).append(q_id)
+
+    candidates: set[tuple[int, int]] = set()
+    skipped = 0
+    for bucket in buckets.values():
+        if len(bucket) > _MAX_BUCKET_SIZE:
+            skipped += 1
+            continue
+        for idx, a in enumerate(bucket):
+            for b in bucket[idx + 1 :]:
+                candidates.add((a, b) if a < b else (b, a))
+
+    if skipped:
+        logger.warning("Skipped {} buckets of too many similar questions", skipped)
+    logger.debug("Comparing {} pairs of questions", len(candidates))
+
+    similar: dict[int, list[tuple[int, float]]] = {}
+    for a, b in candidates:
+        similarity = _jaccard(shingles[a], shingles[b])
+        if similarity >= min_similarity:
+            similar.setdefault(a, []).append((b, similarity))
+            similar.setdefault(b, []).append((a, similarity))
+
+    for q_id, q_similar in similar.items():
+        q_similar.sort(key=lambda s: (-s[1], s[0]))
+        similar[q_id] = [(id, round(s, 4)) for id, s in q_similar[:top_k]]
+
+    return SimilarQuestionsIndex(bank_fingerprint(questions), similar)
+
+
+def similar_questions_fp(idx_fp: str | Path) -> Path:
+    """Returns the path of the similar questions index that goes with the
+    given (JSON) questions index e.g. `.qindex.similar` for `.qindex.json`."""
+
+    return Path(idx_fp).with_suffix(".similar")
+
+
+def load_similar_questions_index(
+    fp: Path, fingerprint: bytes
+) -> SimilarQuestionsIndex | None:
+    """Loads the similar questions index, if there is one built from the
+    question bank with the given fingerprint (see `bank_fingerprint`)."""
+
+    if not fp.is_file():
+        logger.info("No similar questions index at `{}`", fp)
+        return None
+
+    try:
+        idx = msgspec.msgpack.decode(fp.read_bytes(), type=SimilarQuestionsIndex)
+    except (msgspec.DecodeError, msgspec.ValidationError) as e:
+        logger.warning("Ignoring the invalid similar questions index: {}", e)
+        return None
+
+    if idx.fingerprint != fingerprint:
+        logger.warning("Ignoring the similar questions index of other questions")
+        return None
+
+    return idx
+
+
+# ----- Helpers -----
+def _get_shingles(text: str) -> frozenset[int]:
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words:
+        return frozenset()
+    size = min(len(words), _SHINGLE_SIZE)
+    return frozenset(
+        _hash(" ".join(words[idx : idx + size])) for idx in range(len(words) - size + 1)
+    )
+
+
+def _hash(shingle: str) -> int:
+    # NOTE: The built-in `hash` can't be used since it's randomized per process.
+    digest = hashlib.blake2b(shingle.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _get_signature(shingles: frozenset[int]) -> list[int]:
+    if not shingles:
+        return [0] * len(_HASHES)
+
+    return [min((a * h + b) % _PRIME for h in shingles) for a, b in _HASHES]
+
+
+def _jaccard(a: frozenset[int], b: frozenset[int]) -> float:
+    if not a or not b:
+        return 0.0
+    intersection = len(a & b)
+    return intersection / (len(a) + len(b) - intersection)
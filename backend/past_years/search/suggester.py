@@ -0,0 +1,264 @@
+"""Suggestions of the terms to search for, as they're being typed.
+
+The questions each term is in are built along with the questions index
+and saved next to it, though they're rebuilt from the questions if
+they're missing or out of date.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from functools import cache
+from pathlib import Path
+from typing import AbstractSet, Iterable
+
+import msgspec
+from loguru import logger
+
+from .index_format import bank_fingerprint
+from .search_types import Question, Suggestion, parse_question_id
+
+# The prefixes of at most this length have their terms ranked upfront
+# since they match too many terms to rank on every request.
+_RANKED_PREFIX_LENGTH = 2
+
+# The same tokens as Whoosh's `StandardAnalyzer`, without its overhead.
+_TOKEN_PATTERN = re.compile(r"\w+(?:\.?\w+)*")
+_MIN_TOKEN_LENGTH = 2
+
+# The largest character, which is used to find the end of the range of
+# the terms that start with a prefix.
+_MAX_CHAR = "\U0010ffff"
+
+
+class _SuggesterData(msgspec.Struct, array_like=True):
+    """The suggester as it's saved."""
+
+    fingerprint: bytes
+    """The fingerprint of the question bank (see `bank_fingerprint`)."""
+
+    terms: list[str]
+    """The sorted terms."""
+
+    counts: bytes
+    """The number of questions each of the terms is in, as little endian
+    unsigned 32-bit integers."""
+
+    ids: bytes
+    """The sorted IDs of the questions each of the terms is in, one term
+    after the other, as little endian unsigned 64-bit integers."""
+
+
+class TermSuggester:
+    """Suggests the terms that start with a prefix, ranked by the number
+    of questions they're in.
+
+    The terms are held in a sorted list, so that the terms starting with
+    a prefix are a contiguous range found by bisection. The IDs of the
+    questions each term is in are held sorted in a single array, one term
+    after the other. Unlike the Whoosh index, the terms are not stemmed
+    since they are shown to the users.
+
+    Args:
+        terms: The sorted terms.
+        counts: The number of questions each of the terms is in.
+        ids: The sorted IDs of the questions each of the terms is in, one
+            term after the other.
+    """
+
+    def __init__(self, terms: list[str], counts: array, ids: array):
+        if len(terms) != len(counts):
+            raise ValueError(f"There are {len(terms)} terms but {len(counts)} counts")
+        if sum(counts) != len(ids):
+            raise ValueError(
+                f"The counts add up to {sum(counts)} but there are {len(ids)} IDs"
+            )
+
+        self._terms = terms
+        self._counts = counts
+        self._ids = ids
+
+        # Where the IDs of each of the terms start, and where the last end
+        self._offsets = array("Q", itertools.accumulate(counts, initial=0))
+
+        self._ranked: dict[str, list[int]] = {}
+        for idx, term in enumerate(self._terms):
+            for length in range(1, min(len(term), _RANKED_PREFIX_LENGTH) + 1):
+                self._ranked.setdefault(term[:length], []).append(idx)
+        for ranked in self._ranked.values():
+            ranked.sort(key=self._counts.__getitem__, reverse=True)
+
+        logger.debug("Created the term suggester with {} terms", len(self._terms))
+
+    def suggest(
+        self, prefix: str, limit: int = 10, ids: AbstractSet[int] | None = None
+    ) -> list[Suggestion]:
+        """Returns the most common terms that start with the prefix.
+
+        Args:
+            prefix: The prefix of the terms.
+            limit: The maximum number of terms to return.
+            ids: If given, only these questions are considered when
+                counting the questions the terms are in.
+        """
+
+        prefix = prefix.strip().lower()
+        if not prefix or limit <= 0:
+            return []
+
+        ranked = self._get_ranked(prefix)
+        counts = self._counts
+        if ids is None:
+            return [Suggestion(self._terms[i], counts[i]) for i in ranked[:limit]]
+
+        # Since a term can't be in more of the given questions than it's in
+        # overall, the terms are gone through in the order of their overall
+        # counts until no more of them can make it into the top `limit`.
+        top: list[tuple[int, int]] = []
+        for i in ranked:
+            if len(top) == limit and counts[i] <= top[0][0]:
+                break
+
+            count = self._count_in(i, ids)
+            if not count:
+                continue
+            if len(top) < limit:
+                heapq.heappush(top, (count, -i))
+            elif count > top[0][0]:
+                heapq.heapreplace(top, (count, -i))
+
+        top.sort(reverse=True)
+        return [Suggestion(self._terms[-i], count) for count, i in top]
+
+    def _get_ranked(self, prefix: str) -> list[int]:
+        """Returns the indexes of the terms starting with the prefix, in
+        the descending order of their counts."""
+
+        if len(prefix) <= _RANKED_PREFIX_LENGTH:
+            return self._ranked.get(prefix, [])
+
+        start = bisect_left(self._terms, prefix)
+        end = bisect_left(self._terms, prefix + _MAX_CHAR, lo=start)
+        return sorted(range(start, end), key=self._counts.__getitem__, reverse=True)
+
+    def _count_in(self, idx: int, ids: AbstractSet[int]) -> int:
+        """Returns the number of the given questions the term is in."""
+
+        start, end = self._offsets[idx], self._offsets[idx + 1]
+        term_ids = self._ids
+        if len(ids) >= end - start:
+            return sum(map(ids.__contains__, term_ids[start:end]))
+
+        # The IDs of the term are sorted, so each of the fewer given IDs
+        # is looked for by bisection.
+        count = 0
+        for id in ids:
+            pos = bisect_left(term_ids, id, start, end)
+            if pos < end and term_ids[pos] == id:
+                count += 1
+        return count
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+
+def build_term_suggester(questions: Iterable[Question]) -> TermSuggester:
+    """Builds the suggester of the terms in the questions."""
+
+    postings: dict[str, list[int]] = {}
+    for q in questions:
+        q_id = parse_question_id(q.id)
+        for term in _get_terms(q.full_question):
+            postings.setdefault(term, []).append(q_id)
+
+    terms = sorted(postings)
+    counts = array("I", (len(postings[term]) for term in terms))
+    ids = array("Q")
+    for term in terms:
+        ids.extend(sorted(postings[term]))
+
+    return TermSuggester(terms, counts, ids)
+
+
+def term_suggester_fp(idx_fp: str | Path) -> Path:
+    """Returns the path of the suggester that goes with the given
+    questions index e.g. `.qindex.terms` for `.qindex.json`."""
+
+    return Path(idx_fp).with_suffix(".terms")
+
+
+def encode_term_suggester(
+    suggester: TermSuggester, questions: Iterable[Question]
+) -> bytes:
+    """Encodes the suggester of the given questions."""
+
+    counts, ids = array("I", suggester._counts), array("Q", suggester._ids)
+    if sys.byteorder == "big":
+        counts.byteswap()
+        ids.byteswap()
+
+    data = _SuggesterData(
+        bank_fingerprint(questions),
+        suggester._terms,
+        counts.tobytes(),
+        ids.tobytes(),
+    )
+    return msgspec.msgpack.encode(data)
+
+
+def load_term_suggester(fp: Path, fingerprint: bytes) -> TermSuggester | None:
+    """Loads the suggester, if there is one built from the question bank
+    with the given fingerprint (see `bank_fingerprint`)."""
+
+    if not fp.is_file():
+        logger.info("No term suggester at `{}`", fp)
+        return None
+
+    try:
+        data = msgspec.msgpack.decode(fp.read_bytes(), type=_SuggesterData)
+    except (msgspec.DecodeError, msgspec.ValidationError) as e:
+        logger.warning("Ignoring the invalid term suggester: {}", e)
+        return None
+
+    if data.fingerprint != fingerprint:
+        logger.warning("Ignoring the term suggester of other questions")
+        return None
+
+    counts, ids = array("I"), array("Q")
+    try:
+        counts.frombytes(data.counts)
+        ids.frombytes(data.ids)
+    except ValueError as e:
+        logger.warning("Ignoring the invalid term suggester: {}", e)
+        return None
+    if sys.byteorder == "big":
+        counts.byteswap()
+        ids.byteswap()
+
+    try:
+        return TermSuggester(data.terms, counts, ids)
+    except ValueError as e:
+        logger.warning("Ignoring the invalid term suggester: {}", e)
+        return None
+
+
+def _get_terms(text: str) -> set[str]:
+    stop_words = _get_stop_words()
+    return {
+        token
+        for token in _TOKEN_PATTERN.findall(text.lower())
+        if len(token) >= _MIN_TOKEN_LENGTH and token not in stop_words
+    }
+
+
+@cache
+def _get_stop_words() -> frozenset[str]:
+    # Imported here since Whoosh is slow to import and is only needed
+    # once the suggester is built.
+    from whoosh.analysis import STOP_WORDS
+
+    return STOP_WORDS
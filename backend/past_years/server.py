@@ -0,0 +1,250 @@
+"""A pre-forking WSGI server for production.
+
+The application (along with the question bank and the indexes) is built
+once in the master process, after which the garbage collector is frozen
+and the workers are forked. This way the workers share the memory of the
+application copy-on-write instead of each having its own copy.
+"""
+from __future__ import annotations
+
+import gc
+import os
+import signal
+import socket
+import time
+from socketserver import ThreadingMixIn
+from threading import BoundedSemaphore
+from types import FrameType
+from typing import Any, Callable
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from loguru import logger
+
+# The number of seconds the workers and the master wait before checking
+# whether they need to stop.
+_POLL_INTERVAL = 0.5
+
+# The signals the master and the workers handle differently
+_HANDLED_SIGNALS = {signal.SIGHUP, signal.SIGTERM, signal.SIGINT}
+
+
+class _SilentRequestHandler(WSGIRequestHandler):
+    """A request handler that does not log any messages of its own."""
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _WorkerServer(WSGIServer):
+    """A WSGI server that serves from an already bound socket."""
+
+    def __init__(self, sock: socket.socket, app: Callable, threads: int = 1):
+        host, port = sock.getsockname()[:2]
+        super().__init__((host, port), _SilentRequestHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.server_name, self.server_port = socket.getfqdn(host), port
+        self.set_app(app)
+        self.setup_environ()
+        self.timeout = _POLL_INTERVAL
+
+        self.handled_requests = 0
+        """The number of requests accepted by this server."""
+
+    def verify_request(self, request: Any, client_address: Any) -> bool:
+        self.handled_requests += 1
+        return True
+
+
+class _ThreadedWorkerServer(ThreadingMixIn, _WorkerServer):
+    """A worker server that handles each request in its own thread, with
+    at most `threads` requests being handled at once."""
+
+    daemon_threads = False
+
+    def __init__(self, sock: socket.socket, app: Callable, threads: int = 1):
+        super().__init__(sock, app)
+        self._slots = BoundedSemaphore(threads)
+
+    def process_request(self, request: Any, client_address: Any):
+        self._slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request_thread(self, request: Any, client_address: Any):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+
+class PreforkServer:
+    """A server that forks a number of workers that serve the application.
+
+    Sending `SIGHUP` to the master gracefully restarts the workers i.e. the
+    current workers finish the requests they are handling while new workers
+    take over. `SIGTERM` and `SIGINT` gracefully stop the server.
+
+    Args:
+        app: The WSGI application. This should be fully initialized since
+            it's shared by all the workers.
+        host: The host to bind to.
+        port: The port to bind to.
+        workers: The number of worker processes.
+        threads: The number of requests each worker handles at once. If
+            this is more than 1, then each request is handled in its own
+            thread.
+        max_requests: The number of requests after which a worker is
+            replaced by a new one. If this is `0`, the workers are never
+            recycled.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        host: str,
+        port: int,
+        workers: int = 2,
+        threads: int = 1,
+        max_requests: int = 0,
+    ):
+        self._app = app
+        self._address = (host, port)
+        self._num_workers = workers
+        self._threads = threads
+        self._max_requests = max_requests
+
+        self._workers: set[int] = set()
+        self._stopping = False
+        self._restarting = False
+
+    def serve(self):
+        """Serves the application until the server is stopped."""
+
+        sock = socket.create_server(self._address, backlog=2048)
+        logger.info("Listening on {}:{}", *self._address)
+
+        # Moving everything allocated so far, i.e. the application, into the
+        # permanent generation so that the garbage collector never touches
+        # (and thereby copies) it in the workers.
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGHUP, self._handle_restart)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        try:
+            self._run_master(sock)
+        finally:
+            sock.close()
+
+    # ----- Master -----
+    def _run_master(self, sock: socket.socket):
+        while not self._stopping:
+            if self._restarting:
+                self._restarting = False
+                logger.info("Restarting the workers")
+                self._signal_workers(signal.SIGTERM)
+                self._workers.clear()
+
+            while len(self._workers) < self._num_workers:
+                self._workers.add(self._spawn_worker(sock))
+
+            self._reap_workers()
+            time.sleep(_POLL_INTERVAL)
+
+        logger.info("Shutting down...")
+        self._signal_workers(signal.SIGTERM)
+        while self._reap_workers(block=True):
+            pass
+
+    def _spawn_worker(self, sock: socket.socket) -> int:
+        # The signals are blocked until the worker has its own handlers, or
+        # else a signal sent to it right after it's forked would be handled
+        # by the handlers of the master (and e.g. never stop it). They are
+        # delivered once they're unblocked.
+        signal.pthread_sigmask(signal.SIG_BLOCK, _HANDLED_SIGNALS)
+        try:
+            pid = os.fork()
+        except OSError:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _HANDLED_SIGNALS)
+            raise
+
+        if pid:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _HANDLED_SIGNALS)
+            logger.debug("Spawned worker {}", pid)
+            return pid
+
+        exit_code = 0
+        try:
+            self._run_worker(sock)
+        except BaseException:
+            logger.exception("Worker {} crashed", os.getpid())
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _reap_workers(self, block: bool = False) -> bool:
+        """Reaps the exited workers.
+
+        Returns:
+            `False` if there are no more child processes, else `True`.
+        """
+
+        while True:
+            try:
+                pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                return False
+            if not pid:
+                return True
+
+            self._workers.discard(pid)
+            logger.debug(
+                "Worker {} exited with code {}", pid, os.waitstatus_to_exitcode(status)
+            )
+            if block:
+                return True
+
+    def _signal_workers(self, signum: int):
+        for pid in self._workers:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _handle_restart(self, signum: int, frame: FrameType | None):
+        self._restarting = True
+
+    def _handle_stop(self, signum: int, frame: FrameType | None):
+        self._stopping = True
+
+    # ----- Worker -----
+    def _run_worker(self, sock: socket.socket):
+        stopping = False
+
+        def stop(signum: int, frame: FrameType | None):
+            nonlocal stopping
+            stopping = True
+
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, stop)
+        # The master handles the interrupts and stops the workers.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _HANDLED_SIGNALS)
+
+        server_type = _ThreadedWorkerServer if self._threads > 1 else _WorkerServer
+        server = server_type(sock, self._app, self._threads)
+
+        while not stopping:
+            server.handle_request()
+            if self._max_requests and server.handled_requests >= self._max_requests:
+                logger.debug("Recycling worker {}", os.getpid())
+                break
+
+        # Waits for the threads handling requests, if any, to finish.
+        server.server_close()
@@ -1,8 +1,19 @@
 """Utilities common to the entire application."""
+import itertools
+import os
 import sys
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, TextIO
+from weakref import WeakSet
+
 from loguru import logger
 
 from past_years.configuration import config, _LogConfig
+from past_years.context import ctx
+
+# The request ID used in the logs outside of a request
+DEFAULT_REQUEST_ID = "0000-0000-0000-0000"
 
 
 def configure_logger(log_config: _LogConfig | None = None):
@@ -10,29 +21,172 @@ def configure_logger(log_config: _LogConfig | None = None):
 
     log_config = log_config or config.get_logs_config()
 
-    sink = log_config.sink
+    sink: Path | BatchedSink = log_config.sink
     if log_config.serialize:
-        sink = sink + ".json"
+        sink = sink.with_name(sink.name + ".json")
+    if log_config.batch_size:
+        sink = BatchedSink(sink, log_config.batch_size, log_config.flush_interval)
 
-    loguru_config: dict[str, list | dict] = {
-        "handlers": [
+    handlers: list[dict[str, Any]] = []
+    if log_config.stdout:
+        handlers.append(
             {
                 "sink": sys.stdout,
                 "format": log_config.format,
                 "colorize": True,
                 "level": log_config.log_level.upper(),
                 "serialize": False,
-            },
-            {
-                "sink": sink,
-                "format": log_config.format,
-                "colorize": False,
-                "enqueue": True,
-                "level": log_config.log_level.upper(),
-                "serialize": log_config.serialize,
-            },
-        ],
-        "extra": {"request_id": "0000-0000-0000-0000"},
+            }
+        )
+    handlers.append(
+        {
+            "sink": sink,
+            "format": log_config.format,
+            "colorize": False,
+            # The batched sink does its writes in its own thread.
+            "enqueue": not log_config.batch_size,
+            "level": log_config.log_level.upper(),
+            "serialize": log_config.serialize,
+        }
+    )
+
+    loguru_config: dict[str, Any] = {
+        "handlers": handlers,
+        "extra": {"request_id": DEFAULT_REQUEST_ID},
+        "patcher": _add_request_id,
     }
 
     logger.configure(**loguru_config)
+
+
+class BatchedSink:
+    """A sink that writes the log messages to a file in batches.
+
+    The messages are buffered in memory and written by a background
+    thread once `batch_size` messages are buffered or `flush_interval`
+    seconds have passed, whichever is first.
+
+    Args:
+        fp: The path to the file the logs are written to.
+        batch_size: The maximum number of buffered messages.
+        flush_interval: The maximum number of seconds a message is
+            buffered for.
+    """
+
+    def __init__(self, fp: Path, batch_size: int, flush_interval: float):
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        self._file: TextIO = fp.open("a", encoding="utf-8")
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+
+        self._buffer: list[str] = []
+        self._lock = Lock()
+        self._flush_needed = Event()
+        self._stopped = False
+
+        self._start()
+        # The thread writing the messages does not survive forking.
+        _sinks.add(self)
+
+    def write(self, message: str):
+        """Buffers the message to be written later."""
+
+        with self._lock:
+            self._buffer.append(message)
+            buffer_full = len(self._buffer) >= self._batch_size
+
+        if buffer_full:
+            self._flush_needed.set()
+
+    def stop(self):
+        """Writes all the buffered messages and closes the file.
+
+        NOTE: This is called by Loguru when the sink is removed.
+        """
+
+        self._stopped = True
+        _sinks.discard(self)
+        self._flush_needed.set()
+        self._thread.join()
+        self._file.close()
+
+    def _start(self):
+        self._thread = Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def _restart_in_child(self):
+        """Restarts the writing thread in a forked process, dropping the
+        messages that are written by the parent process."""
+
+        if self._stopped:
+            return
+
+        self._buffer = []
+        self._lock = Lock()
+        self._flush_needed = Event()
+        self._start()
+
+    def _run(self):
+        while not self._stopped:
+            self._flush_needed.wait(self._flush_interval)
+            self._flush_needed.clear()
+            self._write_buffer()
+
+        self._write_buffer()
+
+    def _write_buffer(self):
+        with self._lock:
+            messages, self._buffer = self._buffer, []
+
+        if messages:
+            self._file.write("".join(messages))
+            self._file.flush()
+
+
+def new_request_id() -> str:
+    """Returns a new ID for a request.
+
+    The IDs are made up of a random prefix unique to the process and
+    a counter, which is much cheaper than generating UUIDs.
+    """
+
+    return f"{_request_id_prefix}-{next(_request_id_counter):x}"
+
+
+# ----- Helpers -----
+
+
+def _add_request_id(record: dict[str, Any]):
+    """Adds the ID of the current request to the log record."""
+
+    request_id = ctx.request_id
+    if request_id is not None:
+        record["extra"]["request_id"] = request_id
+
+
+def _reset_request_ids():
+    """Resets the request ID prefix and counter so that forked processes
+    don't generate the same IDs."""
+
+    global _request_id_prefix, _request_id_counter
+
+    _request_id_prefix = os.urandom(6).hex()
+    _request_id_counter = itertools.count()
+
+
+def _restart_sinks_in_child():
+    """Restarts the writing threads of the sinks in a forked process."""
+
+    for sink in list(_sinks):
+        sink._restart_in_child()
+
+
+_request_id_prefix: str
+_request_id_counter: itertools.count
+_reset_request_ids()
+os.register_at_fork(after_in_child=_reset_request_ids)
+
+# The sinks that are running, whose threads are restarted after forking.
+# Since the hooks can't be unregistered, there's one for all the sinks.
+_sinks: WeakSet[BatchedSink] = WeakSet()
+os.register_at_fork(after_in_child=_restart_sinks_in_child)
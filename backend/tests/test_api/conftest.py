@@ -0,0 +1,13 @@
+import pytest
+from falcon import testing
+
+from past_years.api import make_app
+from past_years.search.search_engine import QuestionSearchEngine
+
+
+@pytest.fixture(scope="session")
+def client(whoosh_question_search_engine: QuestionSearchEngine) -> testing.TestClient:
+    """The test client for the API."""
+
+    app = make_app(whoosh_question_search_engine)
+    return testing.TestClient(app)
@@ -0,0 +1,135 @@
+import threading
+
+import pytest
+from falcon import App, Response, testing
+
+from past_years.api.middlewares import AdmissionMiddleware
+from past_years.api.request import Request
+from past_years.api.traffic import RecordedRequest, WarmUp
+
+
+class _SlowResource:
+    """A resource that blocks until it's released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def on_get(self, req: Request, resp: Response):
+        self.started.set()
+        self.release.wait(5)
+        resp.media = {}
+
+
+class _FastResource:
+    def on_get(self, req: Request, resp: Response, **params: str):
+        resp.media = {}
+
+
+@pytest.fixture()
+def slow_resource() -> _SlowResource:
+    return _SlowResource()
+
+
+def _make_client(
+    admission: AdmissionMiddleware, slow_resource: _SlowResource
+) -> testing.TestClient:
+    app = App(request_type=Request, middleware=[admission])
+    app.add_route("/questions/filter", slow_resource)
+    app.add_route("/questions/{question_id}", _FastResource())
+    app.add_route("/metrics", _FastResource())
+    return testing.TestClient(app)
+
+
+def _get_in_thread(client: testing.TestClient, path: str) -> list:
+    results = []
+    thread = threading.Thread(target=lambda: results.append(client.simulate_get(path)))
+    thread.start()
+    results.append(thread)
+    return results
+
+
+def test_saturated_route_is_shed(slow_resource: _SlowResource):
+    admission = AdmissionMiddleware({"/questions/filter": 1})
+    client = _make_client(admission, slow_resource)
+
+    first = _get_in_thread(client, "/questions/filter")
+    assert slow_resource.started.wait(5)
+
+    resp = client.simulate_get("/questions/filter")
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+
+    # The cheap routes are not affected
+    assert client.simulate_get("/questions/abc").status_code == 200
+
+    slow_resource.release.set()
+    first[0].join()
+    assert first[1].status_code == 200
+    assert client.simulate_get("/questions/filter").status_code == 200
+
+
+def test_queued_request_is_admitted(slow_resource: _SlowResource):
+    admission = AdmissionMiddleware(
+        {"/questions/filter": 1}, max_queued=1, queue_timeout=5
+    )
+    client = _make_client(admission, slow_resource)
+
+    first = _get_in_thread(client, "/questions/filter")
+    assert slow_resource.started.wait(5)
+    queued = _get_in_thread(client, "/questions/filter")
+
+    slow_resource.release.set()
+    first[0].join()
+    queued[0].join()
+    assert queued[1].status_code == 200
+
+
+def test_queued_request_times_out(slow_resource: _SlowResource):
+    admission = AdmissionMiddleware(
+        {"/questions/filter": 1}, max_queued=1, queue_timeout=0.01
+    )
+    client = _make_client(admission, slow_resource)
+
+    first = _get_in_thread(client, "/questions/filter")
+    assert slow_resource.started.wait(5)
+
+    assert client.simulate_get("/questions/filter").status_code == 503
+
+    slow_resource.release.set()
+    first[0].join()
+
+
+def test_client_rate_limit(slow_resource: _SlowResource):
+    admission = AdmissionMiddleware(client_rate=0.1, client_burst=2)
+    client = _make_client(admission, slow_resource)
+
+    assert client.simulate_get("/questions/abc").status_code == 200
+    assert client.simulate_get("/questions/abc").status_code == 200
+
+    resp = client.simulate_get("/questions/abc")
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+    # The other clients and the exempt routes are not limited
+    other_client = client.simulate_get("/questions/abc", remote_addr="10.0.0.2")
+    assert other_client.status_code == 200
+    assert client.simulate_get("/metrics").status_code == 200
+
+
+def test_warm_up_is_not_limited(slow_resource: _SlowResource):
+    admission = AdmissionMiddleware(client_rate=1, client_burst=5)
+    app = App(request_type=Request, middleware=[admission])
+    app.add_route("/questions/{question_id}", _FastResource())
+
+    warm_up = WarmUp(RecordedRequest(f"/questions/{idx}", "", 1) for idx in range(20))
+    warm_up.run(app)
+    assert warm_up.replayed == 20
+
+    # The clients can't pass themselves off as the warm up.
+    client = testing.TestClient(app)
+    statuses = [
+        client.simulate_get("/questions/abc", headers={"X-Warm-Up": "1"}).status_code
+        for _ in range(6)
+    ]
+    assert statuses == [200] * 5 + [429]
@@ -0,0 +1,84 @@
+from falcon import testing
+
+from past_years.api.traffic import WARM_UP_ENVIRON_KEY
+from past_years.metrics import (
+    REQUEST_LATENCY,
+    MetricsRegistry,
+    format_server_timing,
+    format_startup_timings,
+    get_startup_timings,
+)
+
+
+# ----- Testing MetricsRegistry -----
+def test_counter_exposition():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits_total", "The hits.", ("cache",))
+    counter.inc(cache="a")
+    counter.inc(2, cache="a")
+
+    assert counter.get(cache="a") == 3
+    assert 'hits_total{cache="a"} 3' in registry.expose()
+
+
+def test_histogram_exposition():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency", "The latency.", buckets=(1, 2))
+    for value in (0.5, 1.5, 3):
+        histogram.observe(value)
+
+    exposition = registry.expose()
+    assert 'latency_bucket{le="1"} 1' in exposition
+    assert 'latency_bucket{le="2"} 2' in exposition
+    assert 'latency_bucket{le="+Inf"} 3' in exposition
+    assert "latency_count 3" in exposition
+    assert "latency_sum 5" in exposition
+
+
+def test_format_server_timing():
+    timings = [("filter", 0.001), ("serialize", 0.002), ("filter", 0.001)]
+    assert format_server_timing(timings) == "filter;dur=2.0, serialize;dur=2.0"
+
+
+def test_format_startup_timings():
+    timings = {"config": 0.001, "bank_load": 0.0125}
+    assert format_startup_timings(timings) == "13.5ms (config=1.0ms, bank_load=12.5ms)"
+
+
+# ----- Testing the API -----
+def test_startup_timings(client: testing.TestClient):
+    timings = get_startup_timings()
+    assert {"config", "bank_load", "index_load"} <= timings.keys()
+
+    resp = client.simulate_get("/metrics")
+    assert 'past_years_startup_phase_duration_seconds_count{phase="bank_load"}' in (
+        resp.text
+    )
+
+
+def test_server_timing_header(client: testing.TestClient):
+    resp = client.simulate_get("/questions/filter", params={"q": "constitution"})
+
+    server_timing = resp.headers["Server-Timing"]
+    for stage in ("filter", "text_search", "materialize", "serialize", "total"):
+        assert f"{stage};dur=" in server_timing
+
+
+def test_metrics_endpoint(client: testing.TestClient):
+    client.simulate_get("/questions/filter")
+    resp = client.simulate_get("/metrics")
+
+    assert resp.status_code == 200
+    assert "past_years_request_duration_seconds_bucket" in resp.text
+    assert 'route="/questions/filter"' in resp.text
+
+
+def test_warm_up_requests_not_recorded(client: testing.TestClient):
+    labels = {"method": "GET", "route": "/questions/filter", "status": "200"}
+    count = REQUEST_LATENCY.count(**labels)
+
+    client.simulate_get("/questions/filter", extras={WARM_UP_ENVIRON_KEY: True})
+    assert REQUEST_LATENCY.count(**labels) == count
+
+    client.simulate_get("/questions/filter")
+    assert REQUEST_LATENCY.count(**labels) == count + 1
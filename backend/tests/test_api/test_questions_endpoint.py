@@ -0,0 +1,381 @@
+import gzip
+
+import msgspec
+import pytest
+from falcon import testing
+
+from past_years.api import make_app
+from past_years.api.endpoints.questions_endpoint import SEARCH_TRUNCATED_HEADER
+from past_years.search.query_searcher import WhooshSearcher
+from past_years.search.question_bank import QuestionBank
+from past_years.search.search_engine import QuestionSearchEngine
+from past_years.search.search_types import format_question_id
+from tests.conftest import TEST_DATA_DIR
+
+
+def test_batch_get(client: testing.TestClient, question_bank: QuestionBank):
+    ids = [q.id for q in question_bank][:5]
+    resp = client.simulate_get(
+        "/questions/batch",
+        params={"ids": [*ids, "0000000000000000"]},
+        headers={"Accept": "application/json"},
+    )
+
+    assert resp.status_code == 200
+    assert [q["id"] for q in resp.json["questions"]] == ids
+    assert resp.json["missing"] == ["0000000000000000"]
+
+
+def test_batch_post(client: testing.TestClient, question_bank: QuestionBank):
+    ids = [q.id for q in question_bank][:3]
+    resp = client.simulate_post(
+        "/questions/batch",
+        body=msgspec.json.encode({"ids": [*ids, ids[0]]}),
+        headers={"Accept": "application/json"},
+    )
+
+    assert resp.status_code == 200
+    assert [q["id"] for q in resp.json["questions"]] == ids
+    assert resp.json["missing"] == []
+
+
+def test_batch_limit(client: testing.TestClient):
+    ids = [f"{idx:016x}" for idx in range(101)]
+    resp = client.simulate_post(
+        "/questions/batch", body=msgspec.json.encode({"ids": ids})
+    )
+
+    assert resp.status_code == 400
+
+
+def test_batch_invalid_body(client: testing.TestClient):
+    resp = client.simulate_post("/questions/batch", body=b"[1, 2]")
+
+    assert resp.status_code == 400
+
+
+def test_filter_ndjson_stream(client: testing.TestClient):
+    expected = client.simulate_get(
+        "/questions/filter", headers={"Accept": "application/json"}
+    ).json
+    resp = client.simulate_get(
+        "/questions/filter", headers={"Accept": "application/x-ndjson"}
+    )
+
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    questions = [msgspec.json.decode(line) for line in resp.text.splitlines()]
+    assert questions == expected
+
+
+def test_filter_msgpack_stream_gzip(client: testing.TestClient):
+    expected = client.simulate_get(
+        "/questions/filter", headers={"Accept": "application/json"}
+    ).json
+    resp = client.simulate_get(
+        "/questions/filter",
+        headers={"Accept": "application/x-msgpack-stream", "Accept-Encoding": "gzip"},
+    )
+
+    assert resp.headers["content-encoding"] == "gzip"
+    data = gzip.decompress(resp.content)
+    assert data == b"".join(msgspec.msgpack.encode(q) for q in expected)
+
+
+def test_filter_fields(client: testing.TestClient):
+    resp = client.simulate_get(
+        "/questions/filter",
+        params={"fields": ["year", "id", "main_question"], "exams": ["CSE"]},
+        headers={"Accept": "application/json"},
+    )
+
+    assert resp.status_code == 200
+    assert resp.json
+    for question in resp.json:
+        assert list(question) == ["main_question", "year", "id"]
+
+
+def test_random_and_batch_fields(client: testing.TestClient):
+    resp = client.simulate_get(
+        "/questions/random",
+        params={"fields": ["id"]},
+        headers={"Accept": "application/json"},
+    )
+    ids = [q["id"] for q in resp.json]
+    assert all(list(q) == ["id"] for q in resp.json)
+
+    resp = client.simulate_get(
+        "/questions/batch",
+        params={"ids": ids, "fields": ["id", "exam"]},
+        headers={"Accept": "application/json"},
+    )
+    assert [list(q) for q in resp.json["questions"]] == [["exam", "id"]] * len(ids)
+
+
+def test_invalid_fields(client: testing.TestClient):
+    resp = client.simulate_get("/questions/filter", params={"fields": ["invalid"]})
+
+    assert resp.status_code == 400
+
+
+def test_get_question(client: testing.TestClient, question_bank: QuestionBank):
+    question = next(iter(question_bank))
+    resp = client.simulate_get(
+        f"/questions/{question.id}", headers={"Accept": "application/json"}
+    )
+
+    assert resp.status_code == 200
+    assert resp.json["id"] == question.id
+
+
+def test_get_invalid_question(client: testing.TestClient):
+    assert client.simulate_get("/questions/not-an-id").status_code == 404
+    assert client.simulate_get("/questions/0000000000000000").status_code == 404
+
+
+def test_suggest(client: testing.TestClient):
+    resp = client.simulate_get(
+        "/questions/suggest", params={"prefix": "ind", "exams": "CSE", "limit": 3}
+    )
+
+    assert resp.status_code == 200
+    assert 0 < len(resp.json) <= 3
+    assert all(s["term"].startswith("ind") for s in resp.json)
+
+
+def test_suggest_without_prefix(client: testing.TestClient):
+    resp = client.simulate_get("/questions/suggest")
+
+    assert resp.status_code == 400
+
+
+def test_filter_fuzzy(client: testing.TestClient):
+    headers = {"Accept": "application/json"}
+    expected = client.simulate_get(
+        "/questions/filter", params={"q": "india"}, headers=headers
+    ).json
+    resp = client.simulate_get(
+        "/questions/filter", params={"q": "indai", "fuzzy": "true"}, headers=headers
+    )
+
+    assert resp.status_code == 200
+    assert resp.json == expected
+
+
+def test_filter_highlight(client: testing.TestClient):
+    resp = client.simulate_get(
+        "/questions/filter",
+        params={"q": "india", "highlight": "true", "fields": "main_question"},
+        headers={"Accept": "application/json"},
+    )
+
+    assert resp.status_code == 200
+    assert set(resp.json) == {"questions", "highlights"}
+    assert len(resp.json["highlights"]) == len(resp.json["questions"])
+
+
+def test_count(client: testing.TestClient):
+    params = {"q": "india", "exams": "CSE"}
+    questions = client.simulate_get(
+        "/questions/filter", params=params, headers={"Accept": "application/json"}
+    ).json
+    resp = client.simulate_get("/questions/count", params=params)
+
+    assert resp.status_code == 200
+    assert resp.json == {"count": len(questions)}
+
+
+def test_filter_sorted(client: testing.TestClient):
+    resp = client.simulate_get(
+        "/questions/filter",
+        params={"sort": "-year"},
+        headers={"Accept": "application/json"},
+    )
+
+    years = [q["year"] for q in resp.json]
+    assert years == sorted(years, reverse=True)
+
+
+def test_filter_sorted_by_relevance(client: testing.TestClient):
+    params = {"q": "india OR inflation", "sort": "relevance"}
+    resp = client.simulate_get(
+        "/questions/filter", params=params, headers={"Accept": "application/json"}
+    )
+    unsorted = client.simulate_get(
+        "/questions/filter",
+        params={"q": params["q"]},
+        headers={"Accept": "application/json"},
+    )
+
+    ranking = WhooshSearcher(
+        str(TEST_DATA_DIR / "whoosh_index"), "questions", "question"
+    ).rank(params["q"])
+
+    assert resp.status_code == 200
+    assert [q["id"] for q in resp.json] == [format_question_id(id) for id in ranking]
+    assert [q["id"] for q in resp.json] != [q["id"] for q in unsorted.json]
+
+
+def test_filter_invalid_sort(client: testing.TestClient):
+    resp = client.simulate_get("/questions/filter", params={"sort": "bogus"})
+
+    assert resp.status_code == 400
+
+
+def test_similar(client: testing.TestClient, question_bank: QuestionBank):
+    for question in question_bank:
+        resp = client.simulate_get(
+            f"/questions/{question.id}/similar",
+            headers={"Accept": "application/json"},
+        )
+
+        assert resp.status_code == 200
+        assert all(s["question"]["id"] != question.id for s in resp.json)
+
+
+def test_similar_not_found(client: testing.TestClient):
+    resp = client.simulate_get("/questions/0000000000000000/similar")
+
+    assert resp.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/questions/filter",
+        "/questions/count",
+        "/questions/random",
+        "/questions/practice",
+    ],
+)
+def test_query_too_complex(client: testing.TestClient, path: str):
+    query = " ".join(f"term{i}" for i in range(100))
+    resp = client.simulate_get(path, params={"q": query})
+
+    assert resp.status_code == 400
+    assert resp.json["title"] == "QueryTooComplexError"
+
+
+def test_filter_not_truncated(client: testing.TestClient):
+    resp = client.simulate_get("/questions/filter", params={"q": "india"})
+
+    assert resp.status_code == 200
+    assert SEARCH_TRUNCATED_HEADER not in resp.headers
+
+
+def test_filter_truncated(question_bank: QuestionBank):
+    searcher = WhooshSearcher(
+        str(TEST_DATA_DIR / "whoosh_index"), "questions", "question", time_limit=1e-9
+    )
+    app = make_app(QuestionSearchEngine(question_bank, searcher))
+
+    resp = testing.TestClient(app).simulate_get(
+        "/questions/filter", params={"q": "india"}
+    )
+
+    assert resp.status_code == 200
+    assert resp.headers[SEARCH_TRUNCATED_HEADER] == "true"
+
+
+def test_filter_year_range_and_exclusions(
+    client: testing.TestClient, question_bank: QuestionBank
+):
+    excluded_id = next(q.id for q in question_bank if q.year == 2021)
+    params = {
+        "years": "2019..2021",
+        "exclude_exams": "cds",
+        "exclude_ids": excluded_id,
+    }
+    resp = client.simulate_get(
+        "/questions/filter", params=params, headers={"Accept": "application/json"}
+    )
+
+    expected = [
+        q.id
+        for q in question_bank
+        if 2019 <= q.year <= 2021 and q.exam != "CDS" and q.id != excluded_id
+    ]
+    assert resp.status_code == 200
+    assert sorted(q["id"] for q in resp.json) == sorted(expected)
+
+    resp = client.simulate_get("/questions/count", params=params)
+    assert resp.json == {"count": len(expected)}
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"years": "2010..20x0"},
+        {"years": "2020..2010"},
+        {"exclude_ids": "abc"},
+        {"exclude_exams": "FOO"},
+        {"exclude_subjects": "foo"},
+        {"exams": "FOO"},
+        {"subjects": "foo"},
+    ],
+)
+def test_filter_invalid_params(client: testing.TestClient, params: dict):
+    resp = client.simulate_get("/questions/filter", params=params)
+
+    assert resp.status_code == 400
+    if "exclude_ids" not in params:
+        assert f'"{next(iter(params))}" parameter' in resp.json["description"]
+
+
+def test_practice_session(client: testing.TestClient, question_bank: QuestionBank):
+    params: dict = {"exams": "cse", "limit": 3, "fields": "id"}
+    expected = sorted(q.id for q in question_bank if q.exam == "CSE")
+
+    seen: list[str] = []
+    while True:
+        resp = client.simulate_get(
+            "/questions/practice",
+            params=params,
+            headers={"Accept": "application/json"},
+        )
+        assert resp.status_code == 200
+        assert resp.json["total"] == len(expected)
+        if not resp.json["questions"]:
+            break
+
+        seen.extend(q["id"] for q in resp.json["questions"])
+        params["seed"] = resp.json["seed"]
+        params["cursor"] = resp.json["cursor"]
+
+    # Every question is practiced once, in a shuffled order.
+    assert sorted(seen) == expected
+    assert seen != expected
+
+    params["cursor"] = 0
+    resp = client.simulate_get(
+        "/questions/practice", params=params, headers={"Accept": "application/json"}
+    )
+    assert [q["id"] for q in resp.json["questions"]] == seen[:3]
+
+
+def test_practice_session_with_query(client: testing.TestClient):
+    params = {"q": "india", "limit": 50, "seed": 7}
+    resp = client.simulate_get(
+        "/questions/practice", params=params, headers={"Accept": "application/json"}
+    )
+    count = client.simulate_get("/questions/count", params={"q": "india"})
+
+    assert resp.status_code == 200
+    assert len({q["id"] for q in resp.json["questions"]}) == count.json["count"]
+    assert resp.json["cursor"] == resp.json["total"] == count.json["count"]
+
+
+def test_practice_session_truncated(question_bank: QuestionBank):
+    searcher = WhooshSearcher(
+        str(TEST_DATA_DIR / "whoosh_index"), "questions", "question", time_limit=1e-9
+    )
+    app = make_app(QuestionSearchEngine(question_bank, searcher))
+
+    resp = testing.TestClient(app).simulate_get(
+        "/questions/practice",
+        params={"q": "india"},
+        headers={"Accept": "application/json"},
+    )
+
+    # The session would go through different questions on each request.
+    assert resp.status_code == 400
+    assert resp.json["title"] == "QueryTooComplexError"
@@ -0,0 +1,158 @@
+from pathlib import Path
+
+import pytest
+from falcon import App, Response, testing
+
+from past_years.api import make_app
+from past_years.api.request import Request
+from past_years.api.endpoints import ReadinessEndpoint
+from past_years.api.middlewares import RecordTrafficMiddleware
+from past_years.api.traffic import (
+    WARM_UP_ENVIRON_KEY,
+    RecordedRequest,
+    TrafficRecorder,
+    WarmUp,
+)
+from past_years.configuration import config
+from past_years.search.search_engine import QuestionSearchEngine
+
+
+class _Resource:
+    def on_get(self, req: Request, resp: Response):
+        resp.media = {}
+
+
+@pytest.fixture()
+def traffic_fp(tmp_path: Path) -> Path:
+    return tmp_path / "traffic.json"
+
+
+# ----- Testing TrafficRecorder -----
+def test_recorder_popular(traffic_fp: Path):
+    recorder = TrafficRecorder(traffic_fp)
+    for query_string in ("q=india", "q=bank", "q=india", "q=rbi", "q=india", "q=rbi"):
+        recorder.record("/questions/filter", query_string)
+
+    popular = recorder.popular(2)
+    assert [r.query_string for r in popular] == ["q=india", "q=rbi"]
+    assert [r.count for r in popular] == [3, 2]
+
+
+def test_recorder_decay(traffic_fp: Path):
+    recorder = TrafficRecorder(traffic_fp, sample_size=2)
+    for query_string in ("q=india", "q=india", "q=bank", "q=rbi", "q=upsc"):
+        recorder.record("/questions/filter", query_string)
+
+    # Only the most popular are kept, with their counts halved.
+    assert recorder.popular(10) == [
+        RecordedRequest("/questions/filter", "q=india", 1),
+        RecordedRequest("/questions/filter", "q=bank", 0.5),
+    ]
+
+
+def test_recorder_save_and_load(traffic_fp: Path):
+    recorder = TrafficRecorder(traffic_fp)
+    recorder.record("/questions/filter", "q=india")
+    recorder.save()
+
+    assert TrafficRecorder(traffic_fp).popular(10) == recorder.popular(10)
+
+
+def test_recorders_merge_when_saving(traffic_fp: Path):
+    first, second = TrafficRecorder(traffic_fp), TrafficRecorder(traffic_fp)
+    first.record("/questions/filter", "q=india")
+    first.record("/questions/filter", "q=india")
+    second.record("/questions/filter", "q=bank")
+    second.record("/questions/filter", "q=india")
+
+    first.save()
+    second.save()
+    first.save()
+
+    assert TrafficRecorder(traffic_fp).popular(10) == [
+        RecordedRequest("/questions/filter", "q=india", 3),
+        RecordedRequest("/questions/filter", "q=bank", 1),
+    ]
+
+
+def test_recorder_saves_in_background(traffic_fp: Path):
+    recorder = TrafficRecorder(traffic_fp, save_interval=0)
+    recorder.record("/questions/filter", "q=india")
+
+    save_thread = recorder._save_thread
+    assert save_thread is not None and save_thread.name == "traffic-save"
+    save_thread.join()
+    assert TrafficRecorder(traffic_fp).popular(10) == [
+        RecordedRequest("/questions/filter", "q=india", 1)
+    ]
+
+
+def test_recorder_invalid_file(traffic_fp: Path):
+    traffic_fp.write_text("not json")
+
+    assert TrafficRecorder(traffic_fp).popular(10) == []
+
+
+def test_record_traffic_middleware(traffic_fp: Path):
+    recorder = TrafficRecorder(traffic_fp)
+    app = App(middleware=[RecordTrafficMiddleware(recorder)])
+    app.add_route("/questions/filter", _Resource())
+    app.add_route("/ready", _Resource())
+    client = testing.TestClient(app)
+
+    client.simulate_get("/questions/filter", query_string="q=india")
+    client.simulate_get("/questions/missing")
+    client.simulate_get("/ready")
+    client.simulate_get(
+        "/questions/filter", query_string="q=bank", extras={WARM_UP_ENVIRON_KEY: True}
+    )
+
+    assert recorder.popular(10) == [RecordedRequest("/questions/filter", "q=india", 1)]
+
+
+# ----- Testing the warm up -----
+def test_not_ready_until_warmed_up():
+    warm_up = WarmUp()
+    app = App(request_type=Request)
+    app.add_route("/ready", ReadinessEndpoint(warm_up))
+    client = testing.TestClient(app)
+
+    assert client.simulate_get("/ready").status_code == 503
+
+    warm_up.run(app)
+    resp = client.simulate_get("/ready")
+    assert resp.status_code == 200
+    assert resp.json == {"ready": True, "warmed_up": 0}
+
+
+def test_failed_requests_are_not_counted_as_replayed():
+    app = App(request_type=Request)
+    app.add_route("/questions/filter", _Resource())
+    warm_up = WarmUp(
+        [
+            RecordedRequest("/questions/filter", "q=india", 2),
+            RecordedRequest("/questions/missing", "", 1),
+        ]
+    )
+
+    warm_up.run(app)
+    assert warm_up.replayed == 1
+
+
+def test_warm_up_replays_recorded_traffic(
+    traffic_fp: Path,
+    whoosh_question_search_engine: QuestionSearchEngine,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(config.get_api_config(), "traffic_fp", traffic_fp)
+
+    recorder = TrafficRecorder(traffic_fp)
+    recorder.record("/questions/filter", "q=india")
+    recorder.record("/questions/count", "exams=CSE")
+    recorder.save()
+
+    app = make_app(whoosh_question_search_engine, wait_for_warm_up=True)
+    resp = testing.TestClient(app).simulate_get("/ready")
+
+    assert resp.status_code == 200
+    assert resp.json == {"ready": True, "warmed_up": 2}
@@ -0,0 +1,27 @@
+from past_years.cache import LRUCache
+from past_years.metrics import CACHE_REQUESTS
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache: LRUCache[str, int] = LRUCache("test", maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_lru_cache_records_lookups():
+    cache: LRUCache[str, int] = LRUCache("test_lookups", maxsize=2)
+    cache.put("a", 1)
+
+    cache.get("a")
+    cache.get("b")
+
+    assert CACHE_REQUESTS.get(cache="test_lookups", result="hit") == 1
+    assert CACHE_REQUESTS.get(cache="test_lookups", result="miss") == 1
@@ -0,0 +1,105 @@
+import itertools
+from pathlib import Path
+
+import msgspec
+
+from past_years.search.cube import (
+    build_questions_cube,
+    encode_questions_cube,
+    load_questions_cube,
+)
+from past_years.search.index_format import bank_fingerprint
+from past_years.search.question_bank import QuestionBank
+from past_years.search.search_types import (
+    Exam,
+    Filter,
+    QuestionsIndex,
+    Subject,
+    parse_question_id,
+)
+
+TEST_DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+def _load_index() -> QuestionsIndex:
+    idx_bytes = (TEST_DATA_DIR / ".qindex.json").read_bytes()
+    return msgspec.json.decode(idx_bytes, type=QuestionsIndex)
+
+
+def test_filter_matches_brute_force(question_bank: QuestionBank):
+    exam_choices = [[], [Exam.CSE], [Exam.CDS, Exam.NDA]]
+    subject_choices = [[], [Subject.POLITY], [Subject.ECONOMICS, Subject.ENVIRONMENT]]
+    year_choices = [[], [2020], [2019, 2021, 2022]]
+
+    for exams, subjects, years in itertools.product(
+        exam_choices, subject_choices, year_choices
+    ):
+        filter_obj = Filter(exams=exams, subjects=subjects, years=years)
+        expected = {
+            parse_question_id(q.id)
+            for q in question_bank
+            if (not exams or q.exam in exams)
+            and (not subjects or q.subject in subjects)
+            and (not years or q.year in years)
+        }
+
+        assert question_bank.filter(filter_obj) == expected
+        assert question_bank.count(filter_obj) == len(expected)
+
+
+def test_year_ranges_and_exclusions(question_bank: QuestionBank):
+    excluded_ids = {parse_question_id(q.id) for q in question_bank if q.year == 2020}
+    excluded_ids = set(sorted(excluded_ids)[:2]) | {0}
+    filter_obj = Filter(
+        years=[2022],
+        year_ranges=[(2000, 2020)],
+        exclude_subjects=[Subject.POLITY],
+        exclude_ids=excluded_ids,
+    )
+    expected = {
+        parse_question_id(q.id)
+        for q in question_bank
+        if q.year <= 2020 or q.year == 2022
+        if q.subject != Subject.POLITY
+    }
+
+    assert question_bank.filter(filter_obj) == expected - excluded_ids
+    assert question_bank.count(filter_obj) == len(expected - excluded_ids)
+
+    everything = Filter(exclude_exams=list(Exam))
+    assert question_bank.filter(everything) == set()
+    assert question_bank.count(everything) == 0
+
+
+def test_ranges_are_merged():
+    idx = _load_index()
+    ids = sorted(set().union(*idx.exams.values()))
+    cube = build_questions_cube(idx, ids)
+
+    # Every exam is a single range, so all of them are one range.
+    assert cube.ranges(exams=idx.exams) == [(0, len(ids))]
+    assert cube.ranges(exams=["not an exam"]) == []
+
+
+def test_save_and_load(tmp_path: Path, question_bank: QuestionBank):
+    idx = _load_index()
+    questions = list(question_bank)
+    cube = build_questions_cube(idx, (parse_question_id(q.id) for q in questions))
+
+    cube_fp = tmp_path / ".qindex.cube"
+    cube_fp.write_bytes(encode_questions_cube(cube, questions))
+    loaded = load_questions_cube(cube_fp, bank_fingerprint(questions))
+
+    assert loaded is not None
+    for exam in idx.exams:
+        ranges = cube.ranges(exams=[exam], years=[2020, 2021])
+        assert loaded.ranges(exams=[exam], years=[2020, 2021]) == ranges
+        assert loaded.ids(ranges) == cube.ids(ranges)
+
+    # The cube is ignored once a question is moved to another year, even
+    # though the IDs of the questions are the same.
+    moved = [msgspec.structs.replace(questions[0], year=1990), *questions[1:]]
+    assert load_questions_cube(cube_fp, bank_fingerprint(moved)) is None
+
+    cube_fp.write_bytes(b"not a cube")
+    assert load_questions_cube(cube_fp, bank_fingerprint(questions)) is None
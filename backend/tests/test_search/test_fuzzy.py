@@ -0,0 +1,34 @@
+import pytest
+
+from past_years.search.fuzzy import build_fuzzy_index, edit_distance
+
+
+@pytest.mark.parametrize(
+    "a, b, distance",
+    [
+        ("india", "india", 0),
+        ("indai", "india", 1),
+        ("inflaton", "inflat", 2),
+        ("kitten", "sitting", 3),
+    ],
+)
+def test_edit_distance(a: str, b: str, distance: int):
+    assert edit_distance(a, b, 3) == distance
+    assert edit_distance(a, b, distance - 1) == distance if distance else True
+
+
+def test_lookup():
+    fuzzy_idx = build_fuzzy_index(
+        [("govern", 10), ("given", 20), ("india", 5), ("indian", 3)], generation=1
+    )
+
+    assert fuzzy_idx.lookup("goverm", 5) == ["govern"]
+    assert fuzzy_idx.lookup("indai", 5) == ["india"]
+    assert fuzzy_idx.lookup("indain", 5) == ["indian"]
+    assert fuzzy_idx.lookup("xyz", 5) == []
+
+
+def test_lookup_max_expansions():
+    fuzzy_idx = build_fuzzy_index([("bank", 1), ("band", 3), ("bang", 2)], generation=1)
+
+    assert fuzzy_idx.lookup("banx", 2) == ["band", "bang"]
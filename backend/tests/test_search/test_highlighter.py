@@ -0,0 +1,51 @@
+from whoosh.analysis import StemmingAnalyzer
+
+from past_years.search.highlighter import Highlighter
+from past_years.search.search_engine import QuestionSearchEngine
+from past_years.search.search_types import Exam, Filter, Question, Subject
+
+
+def _question(**kwargs) -> Question:
+    fields = dict(
+        main_question="Which of the following affect inflation in India?",
+        continuation="",
+        question_options=("Interest rates", "Inflation expectations"),
+        answers={"a": "1 only", "b": "Both 1 and 2 affect inflation"},
+        correct_answer="b",
+        exam=Exam.CSE,
+        year=2020,
+        subject=Subject.ECONOMICS,
+        id="0123456789abcdef",
+    )
+    fields.update(kwargs)
+    return Question(**fields)  # type: ignore[arg-type]
+
+
+def test_highlight():
+    highlighter = Highlighter(StemmingAnalyzer())
+    question = _question()
+
+    highlights = highlighter.highlight(question, {"inflat", "india"})
+
+    assert highlights is not None
+    assert [question.main_question[s:e] for s, e in highlights.main_question] == [
+        "inflation",
+        "India",
+    ]
+    assert highlights.question_options == [[], [(0, 9)]]
+    assert highlights.answers == {"b": [(20, 29)]}
+
+
+def test_highlight_no_match():
+    highlighter = Highlighter(StemmingAnalyzer())
+
+    assert highlighter.highlight(_question(), {"rbi"}) is None
+    assert highlighter.highlight(_question(), set()) is None
+
+
+def test_highlighted_search(whoosh_question_search_engine: QuestionSearchEngine):
+    filter = Filter(q="india OR econ*")
+    results = whoosh_question_search_engine.highlighted_search(filter)
+
+    assert results.questions
+    assert set(results.highlights) == {q.id for q in results.questions}
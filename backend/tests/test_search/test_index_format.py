@@ -0,0 +1,64 @@
+import msgspec
+import pytest
+
+from past_years.errors import InvalidIndexError
+from past_years.search.index_format import (
+    bank_fingerprint,
+    decode_questions_index,
+    encode_questions_index,
+)
+from past_years.search.question_bank import QuestionBank
+from past_years.search.search_types import QuestionsIndex
+
+from tests.conftest import TEST_DATA_DIR
+
+
+@pytest.fixture(scope="module")
+def json_index() -> QuestionsIndex:
+    return msgspec.json.decode(
+        (TEST_DATA_DIR / ".qindex.json").read_bytes(), type=QuestionsIndex
+    )
+
+
+def test_binary_index_matches_json_index(
+    question_bank: QuestionBank, json_index: QuestionsIndex
+):
+    data = (TEST_DATA_DIR / ".qindex.bin").read_bytes()
+    questions = list(question_bank)
+
+    assert decode_questions_index(data, "idx", bank_fingerprint(questions)) == (
+        json_index
+    )
+    assert encode_questions_index(json_index, questions) == data
+
+
+def test_binary_index_from_other_questions(
+    question_bank: QuestionBank, json_index: QuestionsIndex
+):
+    questions = list(question_bank)
+    data = encode_questions_index(json_index, questions)
+    fingerprint = bank_fingerprint(questions)
+
+    # Moving a question to another subject keeps its ID but not the index.
+    moved = [msgspec.structs.replace(questions[0], subject="polity"), *questions[1:]]
+    if questions[0].subject == "polity":
+        moved[0] = msgspec.structs.replace(questions[0], subject="economics")
+
+    with pytest.raises(InvalidIndexError):
+        decode_questions_index(data, "idx", bank_fingerprint(moved))
+    with pytest.raises(InvalidIndexError):
+        decode_questions_index(data, "idx", bank_fingerprint(questions[1:]))
+    with pytest.raises(InvalidIndexError):
+        decode_questions_index(data[:-3], "idx", fingerprint)
+    with pytest.raises(InvalidIndexError):
+        decode_questions_index(b"not an index", "idx", fingerprint)
+
+
+def test_bank_falls_back_to_json_index(tmp_path, question_bank: QuestionBank):
+    idx_fp = tmp_path / ".qindex.json"
+    idx_fp.write_bytes((TEST_DATA_DIR / ".qindex.json").read_bytes())
+    (tmp_path / ".qindex.bin").write_bytes(b"stale")
+
+    bank = QuestionBank(TEST_DATA_DIR / "questions.json", idx_fp)
+
+    assert bank._idx == question_bank._idx
@@ -0,0 +1,26 @@
+import pytest
+
+from past_years.search.permutation import FeistelPermutation
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 10, 100, 1000, 1025])
+def test_is_permutation(size: int):
+    permutation = FeistelPermutation(size, seed=42)
+
+    assert len(permutation) == size
+    assert sorted(permutation[idx] for idx in range(size)) == list(range(size))
+
+
+def test_seed_picks_permutation():
+    first = [FeistelPermutation(100, seed=1)[idx] for idx in range(100)]
+    again = [FeistelPermutation(100, seed=1)[idx] for idx in range(100)]
+    other = [FeistelPermutation(100, seed=2)[idx] for idx in range(100)]
+
+    assert first == again
+    assert first != other
+    assert first != list(range(100))
+
+
+def test_out_of_range():
+    with pytest.raises(IndexError):
+        FeistelPermutation(10, seed=1)[10]
@@ -0,0 +1,194 @@
+import shutil
+from pathlib import Path
+
+import pytest
+from whoosh.index import open_dir
+
+from past_years.context import ctx
+from past_years.errors import QueryTooComplexError
+from past_years.search.query_searcher import WhooshSearcher
+
+from tests.conftest import TEST_DATA_DIR
+
+QUERIES = [
+    "india",
+    "econ*",
+    "ind?a",
+    "india AND econom*",
+    "(india OR bank) AND NOT rbi",
+    'inflation OR "monetary policy"',
+    "NOT india",
+]
+
+
+@pytest.fixture()
+def index_dir(tmp_path: Path) -> str:
+    idx_dir = tmp_path / "whoosh_index"
+    shutil.copytree(TEST_DATA_DIR / "whoosh_index", idx_dir)
+    return str(idx_dir)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_cached_search_matches_whoosh(index_dir: str, query: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question")
+    with searcher._idx.searcher() as whoosh_searcher:
+        results = whoosh_searcher.search(searcher._qparser.parse(query), limit=None)
+        expected = {hit["id"] for hit in results}
+
+    assert searcher.search(query) == expected
+    # The second search is served from the caches
+    assert searcher.search(f"  {query} ") == expected
+
+
+def test_caches_dropped_on_new_generation(index_dir: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question", refresh_interval=0)
+    hits = searcher.search("india")
+    assert hits
+
+    writer = open_dir(index_dir, "questions").writer()
+    writer.delete_by_term("question", "india")
+    writer.commit()
+
+    assert searcher.search("india") == set()
+
+
+def test_new_generation_checked_periodically(
+    index_dir: str, monkeypatch: pytest.MonkeyPatch
+):
+    searcher = WhooshSearcher(index_dir, "questions", "question", refresh_interval=60)
+    hits = searcher.search("india")
+
+    writer = open_dir(index_dir, "questions").writer()
+    writer.delete_by_term("question", "india")
+    writer.commit()
+
+    checks = []
+    latest_generation = searcher._idx.latest_generation
+    monkeypatch.setattr(
+        searcher._idx,
+        "latest_generation",
+        lambda: checks.append(1) or latest_generation(),
+    )
+
+    # The index isn't checked on every query...
+    assert searcher.search("india") == hits
+    assert checks == []
+
+    # ...only when it's reloaded (or the interval has passed)...
+    searcher.reload()
+    assert searcher.search("india") == set()
+    assert checks == [1]
+
+
+def test_new_generation_used_when_opened(index_dir: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question", refresh_interval=60)
+    searcher.search("india")
+
+    writer = open_dir(index_dir, "questions").writer()
+    writer.delete_by_term("question", "india")
+    writer.commit()
+
+    # ...or when the index is opened for a query that isn't cached.
+    assert searcher.rank("india") == []
+    assert searcher.search("india") == set()
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_ram_storage_matches_file_storage(index_dir: str, query: str):
+    file_searcher = WhooshSearcher(index_dir, "questions", "question")
+    ram_searcher = WhooshSearcher(index_dir, "questions", "question", storage="ram")
+
+    assert ram_searcher.search(query) == file_searcher.search(query)
+    assert ram_searcher.rank(query) == file_searcher.rank(query)
+
+
+def test_ram_storage_is_a_snapshot(index_dir: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question", storage="ram")
+    hits = searcher.search("india")
+
+    writer = open_dir(index_dir, "questions").writer()
+    writer.delete_by_term("question", "india")
+    writer.commit()
+
+    assert searcher.search("india") == hits
+
+
+def test_fuzzy_search(index_dir: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question")
+
+    assert searcher.search("indai") == set()
+    assert searcher.search("indai", fuzzy=True) == searcher.search("india")
+
+
+def test_fuzzy_index_rebuilt_if_stale(index_dir: str):
+    (Path(index_dir) / "questions.fuzzy").write_bytes(b"invalid")
+    searcher = WhooshSearcher(index_dir, "questions", "question")
+
+    assert searcher.search("indai", fuzzy=True) == searcher.search("india")
+
+
+def test_too_many_query_terms(index_dir: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question", max_query_terms=2)
+
+    assert searcher.search("india bank")
+    with pytest.raises(QueryTooComplexError):
+        searcher.search("india bank rbi")
+
+
+@pytest.mark.parametrize("query", ["in*", "in* AND india"])
+def test_wildcard_expansions_limited(index_dir: str, query: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question")
+    limited_searcher = WhooshSearcher(
+        index_dir, "questions", "question", max_expansions=2
+    )
+
+    ctx.search_truncated = False
+    hits = searcher.search(query)
+    assert not ctx.search_truncated
+
+    limited_hits = limited_searcher.search(query)
+    assert ctx.search_truncated
+    assert limited_hits < hits
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_deadline(index_dir: str, query: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question", time_limit=1e-9)
+    unlimited_searcher = WhooshSearcher(index_dir, "questions", "question")
+
+    # The partial results are always a subset of the full results.
+    ctx.search_truncated = False
+    assert searcher.search(query) <= unlimited_searcher.search(query)
+    assert ctx.search_truncated
+
+
+def test_rank_deadline(index_dir: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question", time_limit=1e-9)
+
+    ctx.search_truncated = False
+    ranking = searcher.rank("india OR bank")
+    assert ctx.search_truncated
+    assert set(ranking) <= searcher.search("india OR bank")
+
+    # The partial rankings are not cached
+    assert searcher._rankings.get(("india OR bank", False)) is None
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_rank_matches_search(index_dir: str, query: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question")
+
+    assert set(searcher.rank(query)) == searcher.search(query)
+
+
+@pytest.mark.parametrize("query", ["in*", "in* AND india"])
+def test_rank_wildcard_expansions_limited(index_dir: str, query: str):
+    searcher = WhooshSearcher(index_dir, "questions", "question", max_expansions=2)
+
+    ctx.search_truncated = False
+    ranking = searcher.rank(query)
+    assert ctx.search_truncated
+    assert set(ranking) == searcher.search(query)
+
+    # The capped rankings are not cached
+    assert searcher._rankings.get((query, False)) is None
@@ -1,8 +1,15 @@
+import gc
+from pathlib import Path
 from typing import Iterable
 
+import msgspec
+import pytest
+
+from past_years.errors import InvalidIndexError
 from past_years.search import Exam, Question, Subject
-from past_years.search.search_types import Filter
+from past_years.search.search_types import Filter, SortOrder, format_question_id
 from past_years.search.question_bank import QuestionBank
+from tests.conftest import TEST_DATA_DIR
 
 
 # ----- Helpers -----
@@ -36,10 +43,11 @@ def check_all_questions(all_questions: Iterable[Question], questions: list[Quest
 
 def test_filter_by_subject(question_bank: QuestionBank):
     subjects = [Subject.POLITY, Subject.ECONOMICS]
-    question_ids = question_bank._filter_by_subjects(subjects)
+    question_ids = question_bank.filter(Filter(subjects=subjects))
     questions = list(question_bank.get_questions(question_ids))
 
     assert check_subjects(questions, subjects) is True
+    assert question_bank.count(Filter(subjects=subjects)) == len(questions)
 
     # Checking that all questions with the given subjects is found
     all_questions = list(filter(lambda q: q.subject in subjects, iter(question_bank)))
@@ -50,10 +58,11 @@ def test_filter_by_subject(question_bank: QuestionBank):
 
 def test_filter_by_exams(question_bank: QuestionBank):
     exams = [Exam.CSE]
-    question_ids = question_bank._filter_by_exams(exams)
+    question_ids = question_bank.filter(Filter(exams=exams))
     questions = list(question_bank.get_questions(question_ids))
 
     assert check_exams(questions, exams) is True
+    assert question_bank.count(Filter(exams=exams)) == len(questions)
 
     # Checking that all questions with the given exams is found
     all_questions = filter(lambda q: q.exam in exams, iter(question_bank))
@@ -62,10 +71,11 @@ def test_filter_by_exams(question_bank: QuestionBank):
 
 def test_filter_by_years(question_bank: QuestionBank):
     years = [2021, 2020]
-    question_ids = question_bank._filter_by_year(years)
+    question_ids = question_bank.filter(Filter(years=years))
     questions = list(question_bank.get_questions(question_ids))
 
     assert check_years(questions, years) is True
+    assert question_bank.count(Filter(years=years)) == len(questions)
 
     # Checking that all questions with the given years is found
     all_questions = filter(lambda q: q.year in years, iter(question_bank))
@@ -110,3 +120,101 @@ def test_partial_filter(question_bank: QuestionBank):
 
     all_questions = filter(predicate, iter(question_bank))
     check_all_questions(all_questions, questions)
+
+
+def test_questions_are_compact(question_bank: QuestionBank):
+    questions = list(question_bank)
+
+    assert not any(gc.is_tracked(q) for q in questions)
+    assert all(isinstance(q.question_options, tuple) for q in questions)
+
+    # The repeated strings are shared between the questions
+    continuations: dict[str, int] = {}
+    for q in questions:
+        if q.continuation:
+            continuations.setdefault(q.continuation, id(q.continuation))
+            assert continuations[q.continuation] == id(q.continuation)
+
+
+def test_get_questions_sorted(question_bank: QuestionBank):
+    ids = question_bank.filter(Filter(subjects=[Subject.ECONOMICS]))
+
+    by_year = list(question_bank.get_questions(ids, SortOrder.YEAR))
+    assert len(by_year) == len(ids)
+    assert [q.year for q in by_year] == sorted(q.year for q in by_year)
+
+    by_year_desc = list(question_bank.get_questions(ids, SortOrder.YEAR_DESC))
+    assert [q.year for q in by_year_desc] == sorted(
+        (q.year for q in by_year), reverse=True
+    )
+
+    by_exam = list(question_bank.get_questions(ids, SortOrder.EXAM))
+    assert [q.exam for q in by_exam] == sorted(q.exam for q in by_exam)
+
+
+def test_legacy_index(tmp_path: Path, question_bank: QuestionBank):
+    # The IDs were hex strings before they were held as integers.
+    idx = msgspec.json.decode((TEST_DATA_DIR / ".qindex.json").read_bytes())
+    legacy_idx = {
+        section: {
+            key: [format_question_id(id) for id in ids] for key, ids in keys.items()
+        }
+        for section, keys in idx.items()
+    }
+    idx_fp = tmp_path / ".qindex.json"
+    idx_fp.write_bytes(msgspec.json.encode(legacy_idx))
+
+    bank = QuestionBank(TEST_DATA_DIR / "questions.json", idx_fp)
+
+    filter_obj = Filter(exams=[Exam.CSE], subjects=[Subject.POLITY])
+    assert bank.filter(filter_obj) == question_bank.filter(filter_obj)
+    assert bank.metadata == question_bank.metadata
+
+
+@pytest.mark.parametrize(
+    "idx_bytes", [b"not json", b'{"exams": {"CSE": ["not an id"]}}', b"[1, 2]"]
+)
+def test_invalid_index(tmp_path: Path, idx_bytes: bytes):
+    idx_fp = tmp_path / ".qindex.json"
+    idx_fp.write_bytes(idx_bytes)
+
+    with pytest.raises(InvalidIndexError, match="pasty.py index questions"):
+        QuestionBank(TEST_DATA_DIR / "questions.json", idx_fp)
+
+
+def test_index_missing_question(tmp_path: Path, question_bank: QuestionBank):
+    idx = msgspec.json.decode((TEST_DATA_DIR / ".qindex.json").read_bytes())
+    missing = next(iter(idx["exams"]["CSE"]))
+    for section in idx.values():
+        for ids in section.values():
+            if missing in ids:
+                ids.remove(missing)
+    idx_fp = tmp_path / ".qindex.json"
+    idx_fp.write_bytes(msgspec.json.encode(idx))
+
+    # Without a cube next to the index, it's built from the index.
+    bank = QuestionBank(TEST_DATA_DIR / "questions.json", idx_fp)
+
+    filter_obj = Filter(exams=[Exam.CSE])
+    assert bank.filter(filter_obj) == question_bank.filter(filter_obj) - {missing}
+    assert bank.count(filter_obj) == question_bank.count(filter_obj) - 1
+    assert missing in bank
+
+
+def test_index_with_unknown_question(tmp_path: Path, question_bank: QuestionBank):
+    idx = msgspec.json.decode((TEST_DATA_DIR / ".qindex.json").read_bytes())
+    unknown = 1
+    for section in idx.values():
+        next(iter(section.values())).append(unknown)
+    idx_fp = tmp_path / ".qindex.json"
+    idx_fp.write_bytes(msgspec.json.encode(idx))
+
+    bank = QuestionBank(TEST_DATA_DIR / "questions.json", idx_fp)
+
+    ids = bank.filter(Filter(subjects=[Subject.ECONOMICS]))
+    assert unknown not in ids
+    for sort in SortOrder:
+        if sort != SortOrder.RELEVANCE:
+            assert list(bank.get_questions(ids, sort)) == list(
+                question_bank.get_questions(ids, sort)
+            )
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from past_years.search import question_store
+from past_years.search.question_bank import QuestionBank
+from past_years.search.query_searcher import WhooshSearcher
+from past_years.search.question_store import CompressedQuestions
+from past_years.search.search_engine import QuestionSearchEngine
+from past_years.search.search_types import Filter, Subject
+
+from tests.conftest import TEST_DATA_DIR
+
+
+@pytest.fixture(scope="module")
+def questions() -> dict:
+    return QuestionBank.load_questions(TEST_DATA_DIR / "questions.json")
+
+
+@pytest.mark.parametrize("use_zstd", [True, False])
+def test_compressed_questions(questions: dict, use_zstd: bool, monkeypatch):
+    if use_zstd and question_store.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    if not use_zstd:
+        monkeypatch.setattr(question_store, "zstandard", None)
+
+    compressed = CompressedQuestions(questions, cache_size=4)
+
+    assert len(compressed) == len(questions)
+    for id, question in questions.items():
+        assert id in compressed
+        assert compressed[id] == question
+
+    # Only the most recently accessed questions are kept decoded
+    assert len(compressed._cache) == 4
+    assert compressed.compressed_size < sum(
+        len(CompressedQuestions._encoder.encode(q)) for q in questions.values()
+    )
+
+
+def test_compressed_questions_across_threads(questions: dict):
+    if question_store.zstandard is None:
+        pytest.skip("zstandard is not installed")
+
+    compressed = CompressedQuestions(questions, cache_size=0)
+
+    def decompress_all(_) -> bool:
+        return all(compressed[id] == question for id, question in questions.items())
+
+    with ThreadPoolExecutor(4) as executor:
+        assert all(executor.map(decompress_all, range(8)))
+
+
+def test_compressed_question_bank(question_bank: QuestionBank):
+    compressed_bank = QuestionBank(
+        TEST_DATA_DIR / "questions.json",
+        TEST_DATA_DIR / ".qindex.json",
+        storage="compressed",
+        cache_size=8,
+    )
+
+    assert list(compressed_bank) == list(question_bank)
+    assert compressed_bank.metadata == question_bank.metadata
+
+    filter_obj = Filter(subjects=[Subject.POLITY])
+    ids = compressed_bank.filter(filter_obj)
+    assert list(compressed_bank.get_questions(ids)) == list(
+        question_bank.get_questions(ids)
+    )
+
+
+def test_random_only_decompresses_sampled(question_bank: QuestionBank):
+    compressed_bank = QuestionBank(
+        TEST_DATA_DIR / "questions.json",
+        TEST_DATA_DIR / ".qindex.json",
+        storage="compressed",
+        cache_size=len(question_bank),
+    )
+    searcher = WhooshSearcher(
+        str(TEST_DATA_DIR / "whoosh_index"), "questions", "question"
+    )
+    engine = QuestionSearchEngine(compressed_bank, searcher)
+
+    questions = engine.random(Filter(), 3)
+
+    assert len({q.id for q in questions}) == 3
+    assert len(compressed_bank._questions._cache) == 3
+    assert len(engine.random(Filter(), len(question_bank) + 1)) == len(question_bank)
@@ -0,0 +1,17 @@
+import pytest
+
+from past_years.errors import InvalidQuestionIdError
+from past_years.search.search_types import format_question_id, parse_question_id
+
+
+def test_question_id_round_trip():
+    for question_id in ("cb969678821aac2a", "0000000000000001", "ffffffffffffffff"):
+        assert format_question_id(parse_question_id(question_id)) == question_id
+
+
+@pytest.mark.parametrize(
+    "question_id", ["", "cb969678821aac2", "cb969678821aac2aa", "0x69678821aac2a1"]
+)
+def test_invalid_question_id(question_id: str):
+    with pytest.raises(InvalidQuestionIdError):
+        parse_question_id(question_id)
@@ -0,0 +1,88 @@
+import pytest
+
+from past_years.search import similarity
+from past_years.search.question_bank import QuestionBank
+from past_years.search.search_types import Exam, Question, Subject, parse_question_id
+from past_years.search.similarity import (
+    _get_signature,
+    build_similar_questions_index,
+)
+
+
+def _question(id: str, main_question: str) -> Question:
+    return Question(
+        main_question=main_question,
+        continuation="",
+        question_options=(),
+        answers={},
+        correct_answer="a",
+        exam=Exam.CSE,
+        year=2020,
+        subject=Subject.ECONOMICS,
+        id=id,
+    )
+
+
+def test_similar_questions():
+    text = "Which one of the following is the best description of the term {}?"
+    questions = [
+        _question("0000000000000001", text.format("inflation targeting")),
+        _question("0000000000000002", text.format("inflation targeting in India")),
+        _question("0000000000000003", text.format("core inflation")),
+        _question("0000000000000004", "Consider the following statements about RBI"),
+    ]
+
+    idx = build_similar_questions_index(questions, top_k=2)
+
+    assert [id for id, _ in idx.similar[1]] == [2, 3]
+    assert idx.similar[1][0][1] > idx.similar[1][1][1]
+    assert 4 not in idx.similar
+
+
+def test_questions_without_words_not_similar():
+    questions = [
+        _question("0000000000000001", ""),
+        _question("0000000000000002", "?"),
+        _question("0000000000000003", "..."),
+    ]
+
+    assert build_similar_questions_index(questions).similar == {}
+
+
+def test_big_buckets_skipped(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(similarity, "_MAX_BUCKET_SIZE", 2)
+    text = "Consider the following statements about {}"
+    questions = [
+        _question("0000000000000001", text.format("RBI")),
+        _question("0000000000000002", text.format("RBI")),
+        _question("0000000000000003", text.format("RBI")),
+        _question("0000000000000004", text.format("SEBI")),
+        _question("0000000000000005", text.format("SEBI")),
+    ]
+
+    idx = build_similar_questions_index(questions)
+
+    # The identical questions are in the same bucket of every band.
+    assert idx.similar.keys() == {4, 5}
+
+
+def test_signatures_estimate_similarity():
+    # The hashes of the shingles being close to each other shouldn't bias
+    # the estimate of their Jaccard similarity (which is 0.5 here).
+    a = _get_signature(frozenset(range(0, 150)))
+    b = _get_signature(frozenset(range(50, 200)))
+
+    estimate = sum(x == y for x, y in zip(a, b)) / len(a)
+    assert abs(estimate - 0.5) < 0.15
+
+
+def test_question_bank_similar(question_bank: QuestionBank):
+    similar = {
+        parse_question_id(q.id): question_bank.similar(parse_question_id(q.id))
+        for q in question_bank
+    }
+
+    assert any(similar.values())
+    for id, id_similar in similar.items():
+        for other_id, similarity in id_similar:
+            assert (id, similarity) in similar[other_id]
@@ -0,0 +1,107 @@
+from pathlib import Path
+
+import msgspec
+import pytest
+
+from past_years.search import question_bank as question_bank_module
+from past_years.search.index_format import bank_fingerprint
+from past_years.search.question_bank import QuestionBank
+from past_years.search.search_types import Exam, Filter, parse_question_id
+from past_years.search.suggester import (
+    TermSuggester,
+    _get_terms,
+    build_term_suggester,
+    encode_term_suggester,
+    load_term_suggester,
+)
+from tests.conftest import TEST_DATA_DIR
+
+
+@pytest.fixture(scope="module")
+def suggester(question_bank: QuestionBank) -> TermSuggester:
+    return build_term_suggester(question_bank)
+
+
+def _expected(question_bank: QuestionBank, prefix: str, ids: set[int] | None):
+    counts: dict[str, int] = {}
+    for q in question_bank:
+        if ids is not None and parse_question_id(q.id) not in ids:
+            continue
+        for term in _get_terms(q.full_question):
+            if term.startswith(prefix):
+                counts[term] = counts.get(term, 0) + 1
+
+    return sorted(counts.values(), reverse=True)
+
+
+@pytest.mark.parametrize("prefix", ["i", "in", "ind", "eco", "Bank "])
+def test_suggest(suggester: TermSuggester, question_bank: QuestionBank, prefix: str):
+    suggestions = suggester.suggest(prefix, limit=5)
+
+    assert all(s.term.startswith(prefix.strip().lower()) for s in suggestions)
+    expected = _expected(question_bank, prefix.strip().lower(), None)
+    assert [s.count for s in suggestions] == expected[:5]
+
+
+@pytest.mark.parametrize("prefix", ["i", "in", "eco"])
+def test_suggest_restricted(
+    suggester: TermSuggester, question_bank: QuestionBank, prefix: str
+):
+    ids = question_bank.filter(Filter(exams=[Exam.CSE]))
+    suggestions = suggester.suggest(prefix, limit=5, ids=ids)
+
+    assert [s.count for s in suggestions] == _expected(question_bank, prefix, ids)[:5]
+
+
+def test_suggest_nothing(suggester: TermSuggester):
+    assert suggester.suggest("") == []
+    assert suggester.suggest("zzzz") == []
+
+
+@pytest.mark.parametrize("exams", [[Exam.CSE], list(Exam)])
+def test_suggest_restricted_by_few_or_many(
+    suggester: TermSuggester, question_bank: QuestionBank, exams: list[Exam]
+):
+    # The few IDs are looked for in the IDs of the terms, while the IDs of
+    # the terms are looked for in the many IDs.
+    ids = question_bank.filter(Filter(exams=exams))
+    ids = set(sorted(ids)[:3]) if len(exams) == 1 else ids
+    suggestions = suggester.suggest("i", limit=5, ids=ids)
+
+    assert [s.count for s in suggestions] == _expected(question_bank, "i", ids)[:5]
+
+
+def test_save_and_load(
+    tmp_path: Path, suggester: TermSuggester, question_bank: QuestionBank
+):
+    questions = list(question_bank)
+    fp = tmp_path / ".qindex.terms"
+    fp.write_bytes(encode_term_suggester(suggester, questions))
+    loaded = load_term_suggester(fp, bank_fingerprint(questions))
+
+    assert loaded is not None
+    assert len(loaded) == len(suggester)
+    ids = question_bank.filter(Filter(exams=[Exam.CSE]))
+    for prefix in ["i", "eco"]:
+        assert loaded.suggest(prefix) == suggester.suggest(prefix)
+        assert loaded.suggest(prefix, ids=ids) == suggester.suggest(prefix, ids=ids)
+
+    moved = [msgspec.structs.replace(questions[0], year=1990), *questions[1:]]
+    assert load_term_suggester(fp, bank_fingerprint(moved)) is None
+
+    fp.write_bytes(b"not a suggester")
+    assert load_term_suggester(fp, bank_fingerprint(questions)) is None
+
+
+def test_bank_loads_saved_suggester(
+    question_bank: QuestionBank, monkeypatch: pytest.MonkeyPatch
+):
+    # The suggester saved with the index is used rather than rebuilt.
+    monkeypatch.setattr(question_bank_module, "build_term_suggester", None)
+    bank = QuestionBank(
+        TEST_DATA_DIR / "questions.json",
+        TEST_DATA_DIR / ".qindex.json",
+        storage="compressed",
+    )
+
+    assert bank.suggester.suggest("in") == question_bank.suggester.suggest("in")
@@ -0,0 +1,82 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from past_years.server import PreforkServer
+
+# A trivial application served by the pre-forking server
+_SERVER_SCRIPT = """
+import os, sys
+from past_years.server import PreforkServer
+
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [str(os.getpid()).encode()]
+
+PreforkServer(
+    app, "127.0.0.1", int(sys.argv[1]), workers=2, threads=2, max_requests=2
+).serve()
+"""
+
+
+def _get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(url: str, timeout: float = 5) -> str:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as resp:
+                return resp.read().decode()
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+@pytest.fixture
+def server_port():
+    port = _get_free_port()
+    proc = subprocess.Popen([sys.executable, "-c", _SERVER_SCRIPT, str(port)])
+    yield port
+
+    proc.send_signal(signal.SIGTERM)
+    assert proc.wait(timeout=10) == 0
+
+
+def test_prefork_server_recycles_workers(server_port: int):
+    url = f"http://127.0.0.1:{server_port}/"
+    pids = [_get(url) for _ in range(10)]
+
+    # Each worker is replaced after 2 requests, so at least 5 workers
+    # must have handled the requests.
+    assert len(set(pids)) >= 5
+
+
+def test_signals_blocked_until_worker_handles_them(monkeypatch: pytest.MonkeyPatch):
+    read_fd, write_fd = os.pipe()
+
+    def run_worker(sock: socket.socket):
+        # The mask of the worker before it installs its signal handlers
+        blocked = signal.pthread_sigmask(signal.SIG_BLOCK, [])
+        os.write(write_fd, b"1" if signal.SIGTERM in blocked else b"0")
+
+    server = PreforkServer(lambda environ, start_response: [], "127.0.0.1", 0)
+    monkeypatch.setattr(server, "_run_worker", run_worker)
+
+    with socket.socket() as sock:
+        pid = server._spawn_worker(sock)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert os.read(read_fd, 1) == b"1"
+    assert signal.SIGTERM not in signal.pthread_sigmask(signal.SIG_BLOCK, [])
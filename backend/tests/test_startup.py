@@ -0,0 +1,71 @@
+import subprocess
+import sys
+
+import pytest
+from falcon import testing
+
+from past_years.api import make_app
+from past_years.search.search_engine import QuestionSearchEngine
+
+# The modules that are slow to import and are only needed once the
+# application is built or a request needs them.
+_LAZY_MODULES = ("httpx", "whoosh")
+
+# The most time (in milliseconds) importing the application may take. It
+# is well above the usual import time, so that only a regression such as
+# eagerly importing a heavy dependency trips it.
+_IMPORT_TIME_BUDGET_MS = 400
+
+
+def _import_time_ms(module: str) -> float:
+    """Returns the time taken to import the module in a fresh interpreter,
+    as reported by `python -X importtime`."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Each line is "import time: self [us] | cumulative | imported package",
+    # with the top-level imports not being indented.
+    total_us = 0
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if name.startswith(" past_years"):
+            total_us += int(cumulative)
+
+    return total_us / 1e3
+
+
+def test_heavy_modules_are_lazily_imported():
+    code = (
+        "import sys, past_years.main, past_years.api.app;"
+        f"print(','.join(m for m in {_LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == ""
+
+
+def test_import_time_budget():
+    # The best of a few runs, so that a busy machine doesn't fail the test.
+    import_time = min(_import_time_ms("past_years.api.app") for _ in range(3))
+    assert import_time < _IMPORT_TIME_BUDGET_MS
+
+
+def test_github_client_created_on_first_request(
+    whoosh_question_search_engine: QuestionSearchEngine,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.delenv("GH_ISSUES_PAT", raising=False)
+
+    # The PAT is only needed once an incorrect question is reported.
+    client = testing.TestClient(make_app(whoosh_question_search_engine))
+    assert client.simulate_get("/questions/count").status_code == 200
+
+    resp = client.simulate_get("/incorrect-question/0000000000000000")
+    assert resp.status_code == 500
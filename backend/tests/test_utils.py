@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+from threading import Thread
+
+from past_years import utils
+from past_years.context import ctx
+from past_years.utils import BatchedSink, new_request_id
+
+
+def test_batched_sink_writes_on_stop(tmp_path: Path):
+    fp = tmp_path / "logs" / "test.log"
+    sink = BatchedSink(fp, batch_size=100, flush_interval=60)
+    for idx in range(10):
+        sink.write(f"message {idx}\n")
+
+    sink.stop()
+
+    lines = fp.read_text().splitlines()
+    assert lines == [f"message {idx}" for idx in range(10)]
+
+
+def test_batched_sink_restarted_after_fork(tmp_path: Path):
+    fp = tmp_path / "test.log"
+    sink = BatchedSink(fp, batch_size=1, flush_interval=60)
+    assert sink in utils._sinks
+
+    pid = os.fork()
+    if pid == 0:
+        # The sink only writes in the child if its thread was restarted.
+        sink.write("child\n")
+        sink.stop()
+        os._exit(0)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    sink.stop()
+    assert sink not in utils._sinks
+    assert fp.read_text() == "child\n"
+
+
+def test_new_request_id_is_unique():
+    ids = {new_request_id() for _ in range(1000)}
+    assert len(ids) == 1000
+
+
+def test_request_id_is_per_thread():
+    ctx.request_id = "main"
+    seen: list[str | None] = []
+
+    def handle_request():
+        seen.append(ctx.request_id)
+        ctx.request_id = "thread"
+
+    thread = Thread(target=handle_request)
+    thread.start()
+    thread.join()
+
+    assert seen == [None]
+    assert ctx.request_id == "main"